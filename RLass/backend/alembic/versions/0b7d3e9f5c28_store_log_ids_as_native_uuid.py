@@ -0,0 +1,41 @@
+"""Store usage_logs and audit_logs ids as native uuid (PostgreSQL)
+
+Revision ID: 0b7d3e9f5c28
+Revises: f2a6c8e4b913
+Create Date: 2026-03-09 16:21:40.913257
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b7d3e9f5c28'
+down_revision: Union[str, Sequence[str], None] = 'f2a6c8e4b913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('usage_logs', 'audit_logs')
+UUID_PATTERN = '^[0-9a-f]{8}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{12}$'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        # Other databases keep ids as strings; new ids are UUIDv7 either way
+        return
+    for table in TABLES:
+        # Existing uuid4 ids convert as they are; anything else gets a fresh id. Nothing references
+        # these ids. The ALTER rewrites the table (and every partition) under an exclusive lock.
+        op.execute(f"UPDATE {table} SET id = gen_random_uuid()::text WHERE id !~* '{UUID_PATTERN}'")
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN id TYPE uuid USING id::uuid')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for table in TABLES:
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN id TYPE varchar USING id::text')
@@ -0,0 +1,37 @@
+"""Add rate_limit_counters table
+
+Revision ID: 3f1c7a9d2b64
+Revises: 9294cf71ceb7
+Create Date: 2026-01-12 10:21:48.517203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c7a9d2b64'
+down_revision: Union[str, Sequence[str], None] = '9294cf71ceb7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('rate_limit_counters',
+    sa.Column('api_key', sa.String(), nullable=False),
+    sa.Column('identifier', sa.String(), nullable=False),
+    sa.Column('endpoint', sa.String(), nullable=False),
+    sa.Column('window_start', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('api_key', 'identifier', 'endpoint', 'window_start')
+    )
+    op.create_index(op.f('ix_rate_limit_counters_window_start'), 'rate_limit_counters', ['window_start'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_rate_limit_counters_window_start'), table_name='rate_limit_counters')
+    op.drop_table('rate_limit_counters')
@@ -0,0 +1,151 @@
+"""Store usage_logs api_key, endpoint, identifier and status as ids into dictionary tables
+
+Revision ID: 7c4e1f9a2d36
+Revises: 0b7d3e9f5c28
+Create Date: 2026-03-16 11:05:27.644091
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c4e1f9a2d36'
+down_revision: Union[str, Sequence[str], None] = '0b7d3e9f5c28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# usage_logs column -> dictionary table
+DIMENSIONS = {
+    'api_key': 'usage_api_keys',
+    'endpoint': 'usage_endpoints',
+    'identifier': 'usage_identifiers',
+    'status': 'usage_statuses',
+}
+TRIGRAM_COLUMNS = ('endpoint', 'identifier', 'api_key')
+STATUS_IDS = {'allowed': 1, 'rate_limited': 2, 'success': 3, 'error': 4}
+NOT_NULL = ('api_key', 'identifier', 'status')
+OLD_INDEXES = (
+    'ix_usage_logs_api_key_identifier_endpoint_timestamp',
+    'ix_usage_logs_api_key_timestamp_status',
+    'ix_usage_logs_api_key',
+    'ix_usage_logs_endpoint',
+    'ix_usage_logs_identifier',
+)
+FTS_COLUMNS = ', '.join(TRIGRAM_COLUMNS)
+
+
+def _drop_indexes(names) -> None:
+    for name in names:
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    status_id = sa.SmallInteger().with_variant(sa.Integer(), 'sqlite')
+    op.create_table('usage_api_keys',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('value', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['value'], ['api_keys.key'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('value')
+    )
+    for table in ('usage_endpoints', 'usage_identifiers'):
+        op.create_table(table,
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('value', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('value')
+        )
+    statuses = op.create_table('usage_statuses',
+    sa.Column('id', status_id, autoincrement=True, nullable=False),
+    sa.Column('value', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('value')
+    )
+    op.bulk_insert(statuses, [{'id': i, 'value': name} for name, i in STATUS_IDS.items()])
+    if dialect == 'postgresql':
+        op.execute(f"SELECT setval(pg_get_serial_sequence('usage_statuses', 'id'), {max(STATUS_IDS.values())})")
+        for column in TRIGRAM_COLUMNS:
+            table = DIMENSIONS[column]
+            op.create_index(f'ix_{table}_value_trgm', table, ['value'], unique=False,
+                            postgresql_using='gin', postgresql_ops={'value': 'gin_trgm_ops'})
+
+    # Every distinct value once, then one pass over usage_logs to look the ids up
+    for column, table in DIMENSIONS.items():
+        op.execute(f"""
+            INSERT INTO {table} (value)
+            SELECT DISTINCT {column} FROM usage_logs
+            WHERE {column} IS NOT NULL AND {column} NOT IN (SELECT value FROM {table})
+        """)
+    for column in DIMENSIONS:
+        op.add_column('usage_logs', sa.Column(f'{column}_id', status_id if column == 'status' else sa.Integer(), nullable=True))
+    assignments = ', '.join(
+        f'{column}_id = (SELECT id FROM {table} WHERE value = usage_logs.{column})' for column, table in DIMENSIONS.items()
+    )
+    op.execute(f'UPDATE usage_logs SET {assignments}')
+
+    # The string columns go, with their indexes and search structures
+    _drop_indexes(OLD_INDEXES)
+    if dialect == 'postgresql':
+        _drop_indexes(f'ix_usage_logs_{column}_trgm' for column in TRIGRAM_COLUMNS)
+    elif dialect == 'sqlite':
+        for trigger in ('insert', 'delete', 'update'):
+            op.execute(f'DROP TRIGGER IF EXISTS usage_logs_fts_{trigger}')
+        op.execute('DROP TABLE IF EXISTS usage_logs_fts')
+    # SQLite recreates the table; PostgreSQL alters usage_logs and all of its partitions
+    with op.batch_alter_table('usage_logs') as batch_op:
+        if dialect == 'postgresql':
+            batch_op.drop_constraint('usage_logs_api_key_fkey', type_='foreignkey')
+        for column, table in DIMENSIONS.items():
+            batch_op.drop_column(column)
+            batch_op.alter_column(f'{column}_id', nullable=column not in NOT_NULL)
+            batch_op.create_foreign_key(f'usage_logs_{column}_id_fkey', table, [f'{column}_id'], ['id'],
+                                        ondelete='CASCADE' if column == 'api_key' else None)
+    for column in ('api_key', 'endpoint', 'identifier'):
+        op.create_index(f'ix_usage_logs_{column}_id', 'usage_logs', [f'{column}_id'], unique=False)
+    op.create_index('ix_usage_logs_api_key_identifier_endpoint_timestamp', 'usage_logs', ['api_key_id', 'identifier_id', 'endpoint_id', 'timestamp'], unique=False)
+    op.create_index('ix_usage_logs_api_key_timestamp_status', 'usage_logs', ['api_key_id', 'timestamp', 'status_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    for column in DIMENSIONS:
+        op.add_column('usage_logs', sa.Column(column, sa.String(), nullable=True))
+    assignments = ', '.join(
+        f'{column} = (SELECT value FROM {table} WHERE id = usage_logs.{column}_id)' for column, table in DIMENSIONS.items()
+    )
+    op.execute(f'UPDATE usage_logs SET {assignments}')
+    _drop_indexes(OLD_INDEXES[:2] + tuple(f'ix_usage_logs_{column}_id' for column in ('api_key', 'endpoint', 'identifier')))
+    with op.batch_alter_table('usage_logs') as batch_op:
+        for column in DIMENSIONS:
+            batch_op.drop_constraint(f'usage_logs_{column}_id_fkey', type_='foreignkey')
+            batch_op.drop_column(f'{column}_id')
+            batch_op.alter_column(column, nullable=column not in NOT_NULL)
+        batch_op.create_foreign_key('usage_logs_api_key_fkey', 'api_keys', ['api_key'], ['key'])
+    for column in ('api_key', 'endpoint', 'identifier'):
+        op.create_index(f'ix_usage_logs_{column}', 'usage_logs', [column], unique=False)
+    op.create_index('ix_usage_logs_api_key_identifier_endpoint_timestamp', 'usage_logs', ['api_key', 'identifier', 'endpoint', 'timestamp'], unique=False)
+    op.create_index('ix_usage_logs_api_key_timestamp_status', 'usage_logs', ['api_key', 'timestamp', 'status'], unique=False)
+    for table in DIMENSIONS.values():
+        op.drop_table(table)
+
+    # Substring search as added by e5b19c0d7a42
+    if dialect == 'postgresql':
+        for column in TRIGRAM_COLUMNS:
+            op.create_index(f'ix_usage_logs_{column}_trgm', 'usage_logs', [column], unique=False,
+                            postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'})
+    elif dialect == 'sqlite':
+        new_values = ', '.join(f'new.{column}' for column in TRIGRAM_COLUMNS)
+        old_values = ', '.join(f'old.{column}' for column in TRIGRAM_COLUMNS)
+        delete = f"INSERT INTO usage_logs_fts (usage_logs_fts, rowid, {FTS_COLUMNS}) VALUES ('delete', old.rowid, {old_values});"
+        insert = f"INSERT INTO usage_logs_fts (rowid, {FTS_COLUMNS}) VALUES (new.rowid, {new_values});"
+        op.execute(f"CREATE VIRTUAL TABLE usage_logs_fts USING fts5({FTS_COLUMNS}, content='usage_logs', content_rowid='rowid', tokenize='trigram')")
+        op.execute(f'CREATE TRIGGER usage_logs_fts_insert AFTER INSERT ON usage_logs BEGIN {insert} END')
+        op.execute(f'CREATE TRIGGER usage_logs_fts_delete AFTER DELETE ON usage_logs BEGIN {delete} END')
+        op.execute(f'CREATE TRIGGER usage_logs_fts_update AFTER UPDATE ON usage_logs BEGIN {delete} {insert} END')
+        op.execute("INSERT INTO usage_logs_fts (usage_logs_fts) VALUES ('rebuild')")
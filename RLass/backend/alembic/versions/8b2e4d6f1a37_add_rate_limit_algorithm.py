@@ -0,0 +1,28 @@
+"""Add algorithm column to rate_limit_configs
+
+Revision ID: 8b2e4d6f1a37
+Revises: 3f1c7a9d2b64
+Create Date: 2026-01-19 15:42:03.118592
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e4d6f1a37'
+down_revision: Union[str, Sequence[str], None] = '3f1c7a9d2b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('rate_limit_configs', sa.Column('algorithm', sa.String(), nullable=False, server_default='fixed_window'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('rate_limit_configs', 'algorithm')
@@ -0,0 +1,31 @@
+"""Add sampled usage logging: rate_limit_configs.usage_sample_rate and usage_logs.sample_weight
+
+Revision ID: a9d3f6b2c714
+Revises: 7c4e1f9a2d36
+Create Date: 2026-03-23 10:12:44.530219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9d3f6b2c714'
+down_revision: Union[str, Sequence[str], None] = '7c4e1f9a2d36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('rate_limit_configs', sa.Column('usage_sample_rate', sa.Integer(), nullable=True))
+    # Existing rows were all logged unsampled; a constant default does not rewrite the table
+    op.add_column('usage_logs', sa.Column('sample_weight', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('usage_logs', 'sample_weight')
+    op.drop_column('rate_limit_configs', 'usage_sample_rate')
@@ -0,0 +1,31 @@
+"""Add (timestamp, id) indexes on usage_logs and audit_logs for keyset pagination
+
+Revision ID: b5e8c2d4f917
+Revises: a9d3f6b2c714
+Create Date: 2026-03-27 09:41:18.204536
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e8c2d4f917'
+down_revision: Union[str, Sequence[str], None] = 'a9d3f6b2c714'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The BRIN index on usage_logs.timestamp cannot return rows in order, so keyset pages need a btree
+    op.create_index('ix_usage_logs_timestamp_id', 'usage_logs', ['timestamp', 'id'], unique=False)
+    op.create_index('ix_audit_logs_timestamp_id', 'audit_logs', ['timestamp', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_audit_logs_timestamp_id', table_name='audit_logs')
+    op.drop_index('ix_usage_logs_timestamp_id', table_name='usage_logs')
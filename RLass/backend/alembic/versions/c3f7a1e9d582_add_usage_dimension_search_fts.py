@@ -0,0 +1,48 @@
+"""Add FTS5 trigram search tables over the usage dimension values on SQLite
+
+Revision ID: c3f7a1e9d582
+Revises: b5e8c2d4f917
+Create Date: 2026-03-30 14:22:09.518734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f7a1e9d582'
+down_revision: Union[str, Sequence[str], None] = 'b5e8c2d4f917'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 7c4e1f9a2d36 dropped usage_logs_fts with the string columns; PostgreSQL got pg_trgm indexes on
+# these tables there, SQLite gets the equivalent FTS5 tables here
+SEARCH_TABLES = ('usage_endpoints', 'usage_identifiers', 'usage_api_keys')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table in SEARCH_TABLES:
+        fts = f'{table}_fts'
+        insert = f"INSERT INTO {fts} (rowid, value) VALUES (new.id, new.value);"
+        delete = f"INSERT INTO {fts} ({fts}, rowid, value) VALUES ('delete', old.id, old.value);"
+        op.execute(f"CREATE VIRTUAL TABLE {fts} USING fts5(value, content='{table}', content_rowid='id', tokenize='trigram')")
+        op.execute(f'CREATE TRIGGER {fts}_insert AFTER INSERT ON {table} BEGIN {insert} END')
+        op.execute(f'CREATE TRIGGER {fts}_delete AFTER DELETE ON {table} BEGIN {delete} END')
+        op.execute(f'CREATE TRIGGER {fts}_update AFTER UPDATE ON {table} BEGIN {delete} {insert} END')
+        # Index the values that already exist
+        op.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table in SEARCH_TABLES:
+        for trigger in ('insert', 'delete', 'update'):
+            op.execute(f'DROP TRIGGER IF EXISTS {table}_fts_{trigger}')
+        op.execute(f'DROP TABLE IF EXISTS {table}_fts')
@@ -0,0 +1,36 @@
+"""Add GCRA burst config and rate_limit_gcra_states table
+
+Revision ID: c47a0e93f5d1
+Revises: 8b2e4d6f1a37
+Create Date: 2026-01-26 09:08:55.402671
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c47a0e93f5d1'
+down_revision: Union[str, Sequence[str], None] = '8b2e4d6f1a37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('rate_limit_configs', sa.Column('burst', sa.Integer(), nullable=True))
+    op.create_table('rate_limit_gcra_states',
+    sa.Column('api_key', sa.String(), nullable=False),
+    sa.Column('identifier', sa.String(), nullable=False),
+    sa.Column('endpoint', sa.String(), nullable=False),
+    sa.Column('tat', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('api_key', 'identifier', 'endpoint')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('rate_limit_gcra_states')
+    op.drop_column('rate_limit_configs', 'burst')
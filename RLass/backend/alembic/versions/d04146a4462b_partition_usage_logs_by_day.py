@@ -0,0 +1,103 @@
+"""Partition usage_logs by day on timestamp (PostgreSQL)
+
+Revision ID: d04146a4462b
+Revises: c47a0e93f5d1
+Create Date: 2026-02-09 14:37:12.804519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd04146a4462b'
+down_revision: Union[str, Sequence[str], None] = 'c47a0e93f5d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXED_COLUMNS = ('api_key', 'customer_id', 'endpoint', 'id', 'identifier', 'timestamp')
+DAYS_AHEAD = 7
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        # Declarative partitioning is PostgreSQL only; other databases keep the plain table
+        return
+    legacy_columns = {c['name'] for c in sa.inspect(bind).get_columns('usage_logs')}
+    op.execute('ALTER TABLE usage_logs RENAME TO usage_logs_legacy')
+    op.execute('ALTER TABLE usage_logs_legacy RENAME CONSTRAINT usage_logs_pkey TO usage_logs_legacy_pkey')
+    for index in sa.inspect(bind).get_indexes('usage_logs_legacy'):
+        op.execute(f'ALTER INDEX {index["name"]} RENAME TO {index["name"].replace("usage_logs", "usage_logs_legacy", 1)}')
+    # The partition key has to be part of the primary key, and cannot be NULL
+    op.execute("""
+        CREATE TABLE usage_logs (
+            id VARCHAR NOT NULL,
+            api_key VARCHAR NOT NULL REFERENCES api_keys (key),
+            customer_id VARCHAR REFERENCES users (id),
+            endpoint VARCHAR,
+            identifier VARCHAR NOT NULL,
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            status VARCHAR NOT NULL,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    op.execute('CREATE TABLE usage_logs_default PARTITION OF usage_logs DEFAULT')
+    for column in INDEXED_COLUMNS:
+        op.create_index(f'ix_usage_logs_{column}', 'usage_logs', [column], unique=False)
+    # One partition per day that already has rows, plus the coming week
+    op.execute(f"""
+        DO $$
+        DECLARE day DATE;
+        BEGIN
+            FOR day IN
+                SELECT DISTINCT timestamp::date FROM usage_logs_legacy WHERE timestamp IS NOT NULL
+                UNION
+                SELECT generate_series(now()::date, now()::date + {DAYS_AHEAD}, interval '1 day')::date
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF usage_logs FOR VALUES FROM (%L) TO (%L)',
+                    'usage_logs_p' || to_char(day, 'YYYYMMDD'), day, day + 1
+                );
+            END LOOP;
+        END $$
+    """)
+    customer_id = 'l.customer_id' if 'customer_id' in legacy_columns else 'NULL'
+    op.execute(f"""
+        INSERT INTO usage_logs (id, api_key, customer_id, endpoint, identifier, timestamp, status)
+        SELECT l.id, l.api_key, COALESCE({customer_id}, k.user_id), l.endpoint, l.identifier,
+               COALESCE(l.timestamp, now() AT TIME ZONE 'utc'), l.status
+        FROM usage_logs_legacy l LEFT JOIN api_keys k ON k.key = l.api_key
+    """)
+    op.execute('DROP TABLE usage_logs_legacy')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+    op.execute('ALTER TABLE usage_logs RENAME TO usage_logs_partitioned')
+    op.create_table('usage_logs',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('api_key', sa.String(), nullable=False),
+    sa.Column('customer_id', sa.String(), nullable=True),
+    sa.Column('endpoint', sa.String(), nullable=True),
+    sa.Column('identifier', sa.String(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['api_key'], ['api_keys.key'], name='usage_logs_unpartitioned_api_key_fkey'),
+    sa.ForeignKeyConstraint(['customer_id'], ['users.id'], name='usage_logs_unpartitioned_customer_id_fkey'),
+    sa.PrimaryKeyConstraint('id', name='usage_logs_unpartitioned_pkey')
+    )
+    op.execute("""
+        INSERT INTO usage_logs (id, api_key, customer_id, endpoint, identifier, timestamp, status)
+        SELECT id, api_key, customer_id, endpoint, identifier, timestamp, status FROM usage_logs_partitioned
+    """)
+    # Dropping the parent drops every partition and its indexes
+    op.execute('DROP TABLE usage_logs_partitioned')
+    for column in INDEXED_COLUMNS:
+        op.create_index(f'ix_usage_logs_{column}', 'usage_logs', [column], unique=False)
@@ -0,0 +1,37 @@
+"""Add composite and BRIN indexes on usage_logs
+
+Revision ID: dd2a8f73cdce
+Revises: d04146a4462b
+Create Date: 2026-02-16 11:02:27.613904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'dd2a8f73cdce'
+down_revision: Union[str, Sequence[str], None] = 'd04146a4462b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_usage_logs_api_key_identifier_endpoint_timestamp', 'usage_logs', ['api_key', 'identifier', 'endpoint', 'timestamp'], unique=False)
+    op.create_index('ix_usage_logs_api_key_timestamp_status', 'usage_logs', ['api_key', 'timestamp', 'status'], unique=False)
+    op.create_index('ix_usage_logs_timestamp_brin', 'usage_logs', ['timestamp'], unique=False, postgresql_using='brin')
+    if op.get_bind().dialect.name == 'postgresql':
+        # The BRIN index replaces the btree on timestamp added with partitioning
+        op.execute('DROP INDEX IF EXISTS ix_usage_logs_timestamp')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE INDEX IF NOT EXISTS ix_usage_logs_timestamp ON usage_logs (timestamp)')
+    op.drop_index('ix_usage_logs_timestamp_brin', table_name='usage_logs')
+    op.drop_index('ix_usage_logs_api_key_timestamp_status', table_name='usage_logs')
+    op.drop_index('ix_usage_logs_api_key_identifier_endpoint_timestamp', table_name='usage_logs')
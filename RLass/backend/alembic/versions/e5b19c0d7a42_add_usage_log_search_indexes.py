@@ -0,0 +1,65 @@
+"""Add substring search indexes on usage_logs (pg_trgm on PostgreSQL, FTS5 on SQLite)
+
+Revision ID: e5b19c0d7a42
+Revises: dd2a8f73cdce
+Create Date: 2026-02-23 09:48:51.207316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b19c0d7a42'
+down_revision: Union[str, Sequence[str], None] = 'dd2a8f73cdce'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_COLUMNS = ('endpoint', 'identifier', 'api_key')
+FTS_COLUMNS = ', '.join(SEARCH_COLUMNS)
+NEW_VALUES = ', '.join(f'new.{column}' for column in SEARCH_COLUMNS)
+OLD_VALUES = ', '.join(f'old.{column}' for column in SEARCH_COLUMNS)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for column in SEARCH_COLUMNS:
+            op.create_index(f'ix_usage_logs_{column}_trgm', 'usage_logs', [column], unique=False,
+                            postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'})
+    elif dialect == 'sqlite':
+        op.execute(f"CREATE VIRTUAL TABLE usage_logs_fts USING fts5({FTS_COLUMNS}, content='usage_logs', content_rowid='rowid', tokenize='trigram')")
+        op.execute(f"""
+            CREATE TRIGGER usage_logs_fts_insert AFTER INSERT ON usage_logs BEGIN
+                INSERT INTO usage_logs_fts (rowid, {FTS_COLUMNS}) VALUES (new.rowid, {NEW_VALUES});
+            END
+        """)
+        op.execute(f"""
+            CREATE TRIGGER usage_logs_fts_delete AFTER DELETE ON usage_logs BEGIN
+                INSERT INTO usage_logs_fts (usage_logs_fts, rowid, {FTS_COLUMNS}) VALUES ('delete', old.rowid, {OLD_VALUES});
+            END
+        """)
+        op.execute(f"""
+            CREATE TRIGGER usage_logs_fts_update AFTER UPDATE ON usage_logs BEGIN
+                INSERT INTO usage_logs_fts (usage_logs_fts, rowid, {FTS_COLUMNS}) VALUES ('delete', old.rowid, {OLD_VALUES});
+                INSERT INTO usage_logs_fts (rowid, {FTS_COLUMNS}) VALUES (new.rowid, {NEW_VALUES});
+            END
+        """)
+        # Index the rows that already exist
+        op.execute("INSERT INTO usage_logs_fts (usage_logs_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for column in SEARCH_COLUMNS:
+            op.drop_index(f'ix_usage_logs_{column}_trgm', table_name='usage_logs')
+    elif dialect == 'sqlite':
+        for trigger in ('insert', 'delete', 'update'):
+            op.execute(f'DROP TRIGGER IF EXISTS usage_logs_fts_{trigger}')
+        op.execute('DROP TABLE IF EXISTS usage_logs_fts')
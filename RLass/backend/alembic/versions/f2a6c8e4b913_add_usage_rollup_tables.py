@@ -0,0 +1,53 @@
+"""Add minute, hour and day usage rollup tables
+
+Revision ID: f2a6c8e4b913
+Revises: e5b19c0d7a42
+Create Date: 2026-03-02 10:15:06.448120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a6c8e4b913'
+down_revision: Union[str, Sequence[str], None] = 'e5b19c0d7a42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+RESOLUTIONS = ('minute', 'hour', 'day')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for resolution in RESOLUTIONS:
+        table = f'usage_rollup_{resolution}'
+        op.create_table(table,
+        sa.Column('bucket', sa.DateTime(), nullable=False),
+        sa.Column('api_key', sa.String(), nullable=False),
+        sa.Column('endpoint', sa.String(), nullable=False),
+        sa.Column('identifier', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('count', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('bucket', 'api_key', 'endpoint', 'identifier', 'status')
+        )
+        op.create_index(f'ix_{table}_api_key_bucket', table, ['api_key', 'bucket'], unique=False)
+        op.create_index(f'ix_{table}_identifier_bucket', table, ['identifier', 'bucket'], unique=False)
+    # No watermark row yet: the first refresh rolls up from the oldest usage log
+    op.create_table('usage_rollup_watermarks',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('position', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('usage_rollup_watermarks')
+    for resolution in reversed(RESOLUTIONS):
+        table = f'usage_rollup_{resolution}'
+        op.drop_index(f'ix_{table}_identifier_bucket', table_name=table)
+        op.drop_index(f'ix_{table}_api_key_bucket', table_name=table)
+        op.drop_table(table)
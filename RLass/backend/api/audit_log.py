@@ -1,13 +1,44 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from ..services.audit import get_audit_events
+from ..services.audit import get_audit_events, get_audit_events_page
 from ..schemas.audit_log import AuditLogQuery, AuditLogRead
 from ..database import get_db
-from ..utils.response import success_response
+from ..utils.response import success_response, error_response
+from ..utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from typing import Optional
 
 router = APIRouter()
 
+@router.get("/logs")
+def list_audit_logs(
+    actor_id: Optional[str] = Query(None),
+    action: Optional[str] = Query(None),
+    target: Optional[str] = Query(None),
+    from_time: Optional[str] = Query(None),
+    to_time: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """
+    List audit logs one page at a time, newest first. Pass next_cursor to get the next page.
+    """
+    query = AuditLogQuery(
+        actor_id=actor_id,
+        action=action,
+        target=target,
+        from_time=from_time,
+        to_time=to_time
+    )
+    try:
+        logs, next_cursor = get_audit_events_page(db, query, limit, cursor)
+    except ValueError as e:
+        return error_response(message=str(e), status_code=400)
+    return success_response({
+        "logs": [AuditLogRead.model_validate(log).model_dump(mode="json") for log in logs],
+        "next_cursor": next_cursor
+    })
+
 @router.get("/logs/export")
 def export_audit_logs(
     actor_id: Optional[str] = Query(None),
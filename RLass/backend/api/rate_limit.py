@@ -1,22 +1,26 @@
 
-from fastapi import APIRouter, HTTPException, status, Depends
-from ..schemas.check import CheckRequest, CheckResponse
-from ..schemas.rate_limit import RateLimitConfigCreate, RateLimitConfigRead
-from ..services.rate_limiter import check_and_log_rate_limit, summarize_usage_for_api_key, get_rate_limit_config
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from ..schemas.check import CheckRequest, CheckBatchRequest, CheckResponse
+from ..schemas.rate_limit import RateLimitAlgorithm, RateLimitConfigCreate, RateLimitConfigRead
+from ..services.rate_limiter import get_async_rate_limiter, summarize_usage_for_api_key
 from ..crud import rate_limit as crud_rate_limit
 from ..utils.response import success_response, error_response
 from sqlalchemy.orm import Session
-from ..database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_db, get_async_db
+from typing import List, Optional
 
 router = APIRouter()
 
 @router.post("/check", response_model=CheckResponse)
-def check_rate_limit_endpoint(request: CheckRequest, db: Session = Depends(get_db)):
-    # Use dynamic config from DB
-    config = get_rate_limit_config(db, request.api_key, request.endpoint)
+async def check_rate_limit_endpoint(request: CheckRequest, db: AsyncSession = Depends(get_async_db)):
+    # Async end to end: no threadpool hop. The config comes from the worker's in-memory index
+    # and is resolved once for the check.
+    limiter = get_async_rate_limiter(db)
+    config = await limiter.aresolve_config(request.api_key, request.endpoint)
     if not config:
         return error_response(message="No rate limit config found.", status_code=status.HTTP_404_NOT_FOUND)
-    allowed, remaining, reset = check_and_log_rate_limit(db, request.api_key, request.identifier, request.endpoint)
+    allowed, remaining, reset = await limiter.acheck_and_log_rate_limit(request.api_key, request.identifier, request.endpoint, config=config)
     if allowed:
         return success_response({
             "allowed": True,
@@ -34,6 +38,38 @@ def check_rate_limit_endpoint(request: CheckRequest, db: Session = Depends(get_d
             }
         )
 
+@router.post("/check/batch", response_model=List[CheckResponse])
+async def check_rate_limit_batch_endpoint(requests: CheckBatchRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Check up to MAX_BATCH_CHECKS identifiers in one call. Results are returned in request order;
+    configs are resolved once per (api_key, endpoint), and counters are updated in one
+    transaction with one upsert per distinct counter. The call itself answers 200; each
+    item's `status` is what /check would answer for it: 200 allowed, 429 rate limited, or
+    404 when no config exists for its api_key and endpoint.
+    """
+    limiter = get_async_rate_limiter(db)
+    results = await limiter.acheck_and_log_rate_limits([(r.api_key, r.identifier, r.endpoint) for r in requests])
+    responses = []
+    for result in results:
+        if result is None:
+            responses.append({
+                "allowed": False,
+                "remaining": 0,
+                "reset": 0,
+                "message": "No rate limit config found.",
+                "status": status.HTTP_404_NOT_FOUND
+            })
+            continue
+        allowed, remaining, reset = result
+        responses.append({
+            "allowed": allowed,
+            "remaining": remaining,
+            "reset": reset,
+            "message": None if allowed else "Rate limit exceeded.",
+            "status": status.HTTP_200_OK if allowed else status.HTTP_429_TOO_MANY_REQUESTS
+        })
+    return success_response(responses)
+
 @router.get("/usage/summary/{api_key}")
 def get_usage_summary(api_key: str, endpoint: str = None, db: Session = Depends(get_db)):
     """
@@ -51,11 +87,12 @@ def get_rate_limit_configs(api_key: str, db: Session = Depends(get_db)):
     return configs
 
 @router.put("/rate-limit/config/{api_key}", response_model=RateLimitConfigRead)
-def update_rate_limit_config(api_key: str, endpoint: str, limit: int, period_seconds: int, db: Session = Depends(get_db)):
+def update_rate_limit_config(api_key: str, endpoint: str, limit: int, period_seconds: int, algorithm: Optional[RateLimitAlgorithm] = None, burst: int = Query(None, ge=1), usage_sample_rate: int = Query(None, ge=1), db: Session = Depends(get_db)):
     """
-    Dynamic adjustment: Update rate limit config for an API key and endpoint.
+    Dynamic adjustment: Update rate limit config (and optionally its algorithm, burst and usage
+    log sample rate) for an API key and endpoint.
     """
-    config = crud_rate_limit.update_rate_limit(db, api_key, endpoint, limit, period_seconds)
+    config = crud_rate_limit.update_rate_limit(db, api_key, endpoint, limit, period_seconds, algorithm, burst, usage_sample_rate)
     if not config:
         raise HTTPException(status_code=404, detail="Rate limit config not found.")
     return config
@@ -1,20 +1,199 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from ..services.usage_logger import log_usage_event, get_usage_events, delete_usage_events, count_usage_events, summarize_usage
+from starlette.background import BackgroundTask
+import os
+import tempfile
+from ..services import usage_logger
+from ..services.usage_logger import log_usage_event, get_usage_events_filtered, search_usage_logs, delete_usage_events, count_usage_events, summarize_usage, bulk_load_usage_events, NDJSONUsageDecoder, stream_usage_logs_export, write_usage_logs_parquet
 from ..schemas.usage_log import UsageLogQuery
+from ..models.usage_log import USAGE_LOG_FIELDS
+from ..utils.response import success_response, error_response
+from ..utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from ..database import get_db
-from typing import Optional
+from typing import List, Optional
 
 router = APIRouter()
 
 @router.post("/log")
 def log_event(api_key: str, endpoint: Optional[str], identifier: str, status: str, db: Session = Depends(get_db)):
-    return log_usage_event(db, api_key, endpoint, identifier, status)
+    # With the local event log enabled, an event is kept there (null response) while the database is unreachable
+    try:
+        return log_usage_event(db, api_key, endpoint, identifier, status, fallback=usage_logger.usage_event_log)
+    except IntegrityError as e:
+        return error_response(message=f"Usage event rejected: {e.orig}", status_code=400)
+
+@router.post("/ingest")
+async def ingest_events(request: Request, chunk_size: int = Query(1000, ge=1, le=50000), db: Session = Depends(get_db)):
+    """
+    Bulk ingestion of usage events as NDJSON (one JSON event per line), gzip-compressed when
+    sent with Content-Encoding: gzip. The body is decoded as it streams in; every `chunk_size`
+    valid events are inserted and committed together. The response lists each committed chunk
+    with its line range, accepted count and rejected lines. While the database is unreachable,
+    chunks are accepted into the local event log when that is enabled (USAGE_EVENT_LOG_DIR).
+    Otherwise, if a chunk fails, the chunks before it are committed and the client should
+    resend from the failed chunk's first line (after fixing it, if the database rejected it:
+    400 response).
+    """
+    decoder = NDJSONUsageDecoder(gzipped=request.headers.get("content-encoding", "").lower() == "gzip")
+    chunks = []
+    pending = {"first_line": None, "events": [], "rejected": []}
+
+    async def commit_chunk():
+        events, rejected = pending["events"], pending["rejected"]
+        loaded = await run_in_threadpool(bulk_load_usage_events, db, events, fallback=usage_logger.usage_event_log) if events else 0
+        chunks.append({
+            "chunk": len(chunks),
+            "first_line": pending["first_line"],
+            "last_line": decoder.line_number,
+            "accepted": loaded,
+            "rejected": rejected
+        })
+        pending.update(first_line=None, events=[], rejected=[])
+
+    def summary(**extra):
+        return {
+            "accepted": sum(c["accepted"] for c in chunks),
+            "rejected": sum(len(c["rejected"]) for c in chunks),
+            "chunks": chunks,
+            **extra
+        }
+
+    async def take(parsed):
+        for line_number, event, error in parsed:
+            if pending["first_line"] is None:
+                pending["first_line"] = line_number
+            if error:
+                pending["rejected"].append({"line": line_number, "error": error})
+                continue
+            pending["events"].append(event)
+            if len(pending["events"]) >= chunk_size:
+                await commit_chunk()
+
+    try:
+        async for data in request.stream():
+            await take(decoder.feed(data))
+        await take(decoder.close())
+        if pending["first_line"] is not None:
+            await commit_chunk()
+    except ValueError as e:
+        return error_response(
+            message=str(e),
+            status_code=status.HTTP_400_BAD_REQUEST,
+            data=summary(retry_from_line=pending["first_line"] or decoder.line_number + 1)
+        )
+    except IntegrityError as e:
+        return error_response(
+            message=f"Chunk rejected by the database: {e.orig}",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            data=summary(retry_from_line=pending["first_line"])
+        )
+    except Exception as e:
+        return error_response(
+            message=f"Failed to store chunk: {e}",
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            data=summary(retry_from_line=pending["first_line"])
+        )
+    return success_response(summary())
 
 @router.get("/events")
-def usage_events(api_key: Optional[str] = None, endpoint: Optional[str] = None, identifier: Optional[str] = None, from_time: Optional[str] = None, to_time: Optional[str] = None, db: Session = Depends(get_db)):
+def usage_events(
+    api_key: Optional[str] = None,
+    endpoint: Optional[str] = None,
+    identifier: Optional[str] = None,
+    from_time: Optional[str] = None,
+    to_time: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    estimate_total: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    One page of usage events, newest first. Pass the returned next_cursor to get the next page.
+    With estimate_total, the response includes the planner's estimate of matching rows.
+    """
     query = UsageLogQuery(api_key=api_key, endpoint=endpoint, identifier=identifier, from_time=from_time, to_time=to_time)
-    return get_usage_events(db, query)
+    try:
+        page = get_usage_events_filtered(
+            db, api_key=query.api_key, endpoint=query.endpoint, identifier=query.identifier,
+            start_time=query.from_time, end_time=query.to_time, limit=limit, cursor=cursor,
+            estimate_total=estimate_total
+        )
+    except ValueError as e:
+        return error_response(message=str(e), status_code=status.HTTP_400_BAD_REQUEST)
+    # Public fields only: related keys/users are not loaded for listings
+    page["logs"] = [jsonable_encoder({f: getattr(log, f) for f in USAGE_LOG_FIELDS}) for log in page["logs"]]
+    return success_response(page)
+
+@router.get("/search")
+def search_events(
+    q: str = Query(..., min_length=3),
+    field: Optional[List[str]] = Query(None),
+    from_time: Optional[str] = None,
+    to_time: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Substring search over endpoint, identifier and api_key (or the given fields), newest
+    first and paginated like /events. Matches the distinct values of each field, then the logs by id.
+    """
+    query = UsageLogQuery(from_time=from_time, to_time=to_time)
+    try:
+        page = search_usage_logs(
+            db, q, field or ['endpoint', 'identifier', 'api_key'], limit=limit, cursor=cursor,
+            start_time=query.from_time, end_time=query.to_time
+        )
+    except ValueError as e:
+        return error_response(message=str(e), status_code=status.HTTP_400_BAD_REQUEST)
+    page["logs"] = [jsonable_encoder({f: getattr(log, f) for f in USAGE_LOG_FIELDS}) for log in page["logs"]]
+    return success_response(page)
+
+@router.get("/export")
+def export_events(
+    format: str = Query("csv", pattern="^(csv|ndjson|parquet)$"),
+    api_key: Optional[str] = None,
+    customer_id: Optional[str] = None,
+    endpoint: Optional[str] = None,
+    identifier: Optional[str] = None,
+    from_time: Optional[str] = None,
+    to_time: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_db)
+):
+    """
+    Export matching usage events as CSV or NDJSON, streamed in chunks as rows are read, or as
+    a zstd-compressed Parquet file (written to a temporary file, then sent and removed).
+    """
+    query = UsageLogQuery(api_key=api_key, customer_id=customer_id, endpoint=endpoint, identifier=identifier, from_time=from_time, to_time=to_time)
+    if format == "parquet":
+        fd, path = tempfile.mkstemp(suffix=".parquet")
+        os.close(fd)
+        try:
+            write_usage_logs_parquet(db, path, query, limit=limit)
+        except RuntimeError as e:
+            os.unlink(path)
+            raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(e))
+        except Exception:
+            os.unlink(path)
+            raise
+        return FileResponse(
+            path,
+            media_type="application/vnd.apache.parquet",
+            filename="usage_logs.parquet",
+            background=BackgroundTask(os.unlink, path)
+        )
+    chunks = stream_usage_logs_export(db, format, query, limit=limit)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=usage_logs.{format}"}
+    )
 
 @router.delete("/events")
 def delete_events(api_key: Optional[str] = None, identifier: Optional[str] = None, before: Optional[str] = None, db: Session = Depends(get_db)):
@@ -39,6 +39,15 @@ def revoke_api_key(db: Session, key: str) -> bool:
         return True
     return False
 
+def delete_api_key(db: Session, key: str) -> bool:
+    """Delete an API key, its rate limit configs and its usage logs from the database."""
+    api_key = db.query(APIKey).filter(APIKey.key == key).first()
+    if api_key:
+        db.delete(api_key)
+        db.commit()
+        return True
+    return False
+
 def list_api_keys(db: Session, user_id: Optional[str] = None) -> List[APIKey]:
     """List all API keys, optionally filtered by user_id, from the database."""
     query = db.query(APIKey).options(
@@ -2,10 +2,10 @@
 from datetime import UTC
 from sqlalchemy.orm import Session, joinedload
 from ..models.audit_log import AuditLog
+from ..utils.ids import new_id
 from ..schemas.audit_log import AuditLogQuery
 from datetime import datetime
 from typing import Optional, List
-import uuid
 
 def log_action(
     db: Session,
@@ -21,7 +21,7 @@ def log_action(
     Log an audit action to the database, with security insights.
     """
     entry = AuditLog(
-        id=str(uuid.uuid4()),
+        id=new_id(),
         action=action,
         actor_id=actor_id,
         target=target,
@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from ..models.auth import AuthToken
 from ..schemas.auth import AuthTokenCreate
+from ..utils.batch_delete import chunked_delete
 from typing import Optional
 from datetime import datetime, UTC
 
@@ -24,6 +25,4 @@ def deactivate_auth_token(db: Session, token: str) -> Optional[AuthToken]:
 
 def delete_expired_tokens(db: Session) -> int:
     now = datetime.now(UTC)
-    deleted = db.query(AuthToken).filter(AuthToken.expires_at < now).delete()
-    db.commit()
-    return deleted
+    return chunked_delete(db, db.query(AuthToken).filter(AuthToken.expires_at < now)).deleted
@@ -1,7 +1,18 @@
 from sqlalchemy.orm import Session, joinedload
-from ..models.rate_limit import RateLimitConfig
+from sqlalchemy import case, select, delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.rate_limit import RateLimitConfig, RateLimitCounter, RateLimitGCRAState
 from ..schemas.rate_limit import RateLimitConfigCreate
-from typing import Optional, List
+from ..utils.batch_delete import chunked_delete
+from typing import Optional, List, Callable, Tuple
+
+# Callbacks run with the session after any config is created, updated or deleted
+# (the rate limiter registers its config index rebuild here)
+config_change_listeners: List[Callable[[Session], object]] = []
+
+def _notify_config_change(db: Session) -> None:
+    for listener in config_change_listeners:
+        listener(db)
 
 def create_rate_limit(db: Session, config_in: RateLimitConfigCreate) -> RateLimitConfig:
     """Create and store a new rate limit configuration in the database."""
@@ -16,11 +27,15 @@ def create_rate_limit(db: Session, config_in: RateLimitConfigCreate) -> RateLimi
         customer_id=customer_id,
         endpoint=config_in.endpoint,
         limit=config_in.limit,
-        period_seconds=config_in.period_seconds
+        period_seconds=config_in.period_seconds,
+        algorithm=config_in.algorithm,
+        burst=config_in.burst,
+        usage_sample_rate=config_in.usage_sample_rate
     )
     db.add(db_config)
     db.commit()
     db.refresh(db_config)
+    _notify_config_change(db)
     return db_config
 
 def get_rate_limit(db: Session, api_key: str, endpoint: Optional[str] = None, customer_id: Optional[str] = None) -> Optional[RateLimitConfig]:
@@ -36,7 +51,7 @@ def get_rate_limit(db: Session, api_key: str, endpoint: Optional[str] = None, cu
         q = q.filter(RateLimitConfig.endpoint.is_(None))
     return q.first()
 
-def update_rate_limit(db: Session, api_key: str, endpoint: Optional[str], limit: int, period_seconds: int) -> Optional[RateLimitConfig]:
+def update_rate_limit(db: Session, api_key: str, endpoint: Optional[str], limit: int, period_seconds: int, algorithm: Optional[str] = None, burst: Optional[int] = None, usage_sample_rate: Optional[int] = None) -> Optional[RateLimitConfig]:
     """Update an existing rate limit configuration in the database."""
     q = db.query(RateLimitConfig).filter(RateLimitConfig.api_key == api_key)
     if endpoint:
@@ -47,8 +62,15 @@ def update_rate_limit(db: Session, api_key: str, endpoint: Optional[str], limit:
     if config:
         config.limit = limit
         config.period_seconds = period_seconds
+        if algorithm:
+            config.algorithm = algorithm
+        if burst is not None:
+            config.burst = burst
+        if usage_sample_rate is not None:
+            config.usage_sample_rate = usage_sample_rate
         db.commit()
         db.refresh(config)
+        _notify_config_change(db)
         return config
     return None
 
@@ -63,6 +85,7 @@ def delete_rate_limit(db: Session, api_key: str, endpoint: Optional[str] = None)
     if config:
         db.delete(config)
         db.commit()
+        _notify_config_change(db)
         return True
     return False
 
@@ -76,3 +99,245 @@ def list_rate_limits(db: Session, api_key: Optional[str] = None, customer_id: Op
     if customer_id:
         query = query.filter(RateLimitConfig.customer_id == customer_id)
     return query.all()
+
+
+def _dialect_insert(db: Session):
+    """Return the dialect-specific insert() that supports ON CONFLICT upserts."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+def _window_counter_upsert(db, api_key: str, identifier: str, endpoint: Optional[str], window_start: int, limit: int, amount: int = 1):
+    insert = _dialect_insert(db)
+    stmt = insert(RateLimitCounter).values(
+        api_key=api_key,
+        identifier=identifier,
+        endpoint=endpoint or "",
+        window_start=window_start,
+        count=amount
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[
+            RateLimitCounter.api_key,
+            RateLimitCounter.identifier,
+            RateLimitCounter.endpoint,
+            RateLimitCounter.window_start
+        ],
+        set_={"count": RateLimitCounter.count + amount},
+        where=RateLimitCounter.count + amount <= limit
+    ).returning(RateLimitCounter.count)
+
+def _window_count_select(api_key: str, identifier: str, endpoint: Optional[str], window_start: int):
+    return select(RateLimitCounter.count).where(
+        RateLimitCounter.api_key == api_key,
+        RateLimitCounter.identifier == identifier,
+        RateLimitCounter.endpoint == (endpoint or ""),
+        RateLimitCounter.window_start == window_start
+    )
+
+def _window_counter_release(api_key: str, identifier: str, endpoint: Optional[str], window_start: int, amount: int):
+    return update(RateLimitCounter).where(
+        RateLimitCounter.api_key == api_key,
+        RateLimitCounter.identifier == identifier,
+        RateLimitCounter.endpoint == (endpoint or ""),
+        RateLimitCounter.window_start == window_start
+    ).values(count=RateLimitCounter.count - amount)
+
+def _window_counters_delete(api_key: Optional[str], endpoint: Optional[str], before: Optional[int]):
+    stmt = delete(RateLimitCounter)
+    if api_key:
+        stmt = stmt.where(RateLimitCounter.api_key == api_key)
+    if endpoint:
+        stmt = stmt.where(RateLimitCounter.endpoint == endpoint)
+    if before is not None:
+        stmt = stmt.where(RateLimitCounter.window_start < before)
+    return stmt
+
+def _gcra_upsert(db, api_key: str, identifier: str, endpoint: Optional[str], now: float, emission_interval: float, burst_tolerance: float):
+    insert = _dialect_insert(db)
+    base_tat = case((RateLimitGCRAState.tat > now, RateLimitGCRAState.tat), else_=now)
+    stmt = insert(RateLimitGCRAState).values(
+        api_key=api_key,
+        identifier=identifier,
+        endpoint=endpoint or "",
+        tat=now + emission_interval
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[
+            RateLimitGCRAState.api_key,
+            RateLimitGCRAState.identifier,
+            RateLimitGCRAState.endpoint
+        ],
+        set_={"tat": base_tat + emission_interval},
+        where=base_tat + emission_interval - now <= burst_tolerance
+    ).returning(RateLimitGCRAState.tat)
+
+def _gcra_tat_select(api_key: str, identifier: str, endpoint: Optional[str]):
+    return select(RateLimitGCRAState.tat).where(
+        RateLimitGCRAState.api_key == api_key,
+        RateLimitGCRAState.identifier == identifier,
+        RateLimitGCRAState.endpoint == (endpoint or "")
+    )
+
+def _gcra_states_delete(api_key: str, endpoint: Optional[str]):
+    stmt = delete(RateLimitGCRAState).where(RateLimitGCRAState.api_key == api_key)
+    if endpoint:
+        stmt = stmt.where(RateLimitGCRAState.endpoint == endpoint)
+    return stmt
+
+def increment_window_counter(db: Session, api_key: str, identifier: str, endpoint: Optional[str], window_start: int, limit: int, commit: bool = True) -> Optional[int]:
+    """
+    Atomically add one hit to the counter for a rate limit window, unless it already reached `limit`.
+    Returns the new count, or None if the window is full. Costs a single indexed upsert.
+    Pass commit=False to leave the transaction open, e.g. to commit a batch of checks at once.
+    """
+    if limit <= 0:
+        return None
+    count = db.execute(_window_counter_upsert(db, api_key, identifier, endpoint, window_start, limit)).scalar()
+    if commit:
+        db.commit()
+    return count
+
+def get_window_count(db: Session, api_key: str, identifier: str, endpoint: Optional[str], window_start: int) -> int:
+    """Return the hit count stored for a rate limit window (0 if the window has no counter)."""
+    return db.execute(_window_count_select(api_key, identifier, endpoint, window_start)).scalar() or 0
+
+def reserve_window_quota(db: Session, api_key: str, identifier: str, endpoint: Optional[str], window_start: int, limit: int, amount: int, commit: bool = True) -> Tuple[int, int]:
+    """
+    Atomically take up to `amount` hits from a rate limit window in one go, never taking the
+    counter past `limit`. Returns (granted, count): how many hits were reserved and the
+    counter value afterwards. `granted` is 0 once the window is full.
+    """
+    # A new window's counter is inserted without the limit check, so never ask for more than the limit
+    granted, count, amount = 0, None, min(amount, limit)
+    while amount > 0:
+        count = db.execute(_window_counter_upsert(db, api_key, identifier, endpoint, window_start, limit, amount)).scalar()
+        if count is not None:
+            granted = amount
+            break
+        # Not enough left for the whole amount: shrink it to what the window still has and retry
+        count = get_window_count(db, api_key, identifier, endpoint, window_start)
+        amount = min(amount, limit - count)
+    if commit:
+        db.commit()
+    return granted, count if count is not None else get_window_count(db, api_key, identifier, endpoint, window_start)
+
+def release_window_quota(db: Session, api_key: str, identifier: str, endpoint: Optional[str], window_start: int, amount: int, commit: bool = True) -> None:
+    """Give back `amount` reserved but unused hits to a rate limit window."""
+    db.execute(_window_counter_release(api_key, identifier, endpoint, window_start, amount))
+    if commit:
+        db.commit()
+
+def delete_window_counters(db: Session, api_key: Optional[str] = None, endpoint: Optional[str] = None, before: Optional[int] = None) -> int:
+    """Delete window counters for an API key (optionally one endpoint), or all windows that started before `before`."""
+    count = db.execute(_window_counters_delete(api_key, endpoint, before)).rowcount
+    db.commit()
+    return count
+
+def delete_expired_window_counters(db: Session, before: int, batch_size: int = 5000) -> int:
+    """Delete, in primary-key batches, every window counter whose window started before `before`."""
+    q = db.query(RateLimitCounter).filter(RateLimitCounter.window_start < before)
+    return chunked_delete(db, q, batch_size=batch_size).deleted
+
+def advance_gcra_state(db: Session, api_key: str, identifier: str, endpoint: Optional[str], now: float, emission_interval: float, burst_tolerance: float, commit: bool = True) -> Optional[float]:
+    """
+    Atomically advance the GCRA theoretical arrival time (TAT) by one emission interval,
+    unless that would put it more than `burst_tolerance` seconds ahead of `now`.
+    Returns the new TAT, or None if the request must be rejected.
+    """
+    if emission_interval > burst_tolerance:
+        return None
+    tat = db.execute(_gcra_upsert(db, api_key, identifier, endpoint, now, emission_interval, burst_tolerance)).scalar()
+    if commit:
+        db.commit()
+    return tat
+
+def get_gcra_tat(db: Session, api_key: str, identifier: str, endpoint: Optional[str]) -> Optional[float]:
+    """Return the stored GCRA theoretical arrival time, if any."""
+    return db.execute(_gcra_tat_select(api_key, identifier, endpoint)).scalar()
+
+def delete_gcra_states(db: Session, api_key: str, endpoint: Optional[str] = None) -> int:
+    """Delete GCRA state for an API key (optionally one endpoint)."""
+    count = db.execute(_gcra_states_delete(api_key, endpoint)).rowcount
+    db.commit()
+    return count
+
+
+def delete_elapsed_gcra_states(db: Session, now: float, batch_size: int = 5000) -> int:
+    """Delete, in primary-key batches, every GCRA state whose TAT has passed (a full bucket needs no row)."""
+    q = db.query(RateLimitGCRAState).filter(RateLimitGCRAState.tat <= now)
+    return chunked_delete(db, q, batch_size=batch_size).deleted
+
+
+# Async variants for AsyncSession, used by the async check path
+
+async def alist_rate_limits(db: AsyncSession) -> List[RateLimitConfig]:
+    """List every rate limit configuration."""
+    result = await db.execute(select(RateLimitConfig))
+    return list(result.scalars().all())
+
+async def aincrement_window_counter(db: AsyncSession, api_key: str, identifier: str, endpoint: Optional[str], window_start: int, limit: int, commit: bool = True) -> Optional[int]:
+    """Async version of increment_window_counter."""
+    if limit <= 0:
+        return None
+    result = await db.execute(_window_counter_upsert(db, api_key, identifier, endpoint, window_start, limit))
+    count = result.scalar()
+    if commit:
+        await db.commit()
+    return count
+
+async def aget_window_count(db: AsyncSession, api_key: str, identifier: str, endpoint: Optional[str], window_start: int) -> int:
+    """Async version of get_window_count."""
+    result = await db.execute(_window_count_select(api_key, identifier, endpoint, window_start))
+    return result.scalar() or 0
+
+async def areserve_window_quota(db: AsyncSession, api_key: str, identifier: str, endpoint: Optional[str], window_start: int, limit: int, amount: int, commit: bool = True) -> Tuple[int, int]:
+    """Async version of reserve_window_quota."""
+    granted, count, amount = 0, None, min(amount, limit)
+    while amount > 0:
+        count = (await db.execute(_window_counter_upsert(db, api_key, identifier, endpoint, window_start, limit, amount))).scalar()
+        if count is not None:
+            granted = amount
+            break
+        count = await aget_window_count(db, api_key, identifier, endpoint, window_start)
+        amount = min(amount, limit - count)
+    if count is None:
+        count = await aget_window_count(db, api_key, identifier, endpoint, window_start)
+    if commit:
+        await db.commit()
+    return granted, count
+
+async def arelease_window_quota(db: AsyncSession, api_key: str, identifier: str, endpoint: Optional[str], window_start: int, amount: int, commit: bool = True) -> None:
+    """Async version of release_window_quota."""
+    await db.execute(_window_counter_release(api_key, identifier, endpoint, window_start, amount))
+    if commit:
+        await db.commit()
+
+async def adelete_window_counters(db: AsyncSession, api_key: Optional[str] = None, endpoint: Optional[str] = None, before: Optional[int] = None) -> int:
+    """Async version of delete_window_counters."""
+    result = await db.execute(_window_counters_delete(api_key, endpoint, before))
+    await db.commit()
+    return result.rowcount
+
+async def aadvance_gcra_state(db: AsyncSession, api_key: str, identifier: str, endpoint: Optional[str], now: float, emission_interval: float, burst_tolerance: float, commit: bool = True) -> Optional[float]:
+    """Async version of advance_gcra_state."""
+    if emission_interval > burst_tolerance:
+        return None
+    result = await db.execute(_gcra_upsert(db, api_key, identifier, endpoint, now, emission_interval, burst_tolerance))
+    tat = result.scalar()
+    if commit:
+        await db.commit()
+    return tat
+
+async def aget_gcra_tat(db: AsyncSession, api_key: str, identifier: str, endpoint: Optional[str]) -> Optional[float]:
+    """Async version of get_gcra_tat."""
+    result = await db.execute(_gcra_tat_select(api_key, identifier, endpoint))
+    return result.scalar()
+
+async def adelete_gcra_states(db: AsyncSession, api_key: str, endpoint: Optional[str] = None) -> int:
+    """Async version of delete_gcra_states."""
+    result = await db.execute(_gcra_states_delete(api_key, endpoint))
+    await db.commit()
+    return result.rowcount
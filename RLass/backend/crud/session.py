@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session as DBSession
 from ..models.session import Session
 from ..schemas.session import SessionCreate
+from ..utils.batch_delete import chunked_delete
 from typing import Optional, List
 import datetime
 
@@ -30,6 +31,4 @@ def deactivate_session(db: DBSession, session_token: str) -> Optional[Session]:
 
 def delete_expired_sessions(db: DBSession) -> int:
     now = datetime.datetime.now(datetime.UTC)
-    deleted = db.query(Session).filter(Session.expires_at < now).delete()
-    db.commit()
-    return deleted
+    return chunked_delete(db, db.query(Session).filter(Session.expires_at < now)).deleted
@@ -0,0 +1,148 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+from sqlalchemy import event, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from ..models.usage_dimension import USAGE_DIMENSIONS
+from ..models.usage_log import UsageLog
+
+# session.info key for ids created by the session's open transaction
+_PENDING_KEY = "usage_dimension_pending"
+
+class DimensionCache:
+    """
+    Bounded LRU of value -> id (and id -> value) for one dictionary table, shared by the whole
+    process. Only ids known to be committed are cached, so a rolled-back insert never leaves a
+    stale id behind.
+    """
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self.ids: "OrderedDict[str, int]" = OrderedDict()
+        self.values: Dict[int, str] = {}
+        self.lock = threading.Lock()
+
+    def get_many(self, values: Iterable[str]) -> Dict[str, int]:
+        found = {}
+        with self.lock:
+            for value in values:
+                dimension_id = self.ids.get(value)
+                if dimension_id is not None:
+                    self.ids.move_to_end(value)
+                    found[value] = dimension_id
+        return found
+
+    def get_values(self, ids: Iterable[int]) -> Dict[int, str]:
+        found = {}
+        with self.lock:
+            for dimension_id in ids:
+                value = self.values.get(dimension_id)
+                if value is not None:
+                    self.ids.move_to_end(value)
+                    found[dimension_id] = value
+        return found
+
+    def put_many(self, ids: Dict[str, int]) -> None:
+        with self.lock:
+            self.ids.update(ids)
+            for value, dimension_id in ids.items():
+                self.ids.move_to_end(value)
+                self.values[dimension_id] = value
+            while len(self.ids) > self.max_entries:
+                _, dimension_id = self.ids.popitem(last=False)
+                self.values.pop(dimension_id, None)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.ids.clear()
+            self.values.clear()
+
+# One cache per dimension (api_key, endpoint, identifier, status)
+dimension_caches = {name: DimensionCache() for name in USAGE_DIMENSIONS}
+
+def clear_dimension_caches() -> None:
+    for cache in dimension_caches.values():
+        cache.clear()
+
+def _insert_missing(db: Session, model, values) -> None:
+    dialect = db.get_bind().dialect.name
+    rows = [{"value": value} for value in values]
+    if dialect == "postgresql":
+        db.execute(pg_insert(model).on_conflict_do_nothing(index_elements=["value"]), rows)
+    elif dialect == "sqlite":
+        db.execute(sqlite_insert(model).on_conflict_do_nothing(index_elements=["value"]), rows)
+    else:
+        db.execute(model.__table__.insert(), rows)
+
+def intern_dimension_values(db: Session, dimension: str, values: Iterable[Optional[str]]) -> Dict[str, int]:
+    """
+    Ids for `values` in the `dimension` dictionary table, inserting the values not seen yet.
+    Served from the process cache when possible; misses cost one SELECT, and new values one
+    INSERT .. ON CONFLICT DO NOTHING plus a SELECT, in the caller's transaction.
+    """
+    model, _ = USAGE_DIMENSIONS[dimension]
+    wanted = {value for value in values if value is not None}
+    ids = dimension_caches[dimension].get_many(wanted)
+    pending = db.info.setdefault(_PENDING_KEY, {}).setdefault(dimension, {})
+    ids.update({value: pending[value] for value in wanted - ids.keys() if value in pending})
+    missing = wanted - ids.keys()
+    if missing:
+        committed = dict(db.execute(select(model.value, model.id).where(model.value.in_(missing))).all())
+        dimension_caches[dimension].put_many(committed)
+        ids.update(committed)
+        missing -= committed.keys()
+    if missing:
+        _insert_missing(db, model, sorted(missing))
+        created = dict(db.execute(select(model.value, model.id).where(model.value.in_(missing))).all())
+        if created.keys() != missing:
+            raise RuntimeError(f"Could not intern {dimension} values: {sorted(missing - created.keys())}")
+        # Cached for everyone once the transaction commits
+        pending.update(created)
+        ids.update(created)
+    return ids
+
+def dimension_values(db: Session, dimension: str, ids: Iterable[int]) -> Dict[int, str]:
+    """
+    Reverse lookup: id -> value for ids of the `dimension` dictionary table. Served from the
+    process cache when possible; misses cost one SELECT. Aggregates group by the id columns
+    and map the ids back with this, rather than selecting the per-row value subquery.
+    """
+    model, _ = USAGE_DIMENSIONS[dimension]
+    wanted = {dimension_id for dimension_id in ids if dimension_id is not None}
+    if not wanted:
+        return {}
+    values = dimension_caches[dimension].get_values(wanted)
+    missing = wanted - values.keys()
+    if missing:
+        found = dict(db.execute(select(model.id, model.value).where(model.id.in_(missing))).all())
+        values.update(found)
+        # Ids created by this session's open transaction are cached once it commits
+        pending = set(db.info.get(_PENDING_KEY, {}).get(dimension, {}).values())
+        dimension_caches[dimension].put_many({value: dimension_id for dimension_id, value in found.items() if dimension_id not in pending})
+    return values
+
+@event.listens_for(Session, "before_flush")
+def _intern_usage_log_dimensions(session: Session, flush_context, instances) -> None:
+    # UsageLog objects carry the strings set through their attributes; store the ids
+    logs = [obj for obj in (*session.new, *session.dirty) if isinstance(obj, UsageLog) and obj.__dict__.get("_dimension_values")]
+    if not logs:
+        return
+    for dimension, (_, id_attribute) in USAGE_DIMENSIONS.items():
+        values = [log.__dict__["_dimension_values"][dimension] for log in logs if dimension in log.__dict__["_dimension_values"]]
+        if not values:
+            continue
+        ids = intern_dimension_values(session, dimension, values)
+        for log in logs:
+            given = log.__dict__["_dimension_values"]
+            if dimension in given:
+                setattr(log, id_attribute, ids.get(given[dimension]))
+
+@event.listens_for(Session, "after_commit")
+def _cache_committed_dimensions(session: Session) -> None:
+    for dimension, created in session.info.pop(_PENDING_KEY, {}).items():
+        dimension_caches[dimension].put_many(created)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_dimensions(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -1,10 +1,16 @@
 
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select, insert, text, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..models.usage_log import UsageLog
+from ..utils.ids import new_id
+from . import usage_rollup as crud_usage_rollup
+from .usage_dimension import intern_dimension_values, dimension_values
 from ..schemas.usage_log import UsageLogQuery
 import datetime
-from typing import Optional, List
-import uuid
+from typing import Optional, List, Iterable, Iterator, Tuple, Dict
+import io
+import itertools
 
 def log_usage(
     db: Session,
@@ -12,7 +18,8 @@ def log_usage(
     endpoint: Optional[str],
     identifier: str,
     status: str,
-    customer_id: Optional[str] = None
+    customer_id: Optional[str] = None,
+    sample_weight: int = 1
 ) -> UsageLog:
     """
     Log a usage event for an API key and identifier in the database.
@@ -23,26 +30,180 @@ def log_usage(
         api_key_obj = get_api_key(db, api_key)
         customer_id = getattr(api_key_obj, 'user_id', None)
     entry = UsageLog(
-        id=str(uuid.uuid4()),
+        id=new_id(),
         api_key=api_key,
         customer_id=customer_id,
         endpoint=endpoint,
         identifier=identifier,
         timestamp=datetime.datetime.now(datetime.UTC),
-        status=status
+        status=status,
+        sample_weight=sample_weight
     )
     db.add(entry)
     db.commit()
     db.refresh(entry)
     return entry
 
-def get_usage_logs(db: Session, query: Optional[UsageLogQuery] = None) -> List[UsageLog]:
+def _usage_entries(events: List[dict], owners: dict) -> List[UsageLog]:
+    now = datetime.datetime.now(datetime.UTC)
+    return [
+        UsageLog(
+            id=new_id(),
+            api_key=e['api_key'],
+            customer_id=e.get('customer_id') or owners.get(e['api_key']),
+            endpoint=e.get('endpoint'),
+            identifier=e['identifier'],
+            timestamp=crud_usage_rollup.naive_utc(e['timestamp']) if e.get('timestamp') else now,
+            status=e['status'],
+            sample_weight=e.get('sample_weight') or 1
+        )
+        for e in events
+    ]
+
+def _owners_select(events: List[dict]):
+    # Owner lookup for the API keys of events that carry no customer_id (None if there are none)
+    missing_keys = {e['api_key'] for e in events if e.get('customer_id') is None}
+    if not missing_keys:
+        return None
+    from ..models.api_key import APIKey
+    return select(APIKey.key, APIKey.user_id).where(APIKey.key.in_(missing_keys))
+
+def _earliest_minute(events: Iterable[dict]) -> Optional[datetime.datetime]:
+    # Minute of the oldest explicit timestamp: rollups before it must be redone if already made
+    earliest = min((crud_usage_rollup.naive_utc(e['timestamp']) for e in events if e.get('timestamp')), default=None)
+    return earliest.replace(second=0, microsecond=0) if earliest is not None else None
+
+def log_usage_batch(db: Session, events: List[dict], commit: bool = True) -> List[UsageLog]:
     """
-    Retrieve usage logs from the database, optionally filtered by query parameters.
+    Log several usage events in one flush. Each event is a dict with 'api_key', 'endpoint',
+    'identifier', 'status' and optional 'customer_id', 'sample_weight' and 'timestamp' (when the
+    event happened; defaults to now); missing customer_ids are resolved with a single query for
+    the whole batch. Events stamped before the rollup watermark (written late by the
+    write-behind queue or a lease settlement) move it back, as bulk_load_usage does.
     """
-    q = db.query(UsageLog).options(
-        joinedload(UsageLog.api_key_obj)
-    )
+    owners_select = _owners_select(events)
+    owners = dict(db.execute(owners_select).all()) if owners_select is not None else {}
+    entries = _usage_entries(events, owners)
+    db.add_all(entries)
+    earliest = _earliest_minute(events)
+    if earliest is not None:
+        crud_usage_rollup.lower_rollup_watermark(db, earliest)
+    if commit:
+        db.commit()
+    return entries
+
+_COPY_COLUMNS = ("id", "api_key_id", "customer_id", "endpoint_id", "identifier_id", "timestamp", "status_id", "sample_weight")
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+def _copy_value(value) -> str:
+    # PostgreSQL COPY text format: \N for NULL, backslash-escaped separators
+    if value is None:
+        return "\\N"
+    if isinstance(value, datetime.datetime):
+        value = value.isoformat()
+    return str(value).translate(_COPY_ESCAPES)
+
+def _chunks(events: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    it = iter(events)
+    while chunk := list(itertools.islice(it, size)):
+        yield chunk
+
+def _copy_usage_rows(db: Session, rows: List[dict]) -> None:
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join(_copy_value(row[c]) for c in _COPY_COLUMNS))
+        buf.write("\n")
+    buf.seek(0)
+    sql = f"COPY {UsageLog.__tablename__} ({', '.join(_COPY_COLUMNS)}) FROM STDIN"
+    cursor = db.connection().connection.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):
+            cursor.copy_expert(sql, buf)  # psycopg2
+        else:
+            with cursor.copy(sql) as copy:  # psycopg 3
+                copy.write(buf.getvalue())
+    finally:
+        cursor.close()
+
+def bulk_load_usage(db: Session, events: Iterable[dict], chunk_size: int = 10000, commit: bool = True) -> int:
+    """
+    Load a large stream of usage events (backfills, replays) into usage_logs without building
+    ORM objects. Events use the log_usage_batch format and may also carry 'id' and 'timestamp'
+    (kept, converted to naive UTC like every usage_logs timestamp, so replays keep their
+    original times). Rows are sent with COPY FROM STDIN on
+    PostgreSQL and as multi-row INSERTs elsewhere, `chunk_size` rows at a time; each API key's
+    customer_id is looked up at most once and the dimension ids once per chunk. Returns the
+    number of rows loaded.
+    """
+    is_postgres = db.get_bind().dialect.name == "postgresql"
+    owners = {}
+    loaded = 0
+    earliest = None
+    for chunk in _chunks(events, chunk_size):
+        unresolved = [e for e in chunk if e['api_key'] not in owners]
+        owners_select = _owners_select(unresolved)
+        if owners_select is not None:
+            # Remember keys without an owner too, so they are not looked up again
+            owners.update(dict.fromkeys(e['api_key'] for e in unresolved if e.get('customer_id') is None))
+            owners.update(db.execute(owners_select).all())
+        now = crud_usage_rollup.naive_utc(datetime.datetime.now(datetime.UTC))
+        ids = {d: intern_dimension_values(db, d, (e.get(d) for e in chunk)) for d in ('api_key', 'endpoint', 'identifier', 'status')}
+        rows = [
+            {
+                'id': e.get('id') or new_id(),
+                'api_key_id': ids['api_key'][e['api_key']],
+                'customer_id': e.get('customer_id') or owners.get(e['api_key']),
+                'endpoint_id': ids['endpoint'].get(e.get('endpoint')),
+                'identifier_id': ids['identifier'][e['identifier']],
+                'timestamp': crud_usage_rollup.naive_utc(e['timestamp']) if e.get('timestamp') else now,
+                'status_id': ids['status'][e['status']],
+                'sample_weight': e.get('sample_weight') or 1
+            }
+            for e in chunk
+        ]
+        if is_postgres:
+            _copy_usage_rows(db, rows)
+        else:
+            db.execute(insert(UsageLog), rows)
+        loaded += len(rows)
+        chunk_earliest = _earliest_minute(chunk)
+        if chunk_earliest is not None and (earliest is None or chunk_earliest < earliest):
+            earliest = chunk_earliest
+    if earliest is not None:
+        # Backfilled rows may land before the rollup watermark: roll that range up again
+        crud_usage_rollup.lower_rollup_watermark(db, earliest)
+    if commit:
+        db.commit()
+    return loaded
+
+async def alog_usage_batch(db: AsyncSession, events: List[dict], commit: bool = True) -> List[UsageLog]:
+    """Async version of log_usage_batch."""
+    owners_select = _owners_select(events)
+    owners = dict((await db.execute(owners_select)).all()) if owners_select is not None else {}
+    entries = _usage_entries(events, owners)
+    db.add_all(entries)
+    earliest = _earliest_minute(events)
+    if earliest is not None:
+        await crud_usage_rollup.alower_rollup_watermark(db, earliest)
+    if commit:
+        await db.commit()
+    return entries
+
+async def alog_usage(
+    db: AsyncSession,
+    api_key: str,
+    endpoint: Optional[str],
+    identifier: str,
+    status: str,
+    customer_id: Optional[str] = None,
+    sample_weight: int = 1
+) -> UsageLog:
+    """Async version of log_usage."""
+    event = {'api_key': api_key, 'endpoint': endpoint, 'identifier': identifier, 'status': status, 'customer_id': customer_id, 'sample_weight': sample_weight}
+    return (await alog_usage_batch(db, [event]))[0]
+
+def _filter_usage_logs(q, query: Optional[UsageLogQuery]):
+    # Works on ORM queries and select() statements alike
     if query:
         if query.api_key:
             q = q.filter(UsageLog.api_key == query.api_key)
@@ -56,4 +217,134 @@ def get_usage_logs(db: Session, query: Optional[UsageLogQuery] = None) -> List[U
             q = q.filter(UsageLog.timestamp >= query.from_time)
         if query.to_time:
             q = q.filter(UsageLog.timestamp <= query.to_time)
-    return q.all()
+    return q
+
+def get_usage_logs(db: Session, query: Optional[UsageLogQuery] = None) -> List[UsageLog]:
+    """
+    Retrieve usage logs from the database, optionally filtered by query parameters.
+    """
+    q = db.query(UsageLog).options(
+        joinedload(UsageLog.api_key_obj)
+    )
+    return _filter_usage_logs(q, query).all()
+
+# Sampled logging: an allowed check logged at a 1/N sample rate is one row with sample_weight N.
+# Request counts are therefore sums of sample_weight (unbiased), and each sampled row adds
+# w * (w - 1) to the variance of that estimate; unsampled rows (weight 1) add nothing.
+
+def usage_count():
+    """Aggregate for the number of requests the matched usage_logs rows stand for."""
+    return func.coalesce(func.sum(UsageLog.sample_weight), 0)
+
+def usage_count_variance():
+    """Aggregate for the sampling variance of usage_count(); its square root is the standard error."""
+    return func.coalesce(func.sum(UsageLog.sample_weight * (UsageLog.sample_weight - 1)), 0)
+
+def count_usage_by_status(db: Session, query: Optional[UsageLogQuery] = None) -> Dict[str, int]:
+    """Weighted request count per status of the usage logs matching `query`."""
+    stmt = _filter_usage_logs(select(UsageLog.status_id, usage_count()), query).group_by(UsageLog.status_id)
+    counts = dict(db.execute(stmt).all())
+    names = dimension_values(db, 'status', counts)
+    return {names[status_id]: int(count) for status_id, count in counts.items()}
+
+
+# Time partitioning (PostgreSQL): usage_logs is range-partitioned on timestamp with one
+# partition per UTC day, named usage_logs_pYYYYMMDD, plus a default partition for stray rows.
+
+USAGE_LOG_PARTITION_PREFIX = "usage_logs_p"
+
+def usage_log_partition_name(day: datetime.date) -> str:
+    return f"{USAGE_LOG_PARTITION_PREFIX}{day:%Y%m%d}"
+
+def usage_logs_partitioned(db: Session) -> bool:
+    """True if usage_logs is a partitioned table (never on databases other than PostgreSQL)."""
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return db.execute(text(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = :table AND c.relnamespace = current_schema()::regnamespace"
+    ), {"table": UsageLog.__tablename__}).first() is not None
+
+def list_usage_log_partitions(db: Session) -> List[Tuple[str, datetime.date]]:
+    """Return (name, day) for every daily partition of usage_logs, oldest first."""
+    rows = db.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :table AND p.relnamespace = current_schema()::regnamespace"
+    ), {"table": UsageLog.__tablename__}).scalars().all()
+    partitions = []
+    for name in rows:
+        if name.startswith(USAGE_LOG_PARTITION_PREFIX):
+            try:
+                partitions.append((name, datetime.datetime.strptime(name[len(USAGE_LOG_PARTITION_PREFIX):], "%Y%m%d").date()))
+            except ValueError:
+                continue
+    return sorted(partitions, key=lambda p: p[1])
+
+USAGE_LOG_DEFAULT_PARTITION = "usage_logs_default"
+
+def utc_day(value: datetime.date) -> datetime.date:
+    """
+    The UTC day of `value`. Partition bounds are UTC days because usage_logs timestamps are
+    naive UTC (see naive_utc); a datetime is converted first, a date is taken as a UTC day.
+    """
+    if isinstance(value, datetime.datetime):
+        return crud_usage_rollup.naive_utc(value).date()
+    return value
+
+def create_usage_log_partitions(db: Session, start: datetime.date, days: int) -> List[str]:
+    """
+    Create the daily partitions for `days` UTC days from `start` (see utc_day) that do not
+    exist yet. Returns their names.
+
+    Rows for a day without a partition land in the default partition, and PostgreSQL refuses
+    to create a partition whose range the default partition holds rows of (maintenance ran
+    late, backfills). Those rows are moved into the new partition: the default partition is
+    detached, the day's rows are re-inserted through usage_logs and deleted from it, and it is
+    attached again, all in one transaction.
+    """
+    start = utc_day(start)
+    existing = {name for name, _ in list_usage_log_partitions(db)}
+    columns = ", ".join(column.name for column in UsageLog.__table__.columns)
+    table, default = UsageLog.__tablename__, USAGE_LOG_DEFAULT_PARTITION
+    has_default = db.execute(text("SELECT to_regclass(:name)"), {"name": default}).scalar() is not None
+    created = []
+    for offset in range(days):
+        day = start + datetime.timedelta(days=offset)
+        name = usage_log_partition_name(day)
+        if name in existing:
+            continue
+        # Names and bounds are generated from dates, never from user input
+        low, high = day.isoformat(), (day + datetime.timedelta(days=1)).isoformat()
+        in_range = f"timestamp >= '{low}' AND timestamp < '{high}'"
+        stray = has_default and db.execute(text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_range})")).scalar()
+        if stray:
+            db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {default}"))
+        db.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} FOR VALUES FROM ('{low}') TO ('{high}')"))
+        if stray:
+            db.execute(text(
+                f"WITH moved AS (DELETE FROM {default} WHERE {in_range} RETURNING {columns}) "
+                f"INSERT INTO {table} ({columns}) SELECT {columns} FROM moved"
+            ))
+            db.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT"))
+        created.append(name)
+    db.commit()
+    return created
+
+def drop_usage_log_partitions(db: Session, before: datetime.date, count_rows: bool = False) -> Tuple[List[str], int]:
+    """
+    Drop every daily partition whose whole UTC day is before `before` (see utc_day). Dropping
+    a partition is a catalog operation, independent of how many rows it holds. Returns the
+    dropped names and, if count_rows is set, how many rows they held (0 otherwise).
+    """
+    before = utc_day(before)
+    dropped, rows = [], 0
+    for name, day in list_usage_log_partitions(db):
+        if day >= before:
+            break
+        if count_rows:
+            rows += db.execute(text(f"SELECT count(*) FROM {name}")).scalar()
+        db.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+    db.commit()
+    return dropped, rows
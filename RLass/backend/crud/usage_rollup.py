@@ -0,0 +1,132 @@
+import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.usage_dimension import USAGE_DIMENSIONS
+from ..models.usage_log import UsageLog
+from .usage_dimension import dimension_values
+from ..models.usage_rollup import ROLLUP_DIMENSIONS, UsageRollupDay, UsageRollupHour, UsageRollupMinute, UsageRollupWatermark
+
+ROLLUP_MODELS = {"minute": UsageRollupMinute, "hour": UsageRollupHour, "day": UsageRollupDay}
+WATERMARK_NAME = "usage_rollups"
+
+def naive_utc(value: datetime.datetime) -> datetime.datetime:
+    """usage_logs timestamps are naive UTC; convert aware datetimes to match."""
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.UTC).replace(tzinfo=None)
+    return value
+
+def _minute_bucket(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return func.date_trunc("minute", UsageLog.timestamp)
+    if dialect == "sqlite":
+        return func.strftime("%Y-%m-%d %H:%M:00", UsageLog.timestamp)
+    return None
+
+def _as_datetime(value) -> datetime.datetime:
+    return datetime.datetime.fromisoformat(value) if isinstance(value, str) else value
+
+def _apply_filters(query, model, filters: Dict[str, Optional[str]]):
+    for column, value in filters.items():
+        if value is not None:
+            query = query.where(getattr(model, column) == value)
+    return query
+
+def raw_usage_counts(
+    db: Session,
+    start: datetime.datetime,
+    end: datetime.datetime,
+    dimensions: Sequence[str] = ROLLUP_DIMENSIONS,
+    filters: Optional[Dict[str, Optional[str]]] = None,
+) -> List[Tuple]:
+    """
+    (minute bucket, *dimensions, count) for usage_logs rows in [start, end), counted in SQL.
+    Rows are grouped by the dimension ids and the ids mapped back to values afterwards. Each
+    row counts its sample_weight, so rollups hold request counts also for sampled logging.
+    A NULL endpoint is reported as "" like in the rollup tables.
+    """
+    columns = [getattr(UsageLog, USAGE_DIMENSIONS[d][1]) for d in dimensions]
+    bucket = _minute_bucket(db)
+    filters = filters or {}
+    if bucket is None:
+        # No minute truncation function known for this dialect: bucket in Python
+        stmt = _apply_filters(select(UsageLog.timestamp, UsageLog.sample_weight, *columns), UsageLog, filters)
+        stmt = stmt.where(UsageLog.timestamp >= start, UsageLog.timestamp < end)
+        counts: Dict[Tuple, int] = {}
+        for timestamp, weight, *values in db.execute(stmt):
+            key = (timestamp.replace(second=0, microsecond=0), *values)
+            counts[key] = counts.get(key, 0) + weight
+        rows = [(*key, count) for key, count in counts.items()]
+    else:
+        stmt = select(bucket.label("bucket"), *columns, func.sum(UsageLog.sample_weight).label("count"))
+        stmt = _apply_filters(stmt, UsageLog, filters).where(UsageLog.timestamp >= start, UsageLog.timestamp < end)
+        stmt = stmt.group_by(bucket, *columns)
+        rows = [(_as_datetime(row[0]), *row[1:]) for row in db.execute(stmt)]
+    names = [dimension_values(db, d, (row[i + 1] for row in rows)) for i, d in enumerate(dimensions)]
+    return [
+        (row[0], *(names[i].get(row[i + 1], "") if d == "endpoint" else names[i][row[i + 1]] for i, d in enumerate(dimensions)), row[-1])
+        for row in rows
+    ]
+
+def rollup_usage_counts(
+    db: Session,
+    resolution: str,
+    start: datetime.datetime,
+    end: datetime.datetime,
+    dimensions: Sequence[str] = ROLLUP_DIMENSIONS,
+    filters: Optional[Dict[str, Optional[str]]] = None,
+) -> List[Tuple]:
+    """(bucket, *dimensions, count) from the rollup table of `resolution`, for buckets in [start, end)."""
+    model = ROLLUP_MODELS[resolution]
+    columns = [getattr(model, d) for d in dimensions]
+    stmt = select(model.bucket, *columns, func.sum(model.count))
+    stmt = _apply_filters(stmt, model, filters or {}).where(model.bucket >= start, model.bucket < end)
+    stmt = stmt.group_by(model.bucket, *columns)
+    return [tuple(row) for row in db.execute(stmt)]
+
+def replace_rollups(db: Session, resolution: str, start: datetime.datetime, end: datetime.datetime, rows: Iterable[Tuple]) -> int:
+    """Replace the rollup rows of `resolution` with buckets in [start, end) by `rows` ((bucket, *ROLLUP_DIMENSIONS, count))."""
+    model = ROLLUP_MODELS[resolution]
+    db.query(model).filter(model.bucket >= start, model.bucket < end).delete(synchronize_session=False)
+    values = [dict(zip(("bucket", *ROLLUP_DIMENSIONS, "count"), row)) for row in rows]
+    if values:
+        db.execute(insert(model), values)
+    return len(values)
+
+def get_rollup_watermark(db: Session) -> Optional[datetime.datetime]:
+    return db.execute(select(UsageRollupWatermark.position).where(UsageRollupWatermark.name == WATERMARK_NAME)).scalar()
+
+def advance_rollup_watermark(db: Session, expected: Optional[datetime.datetime], position: datetime.datetime) -> bool:
+    """
+    Move the watermark from `expected` to `position`. Returns False (and leaves it alone) if it
+    changed in the meantime, e.g. lowered by a backfill, so that range is rolled up again.
+    """
+    if expected is None:
+        if get_rollup_watermark(db) is not None:
+            return False
+        db.add(UsageRollupWatermark(name=WATERMARK_NAME, position=position))
+        db.flush()
+        return True
+    result = db.execute(
+        update(UsageRollupWatermark)
+        .where(UsageRollupWatermark.name == WATERMARK_NAME, UsageRollupWatermark.position == expected)
+        .values(position=position)
+    )
+    return result.rowcount == 1
+
+def _watermark_lower(position: datetime.datetime):
+    return (
+        update(UsageRollupWatermark)
+        .where(UsageRollupWatermark.name == WATERMARK_NAME, UsageRollupWatermark.position > position)
+        .values(position=position)
+    )
+
+def lower_rollup_watermark(db: Session, position: datetime.datetime) -> None:
+    """Move the watermark back to `position` if it is past it: usage before the watermark changed."""
+    db.execute(_watermark_lower(position))
+
+async def alower_rollup_watermark(db: AsyncSession, position: datetime.datetime) -> None:
+    """Async version of lower_rollup_watermark."""
+    await db.execute(_watermark_lower(position))
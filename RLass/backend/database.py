@@ -17,3 +17,38 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Async driver for each sync URL scheme: the async routes (/rate-limit/check) need the
+# 'asyncpg' package on PostgreSQL and 'aiosqlite' on SQLite
+ASYNC_DRIVERS = {
+    "postgresql": ("postgresql+asyncpg", "asyncpg"),
+    "postgres": ("postgresql+asyncpg", "asyncpg"),
+    "sqlite": ("sqlite+aiosqlite", "aiosqlite"),
+}
+
+def async_database_url(url: str) -> str:
+    """The async driver URL for a sync DATABASE_URL; URLs that already name a driver are kept."""
+    scheme, sep, rest = url.partition("://")
+    if scheme in ASYNC_DRIVERS:
+        return ASYNC_DRIVERS[scheme][0] + sep + rest
+    return url
+
+# Async engine for the async request path. Created on first use so the async driver is only
+# needed by processes that actually serve async routes.
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", async_database_url(DATABASE_URL))
+_async_sessionmaker = None
+
+def get_async_sessionmaker():
+    global _async_sessionmaker
+    if _async_sessionmaker is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+        try:
+            async_engine = create_async_engine(ASYNC_DATABASE_URL)
+        except ImportError as e:
+            raise RuntimeError(f"The async database driver for {ASYNC_DATABASE_URL.partition(':')[0]} is not installed ({e.name}).") from e
+        _async_sessionmaker = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    return _async_sessionmaker
+
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
@@ -14,8 +14,13 @@ from .api.rate_limit import router as rate_limit
 from .api.audit_log import router as audit_log
 from .api import paypal_webhook
 from .api.usage_dashboard import router as usage_dashboard_router
+from .services import usage_logger
+from .services.usage_logger import usage_log_writer, open_usage_event_log, close_usage_event_log
+from .services.rate_limiter import release_quota_leases
 import logging
 
+logger = logging.getLogger("main")
+
 app = FastAPI(
     title="RLaaS Backend API",
     description="A robust, modular API for RLaaS platform, including rate limiting, analytics, user management, and more.",
@@ -52,10 +57,34 @@ app.include_router(audit_log.router, prefix="/audit-log", tags=["Audit Log"])
 app.include_router(paypal_webhook.router, prefix="/webhook", tags=["Webhook"])
 app.include_router(usage_dashboard_router, prefix="/usage-dashboard", tags=["Usage Dashboard"])
 
+# Background writer for usage logs: rate limit checks queue their usage rows instead of
+# inserting them inline; shutdown waits until every queued row is written
+@app.on_event("startup")
+def start_usage_log_writer():
+    # Opened here rather than on import, so only serving processes claim an event log directory
+    usage_event_log = open_usage_event_log()
+    usage_log_writer.start()
+    # Replays events left in the local event log by a previous run, then keeps draining it
+    if usage_event_log is not None:
+        usage_event_log.start()
+
+@app.on_event("shutdown")
+def stop_usage_log_writer():
+    # Buffered lease usage rows and unused lease quota go back to the database first
+    try:
+        release_quota_leases()
+    except Exception as e:
+        logger.error(f"Failed to settle quota leases on shutdown: {e}")
+    usage_log_writer.stop()
+    close_usage_event_log()
+
 # Health check endpoint
 @app.get("/health", tags=["Health"])
 def health_check():
-    return {"status": "ok"}
+    health = {"status": "ok", "usage_log_writer": usage_log_writer.get_metrics()}
+    if usage_logger.usage_event_log is not None:
+        health["usage_event_log"] = usage_logger.usage_event_log.get_metrics()
+    return health
 
 # Custom exception handler for 404
 @app.exception_handler(404)
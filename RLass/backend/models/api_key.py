@@ -18,4 +18,19 @@ class APIKey(Base):
 
     user = relationship("User", back_populates="api_keys")
     rate_limits = relationship("RateLimitConfig", back_populates="api_key_obj", cascade="all, delete-orphan")
-    usage_logs = relationship("UsageLog", back_populates="api_key_obj", cascade="all, delete-orphan")
+    # Its usage_api_keys dictionary row; deleting the key deletes the row and, through it, the key's
+    # usage logs (also cascaded by the database where foreign keys are enforced)
+    usage_api_key = relationship(
+        "UsageAPIKey",
+        primaryjoin="APIKey.key == UsageAPIKey.value",
+        foreign_keys="UsageAPIKey.value",
+        uselist=False,
+        cascade="all, delete",
+    )
+    usage_logs = relationship(
+        "UsageLog",
+        secondary="usage_api_keys",
+        primaryjoin="APIKey.key == UsageAPIKey.value",
+        secondaryjoin="UsageAPIKey.id == UsageLog.api_key_id",
+        viewonly=True,
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index
  
 from typing import Optional
 from datetime import datetime, UTC
@@ -6,12 +6,13 @@ from datetime import datetime, UTC
 
 from sqlalchemy.orm import relationship
 from backend.database import Base
+from backend.models.usage_log import LOG_ID_TYPE
 
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
 
-    id = Column(String, primary_key=True, index=True)
+    id = Column(LOG_ID_TYPE, primary_key=True, index=True)
     action = Column(String, nullable=False)
     actor_id = Column(String, ForeignKey("users.id"), nullable=False)
     target = Column(String, nullable=True)
@@ -23,3 +24,8 @@ class AuditLog(Base):
     user_agent = Column(String, nullable=True)
 
     actor = relationship("User", back_populates="audit_logs")
+
+    __table_args__ = (
+        # Keyset pagination orders and seeks on (timestamp, id)
+        Index("ix_audit_logs_timestamp_id", "timestamp", "id"),
+    )
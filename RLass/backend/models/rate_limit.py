@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, Boolean
+from sqlalchemy import Column, String, Integer, ForeignKey, Boolean, Float
  
 from typing import Optional
 
@@ -16,8 +16,38 @@ class RateLimitConfig(Base):
     endpoint = Column(String, nullable=True, index=True)
     limit = Column(Integer, nullable=False)
     period_seconds = Column(Integer, nullable=False)
+    # 'fixed_window', 'sliding_window' or 'gcra'
+    algorithm = Column(String, nullable=False, default="fixed_window", server_default="fixed_window")
+    # GCRA only: requests that may be sent back to back (defaults to limit)
+    burst = Column(Integer, nullable=True)
+    # Log 1 in N allowed checks to usage_logs, with sample_weight N (None or 1: log every check).
+    # Rate-limited checks are always logged.
+    usage_sample_rate = Column(Integer, nullable=True)
 
         # No datetime fields in this model, so no changes needed
 
     api_key_obj = relationship("APIKey", back_populates="rate_limits")
     user = relationship("User", back_populates="rate_limits")
+
+
+class RateLimitCounter(Base):
+    """Per-window hit counter for DB-backed rate limiting, one row per (api_key, identifier, endpoint, window)."""
+    __tablename__ = "rate_limit_counters"
+
+    api_key = Column(String, primary_key=True)
+    identifier = Column(String, primary_key=True)
+    # Stored as "" for key-wide limits so the composite primary key stays NOT NULL
+    endpoint = Column(String, primary_key=True, default="")
+    window_start = Column(Integer, primary_key=True, index=True)  # Unix timestamp of the window start
+    count = Column(Integer, nullable=False, default=0)
+
+
+class RateLimitGCRAState(Base):
+    """GCRA state for DB-backed rate limiting: a single theoretical arrival time per (api_key, identifier, endpoint)."""
+    __tablename__ = "rate_limit_gcra_states"
+
+    api_key = Column(String, primary_key=True)
+    identifier = Column(String, primary_key=True)
+    # Stored as "" for key-wide limits so the composite primary key stays NOT NULL
+    endpoint = Column(String, primary_key=True, default="")
+    tat = Column(Float, nullable=False)  # Unix timestamp (seconds, fractional)
@@ -0,0 +1,95 @@
+from sqlalchemy import Column, Integer, SmallInteger, String, ForeignKey, Index, DDL, event
+from sqlalchemy.orm import relationship
+
+from backend.database import Base
+
+
+# Dictionary tables for the repeated string columns of usage_logs: each distinct value is stored
+# once and usage_logs keeps its integer id. Values are interned on the write path by
+# crud.usage_dimension, through a process-wide cache.
+
+def _trigram_index(table: str) -> Index:
+    # Substring search (search_usage_logs) matches these values with ILIKE '%term%'
+    return Index(f"ix_{table}_value_trgm", "value", postgresql_using="gin", postgresql_ops={"value": "gin_trgm_ops"}).ddl_if(dialect="postgresql")
+
+
+class UsageAPIKey(Base):
+    __tablename__ = "usage_api_keys"
+    __table_args__ = (_trigram_index("usage_api_keys"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # Deleting an API key deletes its usage through this row (usage_logs.api_key_id cascades)
+    value = Column(String, ForeignKey("api_keys.key", ondelete="CASCADE"), nullable=False, unique=True)
+
+    usage_logs = relationship("UsageLog", back_populates="api_key_dimension", cascade="all, delete")
+
+
+class UsageEndpoint(Base):
+    __tablename__ = "usage_endpoints"
+    __table_args__ = (_trigram_index("usage_endpoints"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    value = Column(String, nullable=False, unique=True)
+
+
+class UsageIdentifier(Base):
+    __tablename__ = "usage_identifiers"
+    __table_args__ = (_trigram_index("usage_identifiers"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    value = Column(String, nullable=False, unique=True)
+
+
+class UsageStatus(Base):
+    """Status names as a smallint enum; the statuses the rate limiter writes are seeded with fixed ids."""
+    __tablename__ = "usage_statuses"
+
+    # SQLite only auto-assigns INTEGER primary keys
+    id = Column(SmallInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    value = Column(String, nullable=False, unique=True)
+
+
+# Seeded status ids (see the migration adding these tables)
+USAGE_STATUS_IDS = {"allowed": 1, "rate_limited": 2, "success": 3, "error": 4}
+
+# usage_logs attribute -> (dictionary model, id column on usage_logs)
+USAGE_DIMENSIONS = {
+    "api_key": (UsageAPIKey, "api_key_id"),
+    "endpoint": (UsageEndpoint, "endpoint_id"),
+    "identifier": (UsageIdentifier, "identifier_id"),
+    "status": (UsageStatus, "status_id"),
+}
+
+
+def search_fts_ddl(table: str) -> tuple:
+    """
+    SQLite counterpart of the trigram index: an external-content FTS5 table `<table>_fts`
+    with the trigram tokenizer (case-insensitive substring matching) over `table`.value,
+    kept in sync by triggers.
+    """
+    fts = f"{table}_fts"
+    insert = f"INSERT INTO {fts} (rowid, value) VALUES (new.id, new.value);"
+    delete = f"INSERT INTO {fts} ({fts}, rowid, value) VALUES ('delete', old.id, old.value);"
+    return (
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(value, content='{table}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE ON {table} BEGIN {delete} {insert} END",
+    )
+
+
+# Dimensions covered by substring search -> SQLite FTS5 table over their dictionary values
+SEARCH_FTS_TABLES = {name: f"{model.__tablename__}_fts" for name, (model, _) in USAGE_DIMENSIONS.items() if name != "status"}
+
+for table in (UsageAPIKey.__table__, UsageEndpoint.__table__, UsageIdentifier.__table__):
+    event.listen(table, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"))
+    for statement in search_fts_ddl(table.name):
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+    event.listen(table, "before_drop", DDL(f"DROP TABLE IF EXISTS {table.name}_fts").execute_if(dialect="sqlite"))
+event.listen(UsageStatus.__table__, "after_create", DDL(
+    "INSERT INTO usage_statuses (id, value) VALUES "
+    + ", ".join(f"({status_id}, '{name}')" for name, status_id in USAGE_STATUS_IDS.items())
+))
+event.listen(UsageStatus.__table__, "after_create", DDL(
+    f"SELECT setval(pg_get_serial_sequence('usage_statuses', 'id'), {max(USAGE_STATUS_IDS.values())})"
+).execute_if(dialect="postgresql"))
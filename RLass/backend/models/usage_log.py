@@ -1,22 +1,129 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey
- 
+from sqlalchemy import Column, String, Integer, SmallInteger, DateTime, ForeignKey, Index, select
+
 from typing import Optional
 from datetime import datetime, UTC
 
 
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.hybrid import hybrid_property, Comparator
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import operators
 from backend.database import Base
+from backend.models.usage_dimension import USAGE_DIMENSIONS
+
+# Log row IDs are time-ordered UUIDv7 strings (utils.ids.new_id), stored as a native 16-byte
+# uuid on PostgreSQL so the primary key and ix_*_id indexes stay small and append-only
+LOG_ID_TYPE = String().with_variant(UUID(as_uuid=False), "postgresql")
+
+# Public fields of a usage log, in export / API order
+USAGE_LOG_FIELDS = ("id", "api_key", "customer_id", "endpoint", "identifier", "timestamp", "status", "sample_weight")
+
+
+class DimensionComparator(Comparator):
+    """
+    SQL side of a dictionary-encoded usage_logs attribute. Comparisons with values become
+    comparisons of the integer id column (so its indexes are used); LIKE/ILIKE match the
+    dictionary table; anything else (select, group by, order by) uses the looked-up value.
+    """
+    def __init__(self, id_column, dimension, name):
+        self.id_column = id_column
+        self.dimension = dimension
+        value = select(dimension.value).where(dimension.id == id_column).correlate_except(dimension)
+        super().__init__(value.scalar_subquery().label(name))
+
+    def _ids(self, condition):
+        return select(self.dimension.id).where(condition)
+
+    def operate(self, op, *other, **kwargs):
+        if op in (operators.eq, operators.ne, operators.is_, operators.is_not) and other[0] is None:
+            return op(self.id_column, None)
+        if op is operators.eq:
+            return self.id_column == self._ids(self.dimension.value == other[0]).scalar_subquery()
+        if op is operators.ne:
+            return self.id_column.not_in(self._ids(self.dimension.value == other[0]))
+        if op is operators.in_op:
+            return self.id_column.in_(self._ids(self.dimension.value.in_(other[0])))
+        if op is operators.not_in_op:
+            return self.id_column.not_in(self._ids(self.dimension.value.in_(other[0])))
+        if op in (operators.like_op, operators.ilike_op, operators.not_like_op, operators.not_ilike_op):
+            positive = {operators.not_like_op: operators.like_op, operators.not_ilike_op: operators.ilike_op}.get(op, op)
+            matching = self.id_column.in_(self._ids(positive(self.dimension.value, *other, **kwargs)))
+            return matching if positive is op else ~matching
+        return op(self.expression, *other, **kwargs)
+
+
+def _dimension_attribute(name: str) -> hybrid_property:
+    dimension, id_attribute = USAGE_DIMENSIONS[name]
+    relationship_name = f"{name}_dimension"
+
+    def fget(self):
+        pending = self.__dict__.get("_dimension_values")
+        if pending and name in pending:
+            return pending[name]
+        row = getattr(self, relationship_name)
+        return row.value if row is not None else None
+
+    def fset(self, value):
+        # Resolved to an id when the session flushes (crud.usage_dimension)
+        self.__dict__.setdefault("_dimension_values", {})[name] = value
+        setattr(self, id_attribute, None)
+
+    def comparator(cls):
+        return DimensionComparator(getattr(cls, id_attribute), dimension, name)
+
+    return hybrid_property(fget, fset, custom_comparator=comparator)
+
 
 class UsageLog(Base):
+    # On PostgreSQL this table is range-partitioned by day on timestamp (primary key
+    # (id, timestamp)); partitions are managed by the usage_log_partitions maintenance task.
+    # api_key, endpoint, identifier and status are stored as ids into the usage_* dictionary
+    # tables (models.usage_dimension) and read and filtered through the attributes below.
     __tablename__ = "usage_logs"
+    __table_args__ = (
+        # Usage queries filter on key columns plus a timestamp range
+        Index("ix_usage_logs_api_key_identifier_endpoint_timestamp", "api_key_id", "identifier_id", "endpoint_id", "timestamp"),
+        Index("ix_usage_logs_api_key_timestamp_status", "api_key_id", "timestamp", "status_id"),
+        # Rows arrive in timestamp order, so a tiny BRIN index serves plain time-range scans
+        Index("ix_usage_logs_timestamp_brin", "timestamp", postgresql_using="brin"),
+        # Keyset pagination orders and seeks on (timestamp, id), which BRIN cannot serve
+        Index("ix_usage_logs_timestamp_id", "timestamp", "id"),
+    )
 
-    id = Column(String, primary_key=True, index=True)
-    api_key = Column(String, ForeignKey("api_keys.key"), nullable=False, index=True)
+    id = Column(LOG_ID_TYPE, primary_key=True, index=True)
+    api_key_id = Column(Integer, ForeignKey("usage_api_keys.id", ondelete="CASCADE"), nullable=False, index=True)
     customer_id = Column(String, ForeignKey("users.id"), nullable=True, index=True)
-    endpoint = Column(String, nullable=True, index=True)
-    identifier = Column(String, nullable=False, index=True)
-    timestamp = Column(DateTime, default=lambda: datetime.now(UTC))
-    status = Column(String, nullable=False)
+    endpoint_id = Column(Integer, ForeignKey("usage_endpoints.id"), nullable=True, index=True)
+    identifier_id = Column(Integer, ForeignKey("usage_identifiers.id"), nullable=False, index=True)
+    timestamp = Column(DateTime, nullable=False, default=lambda: datetime.now(UTC))
+    status_id = Column(SmallInteger().with_variant(Integer, "sqlite"), ForeignKey("usage_statuses.id"), nullable=False)
+    # Requests this row stands for: N for an allowed check logged at a 1/N sample rate, else 1.
+    # Counts of requests are sums of this column (crud.usage_log.usage_count).
+    sample_weight = Column(Integer, nullable=False, default=1, server_default="1")
+
+    api_key_dimension = relationship("UsageAPIKey", lazy="joined", innerjoin=True, back_populates="usage_logs")
+    endpoint_dimension = relationship("UsageEndpoint", lazy="joined")
+    identifier_dimension = relationship("UsageIdentifier", lazy="joined", innerjoin=True)
+    status_dimension = relationship("UsageStatus", lazy="joined", innerjoin=True)
 
-    api_key_obj = relationship("APIKey", back_populates="usage_logs")
+    api_key = _dimension_attribute("api_key")
+    endpoint = _dimension_attribute("endpoint")
+    identifier = _dimension_attribute("identifier")
+    status = _dimension_attribute("status")
+
+    api_key_obj = relationship(
+        "APIKey",
+        secondary="usage_api_keys",
+        primaryjoin="UsageLog.api_key_id == UsageAPIKey.id",
+        secondaryjoin="UsageAPIKey.value == APIKey.key",
+        uselist=False,
+        viewonly=True,
+    )
     user = relationship("User", back_populates="usage_logs")
+
+
+# Columns covered by substring search
+SEARCH_COLUMNS = ("endpoint", "identifier", "api_key")
+
+# Registers the flush hook that interns dimension values
+import backend.crud.usage_dimension  # noqa: E402,F401
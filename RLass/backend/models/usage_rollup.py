@@ -0,0 +1,50 @@
+from sqlalchemy import Column, String, DateTime, BigInteger, Index
+
+from backend.database import Base
+
+
+# Dimensions of every rollup row; usage_logs columns of the same names
+ROLLUP_DIMENSIONS = ("api_key", "endpoint", "identifier", "status")
+
+
+class UsageRollupColumns:
+    """Request counts per (bucket, api_key, endpoint, identifier, status); bucket is the UTC start of the period."""
+    bucket = Column(DateTime, primary_key=True)
+    api_key = Column(String, primary_key=True)
+    # Stored as "" for usage logged without an endpoint so the composite primary key stays NOT NULL
+    endpoint = Column(String, primary_key=True, default="")
+    identifier = Column(String, primary_key=True)
+    status = Column(String, primary_key=True)
+    count = Column(BigInteger, nullable=False, default=0)
+
+
+class UsageRollupMinute(UsageRollupColumns, Base):
+    __tablename__ = "usage_rollup_minute"
+    __table_args__ = (
+        Index("ix_usage_rollup_minute_api_key_bucket", "api_key", "bucket"),
+        Index("ix_usage_rollup_minute_identifier_bucket", "identifier", "bucket"),
+    )
+
+
+class UsageRollupHour(UsageRollupColumns, Base):
+    __tablename__ = "usage_rollup_hour"
+    __table_args__ = (
+        Index("ix_usage_rollup_hour_api_key_bucket", "api_key", "bucket"),
+        Index("ix_usage_rollup_hour_identifier_bucket", "identifier", "bucket"),
+    )
+
+
+class UsageRollupDay(UsageRollupColumns, Base):
+    __tablename__ = "usage_rollup_day"
+    __table_args__ = (
+        Index("ix_usage_rollup_day_api_key_bucket", "api_key", "bucket"),
+        Index("ix_usage_rollup_day_identifier_bucket", "identifier", "bucket"),
+    )
+
+
+class UsageRollupWatermark(Base):
+    """How far the rollups are complete: every usage log before `position` is counted in them."""
+    __tablename__ = "usage_rollup_watermarks"
+
+    name = Column(String, primary_key=True)
+    position = Column(DateTime, nullable=False)
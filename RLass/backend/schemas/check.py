@@ -1,18 +1,23 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Annotated, List, Optional
+from .api_key import APIKeyRead
 
 class CheckRequest(BaseModel):
     api_key: str
     identifier: str  # e.g., user ID or IP
     endpoint: Optional[str] = None
-    api_key_info: Optional["APIKeyRead"] = None
-    # For forward reference
-    from typing import TYPE_CHECKING
-    if TYPE_CHECKING:
-        from .api_key import APIKeyRead
+    api_key_info: Optional[APIKeyRead] = None
+
+# Most checks accepted by one /check/batch call
+MAX_BATCH_CHECKS = 1000
+
+CheckBatchRequest = Annotated[List[CheckRequest], Field(max_length=MAX_BATCH_CHECKS)]
 
 class CheckResponse(BaseModel):
     allowed: bool
     remaining: int
     reset: int  # Unix timestamp for when the limit resets
     message: Optional[str] = None
+    # /check/batch items: the status /check would answer with (200, 429, or 404 without a config)
+    status: Optional[int] = None
+
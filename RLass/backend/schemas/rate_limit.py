@@ -1,6 +1,9 @@
 
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
+
+# Rate limiting algorithms (services.rate_limiter); anything else is rejected with 422
+RateLimitAlgorithm = Literal["fixed_window", "sliding_window", "gcra"]
 
 class RateLimitConfigCreate(BaseModel):
     api_key: str
@@ -8,6 +11,10 @@ class RateLimitConfigCreate(BaseModel):
     endpoint: Optional[str] = None
     limit: int
     period_seconds: int
+    algorithm: RateLimitAlgorithm = "fixed_window"
+    # GCRA burst in permits; 0 or less would leave no tolerance at all
+    burst: Optional[int] = Field(None, ge=1)
+    usage_sample_rate: Optional[int] = Field(None, ge=1)
 
 class RateLimitConfigRead(BaseModel):
     api_key: str
@@ -15,6 +22,9 @@ class RateLimitConfigRead(BaseModel):
     endpoint: Optional[str] = None
     limit: int
     period_seconds: int
+    algorithm: str = "fixed_window"
+    burst: Optional[int] = None
+    usage_sample_rate: Optional[int] = None
 
 class RateLimitStatusRead(BaseModel):
     api_key: str
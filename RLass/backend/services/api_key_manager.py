@@ -3,12 +3,16 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_, desc
 from ..crud import api_key as crud_api_key
 from ..crud import user as crud_user
+from ..crud import usage_log as crud_usage_log
+from ..crud.usage_dimension import dimension_values
 from ..schemas.api_key import APIKeyCreate
 from ..models.api_key import APIKey
 from ..models.user import User
 from ..models.usage_log import UsageLog
+from .usage_rollup import usage_counts
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta, UTC
+from collections import defaultdict
 import logging
 import secrets
 import hashlib
@@ -319,48 +323,29 @@ def get_api_key_usage_stats(
 	if not api_key:
 		raise ValueError("API key not found")
 	
-	cutoff_date = datetime.now(UTC) - timedelta(days=days_back)
-	
-	# Get usage logs for this key
-	usage_query = db.query(UsageLog).filter(
-		UsageLog.api_key == key,
-		UsageLog.timestamp >= cutoff_date
-	)
+	now = datetime.now(UTC)
+	cutoff_date = now - timedelta(days=days_back)
 	
-	total_requests = usage_query.count()
+	# One read of the daily usage rollups per (day, endpoint, status); everything below is derived from it
+	counts = usage_counts(db, cutoff_date, now, interval='day', dimensions=('endpoint', 'status'), api_key=key)
+	status_breakdown: Dict[str, int] = defaultdict(int)
+	endpoint_counts: Dict[Optional[str], int] = defaultdict(int)
+	daily_usage: Dict[datetime, int] = defaultdict(int)
+	for (day, endpoint, status), count in counts.items():
+		status_breakdown[status] += count
+		endpoint_counts[endpoint] += count
+		daily_usage[day] += count
 	
-	# Status breakdown
-	status_breakdown = db.query(
-		UsageLog.status,
-		func.count(UsageLog.id).label('count')
-	).filter(
-		UsageLog.api_key == key,
-		UsageLog.timestamp >= cutoff_date
-	).group_by(UsageLog.status).all()
+	total_requests = sum(status_breakdown.values())
 	
 	# Top endpoints
-	top_endpoints = db.query(
-		UsageLog.endpoint,
-		func.count(UsageLog.id).label('count')
-	).filter(
-		UsageLog.api_key == key,
-		UsageLog.timestamp >= cutoff_date
-	).group_by(UsageLog.endpoint).order_by(desc('count')).limit(10).all()
+	top_endpoints = sorted(endpoint_counts.items(), key=lambda item: item[1], reverse=True)[:10]
 	
 	# Calculate rates
-	success_count = sum(r.count for r in status_breakdown if r.status == 'success')
+	success_count = status_breakdown.get('success', 0)
 	error_count = total_requests - success_count
 	success_rate = (success_count / total_requests * 100) if total_requests > 0 else 0
 	
-	# Activity timeline
-	daily_usage = db.query(
-		func.date_trunc('day', UsageLog.timestamp).label('date'),
-		func.count(UsageLog.id).label('count')
-	).filter(
-		UsageLog.api_key == key,
-		UsageLog.timestamp >= cutoff_date
-	).group_by('date').order_by('date').all()
-	
 	logger.info(f"Generated usage stats for key {key}: {total_requests} requests over {days_back} days")
 	
 	return {
@@ -374,9 +359,9 @@ def get_api_key_usage_stats(
 		'success_count': success_count,
 		'error_count': error_count,
 		'success_rate': round(success_rate, 2),
-		'status_breakdown': {r.status: r.count for r in status_breakdown},
-		'top_endpoints': [{'endpoint': r.endpoint, 'count': r.count} for r in top_endpoints],
-		'daily_usage': [{'date': str(r.date), 'count': r.count} for r in daily_usage]
+		'status_breakdown': dict(status_breakdown),
+		'top_endpoints': [{'endpoint': endpoint, 'count': count} for endpoint, count in top_endpoints],
+		'daily_usage': [{'date': str(day), 'count': count} for day, count in sorted(daily_usage.items())]
 	}
 
 
@@ -405,7 +390,7 @@ def get_user_api_keys_summary(
 	inactive_keys = [k for k in keys if not k.is_active]
 	
 	# Get total usage across all keys
-	total_usage = db.query(func.count(UsageLog.id)).filter(
+	total_usage = db.query(crud_usage_log.usage_count()).filter(
 		UsageLog.api_key.in_([k.key for k in keys])
 	).scalar() or 0
 	
@@ -466,16 +451,17 @@ def get_least_used_keys(
 	"""
 	cutoff_date = datetime.now(UTC) - timedelta(days=days_back)
 	
-	# Get usage counts per key
+	# Get usage counts per key id, then map the ids back to keys
 	key_usage = db.query(
-		UsageLog.api_key,
-		func.count(UsageLog.id).label('usage_count')
+		UsageLog.api_key_id,
+		crud_usage_log.usage_count().label('usage_count')
 	).filter(
 		UsageLog.timestamp >= cutoff_date
-	).group_by(UsageLog.api_key).all()
+	).group_by(UsageLog.api_key_id).all()
+	keys = dimension_values(db, 'api_key', (r.api_key_id for r in key_usage))
 	
 	# Create dict of usage counts
-	usage_dict = {r.api_key: r.usage_count for r in key_usage}
+	usage_dict = {keys.get(r.api_key_id): r.usage_count for r in key_usage}
 	
 	# Get all active keys
 	all_keys = db.query(APIKey).filter(APIKey.is_active == True).all()
@@ -621,7 +607,7 @@ def get_api_key_quota_status(
 	cutoff_time = datetime.now(UTC) - timedelta(seconds=window)
 	
 	# Count recent usage
-	usage_count = db.query(func.count(UsageLog.id)).filter(
+	usage_count = db.query(crud_usage_log.usage_count()).filter(
 		UsageLog.api_key == key,
 		UsageLog.timestamp >= cutoff_time
 	).scalar() or 0
@@ -901,7 +887,7 @@ def export_api_keys_report(
 	report = []
 	for key_obj in keys:
 		# Get usage count
-		usage_count = db.query(func.count(UsageLog.id)).filter(
+		usage_count = db.query(crud_usage_log.usage_count()).filter(
 			UsageLog.api_key == key_obj.key
 		).scalar() or 0
 		
@@ -2,7 +2,8 @@ from sqlalchemy.orm import Session
 from ..crud import audit_log as crud_audit_log
 from ..schemas.audit_log import AuditLogQuery
 from ..models.audit_log import AuditLog
-from typing import List, Optional
+from ..utils.pagination import keyset_page
+from typing import List, Optional, Tuple
 
 def log_audit_event(
 		db: Session,
@@ -57,6 +58,31 @@ def get_audit_events(
 		q = q.limit(limit)
 	return q.all()
 
+def get_audit_events_page(
+	db: Session,
+	query: Optional[AuditLogQuery] = None,
+	limit: Optional[int] = None,
+	cursor: Optional[str] = None
+) -> Tuple[List[AuditLog], Optional[str]]:
+	"""
+	One page of audit logs, newest first, with keyset pagination on (timestamp, id).
+	Returns the logs and the cursor for the next page (None on the last page).
+	Raises ValueError if the cursor is malformed.
+	"""
+	q = db.query(AuditLog)
+	if query:
+		if query.actor_id:
+			q = q.filter(AuditLog.actor_id == query.actor_id)
+		if query.action:
+			q = q.filter(AuditLog.action == query.action)
+		if query.target:
+			q = q.filter(AuditLog.target == query.target)
+		if query.from_time:
+			q = q.filter(AuditLog.timestamp >= query.from_time)
+		if query.to_time:
+			q = q.filter(AuditLog.timestamp <= query.to_time)
+	return keyset_page(q, AuditLog, limit, cursor)
+
 def summarize_audit_events_by_actor(db: Session, from_time: Optional[str] = None, to_time: Optional[str] = None) -> dict:
 	"""
 	Summarize audit events by actor (user), returning a count per actor.
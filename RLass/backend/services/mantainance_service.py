@@ -1,9 +1,16 @@
 
 from sqlalchemy.orm import Session
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from ..crud import maintenance as crud_maintenance
+from ..crud import usage_log as crud_usage_log
+from ..crud import auth as crud_auth
+from ..crud import rate_limit as crud_rate_limit
+from ..models.rate_limit import RateLimitConfig
 from ..models.maintenance import MaintenanceTask
+from .usage_rollup import refresh_usage_rollups
+from . import usage_logger
 from ..schemas.maintenance import MaintenanceTaskCreate, MaintenanceTaskRead
+from sqlalchemy import func
 import logging
 import datetime
 
@@ -40,9 +47,66 @@ def update_task_status(db: Session, task_id: int, status: str) -> Optional[Maint
 	logger.info(f"Updating maintenance task {task_id} to status '{status}'")
 	return crud_maintenance.update_maintenance_status(db, task_id, status)
 
+def manage_usage_log_partitions(db: Session, days_ahead: int = 7, retention_days: int = 90, today: Optional[datetime.date] = None) -> Dict[str, Any]:
+	"""
+	Keep the daily usage_logs partitions in shape: create partitions for today and the next
+	`days_ahead` days, and drop partitions older than `retention_days` days.
+	Does nothing unless usage_logs is a partitioned PostgreSQL table.
+	"""
+	if not crud_usage_log.usage_logs_partitioned(db):
+		logger.info("usage_logs is not partitioned; skipping partition maintenance.")
+		return {"created": [], "dropped": []}
+	today = today or datetime.datetime.now(datetime.UTC).date()
+	created = crud_usage_log.create_usage_log_partitions(db, today, days_ahead + 1)
+	dropped, _ = crud_usage_log.drop_usage_log_partitions(db, today - datetime.timedelta(days=retention_days))
+	logger.info(f"Usage log partitions: created {len(created)}, dropped {len(dropped)}")
+	return {"created": created, "dropped": dropped}
+
+def cleanup_expired_tokens(db: Session) -> Dict[str, int]:
+	"""
+	Delete expired auth tokens in primary-key batches. An interrupted run is finished by the next one.
+	"""
+	deleted = crud_auth.delete_expired_tokens(db)
+	logger.info(f"Deleted {deleted} expired auth tokens")
+	return {"deleted": deleted}
+
+def cleanup_rate_limit_state(db: Session, now: Optional[float] = None) -> Dict[str, int]:
+	"""
+	Delete rate limit state nothing reads any more, in primary-key batches: window counters
+	older than two of the longest configured periods (a sliding window still reads the
+	previous window) and GCRA states whose TAT has passed.
+	"""
+	now = datetime.datetime.now(datetime.UTC).timestamp() if now is None else now
+	longest_period = db.query(func.max(RateLimitConfig.period_seconds)).scalar() or 0
+	windows = crud_rate_limit.delete_expired_window_counters(db, int(now) - 2 * longest_period)
+	gcra_states = crud_rate_limit.delete_elapsed_gcra_states(db, now)
+	logger.info(f"Deleted {windows} expired rate limit windows and {gcra_states} elapsed GCRA states")
+	return {"window_counters": windows, "gcra_states": gcra_states}
+
+def replay_usage_event_log(db: Session) -> Dict[str, int]:
+	"""
+	Load the events waiting in this process's local usage event log into usage_logs.
+	Does nothing unless the event log is enabled (USAGE_EVENT_LOG_DIR).
+	"""
+	if usage_logger.usage_event_log is None:
+		logger.info("Local usage event log is not enabled; skipping replay.")
+		return {"replayed": 0}
+	replayed = usage_logger.usage_event_log.replay(db)
+	return {"replayed": replayed}
+
+# Maintenance tasks with these names run a job; other tasks are only marked as running
+TASK_HANDLERS = {
+	"usage_log_partitions": manage_usage_log_partitions,
+	"expired_token_cleanup": cleanup_expired_tokens,
+	"usage_rollups": refresh_usage_rollups,
+	"usage_event_log_replay": replay_usage_event_log,
+	"rate_limit_state_cleanup": cleanup_rate_limit_state,
+}
+
 def run_task(db: Session, task_id: int) -> Optional[MaintenanceTask]:
 	"""
 	Mark a maintenance task as running, update last_run, and set status to 'running'.
+	Tasks named in TASK_HANDLERS then run their job and end as 'completed' or 'failed'.
 	"""
 	task = crud_maintenance.update_maintenance_status(db, task_id, "running")
 	if task:
@@ -50,6 +114,15 @@ def run_task(db: Session, task_id: int) -> Optional[MaintenanceTask]:
 		db.commit()
 		db.refresh(task)
 		logger.info(f"Ran maintenance task {task_id}")
+		handler = TASK_HANDLERS.get(task.name)
+		if handler:
+			try:
+				handler(db)
+				task = crud_maintenance.update_maintenance_status(db, task_id, "completed")
+			except Exception as e:
+				db.rollback()
+				logger.error(f"Maintenance task {task_id} failed: {e}")
+				task = crud_maintenance.update_maintenance_status(db, task_id, "failed")
 	else:
 		logger.warning(f"Maintenance task {task_id} not found for running.")
 	return task
@@ -1,13 +1,181 @@
 import datetime
+from sqlalchemy import select, func
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 from ..crud import rate_limit as crud_rate_limit
 from ..crud import usage_log as crud_usage_log
 from ..crud import api_key as crud_api_key
+from ..crud.usage_dimension import dimension_values
+from ..utils.batch_delete import chunked_delete, achunked_delete
+from .usage_logger import UsageLogWriter, usage_log_writer
 from ..models.usage_log import UsageLog
 from ..models.rate_limit import RateLimitConfig
-from typing import Optional, Tuple, Any
+from typing import Optional, Tuple, Any, List
 import threading
+import math
+import time
+import heapq
+import os
+import random
+
+# Rate limiting algorithms selectable per RateLimitConfig
+FIXED_WINDOW = "fixed_window"
+SLIDING_WINDOW = "sliding_window"
+GCRA = "gcra"
+
+
+def get_window_bounds(period_seconds: int, align_to_minute: bool = False) -> Tuple[int, int]:
+    """Return (window_start_ts, window_end_ts) of the fixed window containing now."""
+    now = datetime.datetime.now(datetime.UTC)
+    if align_to_minute:
+        window_start_ts = int(now.replace(second=0, microsecond=0).timestamp())
+    else:
+        now_ts = int(now.timestamp())
+        window_start_ts = now_ts - now_ts % period_seconds
+    return window_start_ts, window_start_ts + period_seconds
+
+def get_previous_window_weight(config, window_start_ts: int) -> float:
+    """
+    Weight of the previous window's count in the sliding-window estimate:
+    the fraction of the sliding period that still overlaps the previous window.
+    Always 0.0 for fixed-window configs.
+    """
+    if getattr(config, "algorithm", FIXED_WINDOW) != SLIDING_WINDOW:
+        return 0.0
+    elapsed = datetime.datetime.now(datetime.UTC).timestamp() - window_start_ts
+    return max(0.0, 1.0 - elapsed / config.period_seconds)
+
+def get_gcra_params(config) -> Tuple[float, float]:
+    """
+    Return (emission_interval, burst_tolerance) in seconds for a GCRA config.
+    One permit is earned every period_seconds / limit; up to `burst` permits
+    (defaults to `limit`) may be spent back to back.
+    """
+    burst = getattr(config, "burst", None) or config.limit
+    emission_interval = config.period_seconds / config.limit
+    return emission_interval, emission_interval * burst
+
+def get_usage_event(api_key: str, identifier: str, endpoint: Optional[str], config, allowed: bool) -> Optional[dict]:
+    """
+    Usage log row for one check, in the event format of crud_usage_log.log_usage_batch, or None
+    if the check is not sampled. The row is stamped now, at decision time, however late it is written. With a usage_sample_rate of N on the config, every rate_limited
+    check is logged but an allowed one only with probability 1/N, as a row with sample_weight N.
+    Summing sample_weight then estimates the allowed count without bias, with a standard error
+    of about sqrt(count * (N - 1)) (see crud_usage_log.usage_count_variance).
+    """
+    rate = getattr(config, "usage_sample_rate", None) or 1
+    if allowed and rate > 1 and random.random() * rate >= 1:
+        return None
+    return {
+        "api_key": api_key,
+        "endpoint": endpoint,
+        "identifier": identifier,
+        "status": "allowed" if allowed else "rate_limited",
+        "customer_id": getattr(config, "customer_id", None),
+        "sample_weight": rate if allowed else 1,
+        "timestamp": datetime.datetime.now(datetime.UTC)
+    }
+
+def get_gcra_result(allowed: bool, tat: float, now: float, emission_interval: float, burst_tolerance: float) -> Tuple[bool, int, int]:
+    """
+    Turn a theoretical arrival time into the (allowed, remaining, reset) tuple returned by backends.
+    `tat` is the updated TAT for allowed checks and the stored TAT for rejected ones.
+    reset is when the bucket is full again, or for rejected checks the exact time a retry will succeed.
+    """
+    if allowed:
+        # Small epsilon so float rounding of tat - now never costs a whole permit
+        remaining = int((burst_tolerance - (tat - now)) / emission_interval + 1e-9)
+        return True, max(0, remaining), math.ceil(tat)
+    return False, 0, math.ceil(tat + emission_interval - burst_tolerance)
+
+def get_window_batch_results(config, granted: int, count: int, previous: float, window_end_ts: int, size: int) -> List[Tuple[bool, int, int]]:
+    """
+    Results for `size` checks against one window counter that were reserved together: the first
+    `granted` are allowed, in order, and the counter reads `count` after the reservation.
+    """
+    first = count - granted
+    return [
+        (True, max(0, int(config.limit - (first + n + 1) - previous)), window_end_ts) if n < granted else (False, 0, window_end_ts)
+        for n in range(size)
+    ]
+
+class RateLimitRule:
+    """Immutable, session-independent copy of a RateLimitConfig row held by RateLimitConfigIndex."""
+    __slots__ = ("api_key", "customer_id", "endpoint", "limit", "period_seconds", "algorithm", "burst", "usage_sample_rate")
+
+    def __init__(self, api_key, customer_id, endpoint, limit, period_seconds, algorithm=FIXED_WINDOW, burst=None, usage_sample_rate=None):
+        self.api_key = api_key
+        self.customer_id = customer_id
+        self.endpoint = endpoint
+        self.limit = limit
+        self.period_seconds = period_seconds
+        self.algorithm = algorithm or FIXED_WINDOW
+        self.burst = burst
+        self.usage_sample_rate = usage_sample_rate
+
+    @classmethod
+    def from_config(cls, config: RateLimitConfig) -> "RateLimitRule":
+        return cls(config.api_key, config.customer_id, config.endpoint, config.limit,
+                   config.period_seconds, config.algorithm, config.burst, config.usage_sample_rate)
+
+# In-process index of every RateLimitConfig row, keyed by (api_key, endpoint)
+class RateLimitConfigIndex:
+    """
+    Holds all rate limit configs in memory so that config resolution on the check path is a dict lookup.
+    The index always contains every row, so a miss is a cached negative answer for unknown keys and
+    endpoints. Rebuilds replace the whole dict in a single assignment, so readers never see a partial
+    index and never take a lock. The index is rebuilt whenever crud/rate_limit.py changes a config
+    and at least every `ttl_seconds`, which bounds staleness against writes made by other workers.
+    """
+    def __init__(self, ttl_seconds: float = 30.0):
+        self.ttl_seconds = ttl_seconds
+        self._rules = None
+        self._loaded_at = 0.0
+        self._rebuild_lock = threading.Lock()
+
+    def rebuild(self, db: Session) -> dict:
+        # Serialise rebuilds so an older snapshot can never overwrite a newer one
+        with self._rebuild_lock:
+            return self._install(db.query(RateLimitConfig).all())
+
+    def refresh(self, db: Session) -> dict:
+        """Rebuild a missing or expired index, unless another thread did while this one waited."""
+        with self._rebuild_lock:
+            rules = self._current_rules()
+            if rules is not None:
+                return rules
+            return self._install(db.query(RateLimitConfig).all())
+
+    def _install(self, configs) -> dict:
+        rules = {}
+        for config in configs:
+            rules[(config.api_key, config.endpoint)] = RateLimitRule.from_config(config)
+        self._rules = rules
+        self._loaded_at = time.monotonic()
+        return rules
+
+    def invalidate(self):
+        self._rules = None
+
+    def _current_rules(self):
+        rules = self._rules
+        if rules is None or time.monotonic() - self._loaded_at > self.ttl_seconds:
+            return None
+        return rules
+
+    def get(self, db: Session, api_key: str, endpoint: Optional[str] = None) -> Optional[RateLimitRule]:
+        rules = self._current_rules()
+        if rules is None:
+            rules = self.refresh(db)
+        return rules.get((api_key, endpoint))
+
+    async def aget(self, db: AsyncSession, api_key: str, endpoint: Optional[str] = None) -> Optional[RateLimitRule]:
+        rules = self._current_rules()
+        if rules is None:
+            # The swap itself is a single assignment; the threading lock is not held across the await
+            rules = self._install(await crud_rate_limit.alist_rate_limits(db))
+        return rules.get((api_key, endpoint))
 
 # Backend abstraction for rate limit storage
 class RateLimitBackend:
@@ -19,46 +187,157 @@ class RateLimitBackend:
         raise NotImplementedError
     def get_config(self, *args, **kwargs):
         raise NotImplementedError
+    def check_and_log_many(self, checks, align_to_minute=False):
+        # checks: list of (api_key, identifier, endpoint, config); backends may override to batch storage work
+        return [self.check_and_log(api_key, identifier, endpoint, config, align_to_minute) for api_key, identifier, endpoint, config in checks]
+
+# Async counterpart of RateLimitBackend, used by the async check route
+class AsyncRateLimitBackend:
+    async def acheck_and_log(self, *args, **kwargs):
+        raise NotImplementedError
+    async def asummarize_usage(self, *args, **kwargs):
+        raise NotImplementedError
+    async def areset_usage(self, *args, **kwargs):
+        raise NotImplementedError
+    async def aget_config(self, *args, **kwargs):
+        raise NotImplementedError
+    async def acheck_and_log_many(self, checks, align_to_minute=False):
+        return [await self.acheck_and_log(api_key, identifier, endpoint, config, align_to_minute) for api_key, identifier, endpoint, config in checks]
 
-# In-memory backend (thread-safe)
-class InMemoryRateLimitBackend(RateLimitBackend):
+# One shard of the in-memory counters, with its own lock and expiry schedule
+class CounterStripe:
     def __init__(self):
         self.usage = {}
+        # GCRA state: one theoretical arrival time per (api_key, identifier, endpoint)
+        self.tats = {}
         self.lock = threading.Lock()
+        # Bucketed expiry: expiry timestamp -> keys to drop then, plus a min-heap of those timestamps.
+        # Every key is scheduled once when created, so sweeping is amortised O(1) per key.
+        self.expiry_buckets = {}
+        self.expiry_heap = []
+        self.evictions = 0
+
+    def schedule_expiry(self, key, expires_at):
+        # Caller holds self.lock
+        bucket = self.expiry_buckets.get(expires_at)
+        if bucket is None:
+            bucket = self.expiry_buckets[expires_at] = []
+            heapq.heappush(self.expiry_heap, expires_at)
+        bucket.append(key)
+
+    def sweep(self, now_ts):
+        # Caller holds self.lock. Drops every window that has ended and every GCRA state
+        # whose TAT has passed (a full bucket is the same as no state at all).
+        while self.expiry_heap and self.expiry_heap[0] <= now_ts:
+            for key in self.expiry_buckets.pop(heapq.heappop(self.expiry_heap)):
+                if len(key) == 4:
+                    if self.usage.pop(key, None) is not None:
+                        self.evictions += 1
+                    continue
+                tat = self.tats.get(key)
+                if tat is None:
+                    continue
+                if tat <= now_ts:
+                    del self.tats[key]
+                    self.evictions += 1
+                else:
+                    # TAT moved forward since it was scheduled; check again when it passes
+                    self.schedule_expiry(key, math.ceil(tat))
+
+# In-memory backend (thread-safe, lock-striped)
+class InMemoryRateLimitBackend(RateLimitBackend, AsyncRateLimitBackend):
+    def __init__(self, num_stripes: int = 16):
+        # Counters are sharded by (api_key, identifier) so concurrent checks rarely share a lock
+        self.stripes = [CounterStripe() for _ in range(num_stripes)]
         self.configs = {}
 
+    def get_stripe(self, api_key, identifier) -> CounterStripe:
+        return self.stripes[hash((api_key, identifier)) % len(self.stripes)]
+
     def check_and_log(self, api_key, identifier, endpoint, config, align_to_minute):
-        now = datetime.datetime.now(datetime.UTC)
-        if align_to_minute:
-            window_start = now.replace(second=0, microsecond=0)
-        else:
-            window_start = now - timedelta(seconds=now.second % config.period_seconds, microseconds=now.microsecond)
-        window_start_ts = int(window_start.timestamp())
-        window_end_ts = window_start_ts + config.period_seconds
+        if getattr(config, "algorithm", FIXED_WINDOW) == GCRA:
+            return self._check_gcra(api_key, identifier, endpoint, config)
+        window_start_ts, window_end_ts = get_window_bounds(config.period_seconds, align_to_minute)
         key = (api_key, identifier, endpoint, window_start_ts)
-        with self.lock:
-            count = self.usage.get(key, 0)
-            allowed = count < config.limit
+        previous_key = (api_key, identifier, endpoint, window_start_ts - config.period_seconds)
+        weight = get_previous_window_weight(config, window_start_ts)
+        # Sliding windows still read a window's count during the following window
+        expires_at = window_end_ts + (config.period_seconds if getattr(config, "algorithm", FIXED_WINDOW) == SLIDING_WINDOW else 0)
+        stripe = self.get_stripe(api_key, identifier)
+        with stripe.lock:
+            stripe.sweep(int(time.time()))
+            count = stripe.usage.get(key, 0)
+            estimated = count + stripe.usage.get(previous_key, 0) * weight
+            allowed = estimated < config.limit
             if allowed:
-                self.usage[key] = count + 1
-            remaining = max(0, config.limit - self.usage.get(key, 0))
+                if count == 0:
+                    stripe.schedule_expiry(key, expires_at)
+                stripe.usage[key] = count + 1
+                estimated += 1
+        remaining = max(0, int(config.limit - estimated))
         return allowed, remaining, window_end_ts
 
+    def _check_gcra(self, api_key, identifier, endpoint, config):
+        emission_interval, burst_tolerance = get_gcra_params(config)
+        key = (api_key, identifier, endpoint)
+        now = datetime.datetime.now(datetime.UTC).timestamp()
+        stripe = self.get_stripe(api_key, identifier)
+        with stripe.lock:
+            stripe.sweep(int(now))
+            stored = stripe.tats.get(key)
+            tat = max(stored or now, now)
+            new_tat = tat + emission_interval
+            allowed = new_tat - now <= burst_tolerance
+            if allowed:
+                if stored is None:
+                    stripe.schedule_expiry(key, math.ceil(new_tat))
+                stripe.tats[key] = new_tat
+        return get_gcra_result(allowed, new_tat if allowed else tat, now, emission_interval, burst_tolerance)
+
+    def sweep_expired(self, now_ts=None):
+        """Evict expired windows and GCRA states now. Returns the number of keys evicted."""
+        now_ts = int(time.time()) if now_ts is None else now_ts
+        evicted = 0
+        for stripe in self.stripes:
+            with stripe.lock:
+                before = stripe.evictions
+                stripe.sweep(now_ts)
+                evicted += stripe.evictions - before
+        return evicted
+
+    def get_stats(self):
+        """Live key and eviction counters for monitoring memory use."""
+        stats = {"live_window_keys": 0, "live_gcra_keys": 0, "scheduled_expiry_buckets": 0, "evictions": 0}
+        for stripe in self.stripes:
+            with stripe.lock:
+                stats["live_window_keys"] += len(stripe.usage)
+                stats["live_gcra_keys"] += len(stripe.tats)
+                stats["scheduled_expiry_buckets"] += len(stripe.expiry_heap)
+                stats["evictions"] += stripe.evictions
+        return stats
+
     def summarize_usage(self, api_key, endpoint=None, from_time=None, to_time=None):
-        with self.lock:
-            total = allowed = rate_limited = 0
-            for (k_api_key, _, k_endpoint, _), count in self.usage.items():
-                if k_api_key == api_key and (endpoint is None or k_endpoint == endpoint):
-                    total += count
-                    allowed += count  # In-memory only tracks allowed
-            return {"total": total, "allowed": allowed, "rate_limited": rate_limited}
+        # Walk one stripe at a time so concurrent checks on other stripes are never blocked
+        total = allowed = rate_limited = 0
+        for stripe in self.stripes:
+            with stripe.lock:
+                for (k_api_key, _, k_endpoint, _), count in stripe.usage.items():
+                    if k_api_key == api_key and (endpoint is None or k_endpoint == endpoint):
+                        total += count
+                        allowed += count  # In-memory only tracks allowed
+        return {"total": total, "allowed": allowed, "rate_limited": rate_limited}
 
     def reset_usage(self, api_key, endpoint=None):
-        with self.lock:
-            keys_to_delete = [k for k in self.usage if k[0] == api_key and (endpoint is None or k[2] == endpoint)]
-            for k in keys_to_delete:
-                del self.usage[k]
-            return len(keys_to_delete)
+        deleted = 0
+        for stripe in self.stripes:
+            with stripe.lock:
+                keys_to_delete = [k for k in stripe.usage if k[0] == api_key and (endpoint is None or k[2] == endpoint)]
+                for k in keys_to_delete:
+                    del stripe.usage[k]
+                for k in [k for k in stripe.tats if k[0] == api_key and (endpoint is None or k[2] == endpoint)]:
+                    del stripe.tats[k]
+                deleted += len(keys_to_delete)
+        return deleted
 
     def get_config(self, api_key, endpoint=None):
         # For test/dev, configs must be set manually
@@ -67,36 +346,111 @@ class InMemoryRateLimitBackend(RateLimitBackend):
     def set_config(self, api_key, endpoint, config):
         self.configs[(api_key, endpoint)] = config
 
+    # In-memory work never waits on I/O and only holds a stripe lock briefly, so the
+    # async interface runs it inline on the event loop
+    async def acheck_and_log(self, api_key, identifier, endpoint, config, align_to_minute):
+        return self.check_and_log(api_key, identifier, endpoint, config, align_to_minute)
+
+    async def acheck_and_log_many(self, checks, align_to_minute=False):
+        return self.check_and_log_many(checks, align_to_minute)
+
+    async def asummarize_usage(self, api_key, endpoint=None, from_time=None, to_time=None):
+        return self.summarize_usage(api_key, endpoint, from_time, to_time)
+
+    async def areset_usage(self, api_key, endpoint=None):
+        return self.reset_usage(api_key, endpoint)
+
+    async def aget_config(self, api_key, endpoint=None):
+        return self.get_config(api_key, endpoint)
+
 # DB backend (existing logic)
 class DBRateLimitBackend(RateLimitBackend):
-    def __init__(self, db):
+    def __init__(self, db, config_index=None, usage_writer=None):
         self.db = db
+        self.config_index = config_index
+        # Optional UsageLogWriter: usage rows are then written behind, off the decision path
+        self.usage_writer = usage_writer
     def check_and_log(self, api_key, identifier, endpoint, config, align_to_minute):
-        # Use existing DB logic
-        now = datetime.datetime.now(datetime.UTC)
-        if align_to_minute:
-            window_start = now.replace(second=0, microsecond=0)
+        allowed, remaining, reset = self._check(api_key, identifier, endpoint, config, align_to_minute)
+        event = get_usage_event(api_key, identifier, endpoint, config, allowed)
+        if self.usage_writer is not None or event is None:
+            self.db.commit()
+            if event is not None:
+                self.usage_writer.submit(event)
         else:
-            window_start = now - timedelta(seconds=now.second % config.period_seconds, microseconds=now.microsecond)
-        window_start_ts = int(window_start.timestamp())
-        window_end_ts = window_start_ts + config.period_seconds
-        from ..schemas.usage_log import UsageLogQuery
-        usage_query = UsageLogQuery(
-            api_key=api_key,
-            endpoint=endpoint,
-            identifier=identifier,
-            from_time=datetime.datetime.fromtimestamp(window_start_ts, datetime.UTC),
-            to_time=datetime.datetime.fromtimestamp(window_end_ts, datetime.UTC)
+            # Commits the counter update and the usage row together
+            crud_usage_log.log_usage_batch(self.db, [event])
+        return allowed, remaining, reset
+    def check_and_log_many(self, checks, align_to_minute=False):
+        results = self._check_many(checks, align_to_minute)
+        events = []
+        for (api_key, identifier, endpoint, config), (allowed, _, _) in zip(checks, results):
+            event = get_usage_event(api_key, identifier, endpoint, config, allowed)
+            if event is not None:
+                events.append(event)
+        if self.usage_writer is None and events:
+            crud_usage_log.log_usage_batch(self.db, events, commit=False)
+        # A single commit for every counter update and usage row in the batch
+        self.db.commit()
+        if self.usage_writer is not None:
+            for event in events:
+                self.usage_writer.submit(event)
+        return results
+    def _check_many(self, checks, align_to_minute):
+        # Checks on the same window counter take their hits in one reservation, so a batch costs
+        # one upsert per distinct counter rather than one per check. GCRA checks go one by one.
+        results = [None] * len(checks)
+        windows = {}
+        for i, (api_key, identifier, endpoint, config) in enumerate(checks):
+            if getattr(config, "algorithm", FIXED_WINDOW) == GCRA:
+                results[i] = self._check_gcra(api_key, identifier, endpoint, config)
+                continue
+            window_start_ts, _ = get_window_bounds(config.period_seconds, align_to_minute)
+            windows.setdefault((api_key, identifier, endpoint, window_start_ts), []).append(i)
+        for (api_key, identifier, endpoint, window_start_ts), indices in windows.items():
+            config = checks[indices[0]][3]
+            weight = get_previous_window_weight(config, window_start_ts)
+            previous = 0.0
+            if weight > 0:
+                previous = weight * crud_rate_limit.get_window_count(
+                    self.db, api_key, identifier, endpoint, window_start_ts - config.period_seconds
+                )
+            granted, count = crud_rate_limit.reserve_window_quota(
+                self.db, api_key, identifier, endpoint, window_start_ts, math.ceil(config.limit - previous), len(indices), commit=False
+            )
+            outcomes = get_window_batch_results(config, granted, count, previous, window_start_ts + config.period_seconds, len(indices))
+            for i, outcome in zip(indices, outcomes):
+                results[i] = outcome
+        return results
+    def _check(self, api_key, identifier, endpoint, config, align_to_minute):
+        # Updates counters without committing; callers commit once per check or per batch
+        if getattr(config, "algorithm", FIXED_WINDOW) == GCRA:
+            return self._check_gcra(api_key, identifier, endpoint, config)
+        window_start_ts, window_end_ts = get_window_bounds(config.period_seconds, align_to_minute)
+        weight = get_previous_window_weight(config, window_start_ts)
+        previous = 0.0
+        if weight > 0:
+            previous = weight * crud_rate_limit.get_window_count(
+                self.db, api_key, identifier, endpoint, window_start_ts - config.period_seconds
+            )
+        # One atomic upsert on the window counter instead of counting usage_logs rows.
+        # For sliding windows the current window may only grow while count + previous < limit.
+        count = crud_rate_limit.increment_window_counter(
+            self.db, api_key, identifier, endpoint, window_start_ts, math.ceil(config.limit - previous), commit=False
         )
-        usage_count = len(crud_usage_log.get_usage_logs(self.db, usage_query))
-        if usage_count < config.limit:
-            crud_usage_log.log_usage(self.db, api_key, endpoint, identifier, status="allowed")
-            allowed = True
-        else:
-            crud_usage_log.log_usage(self.db, api_key, endpoint, identifier, status="rate_limited")
-            allowed = False
-        remaining = max(0, config.limit - usage_count - (1 if allowed else 0))
+        allowed = count is not None
+        remaining = max(0, int(config.limit - count - previous)) if allowed else 0
         return allowed, remaining, window_end_ts
+    def _check_gcra(self, api_key, identifier, endpoint, config):
+        emission_interval, burst_tolerance = get_gcra_params(config)
+        now = datetime.datetime.now(datetime.UTC).timestamp()
+        tat = crud_rate_limit.advance_gcra_state(
+            self.db, api_key, identifier, endpoint, now, emission_interval, burst_tolerance, commit=False
+        )
+        if tat is not None:
+            return get_gcra_result(True, tat, now, emission_interval, burst_tolerance)
+        stored_tat = crud_rate_limit.get_gcra_tat(self.db, api_key, identifier, endpoint) or now
+        return get_gcra_result(False, stored_tat, now, emission_interval, burst_tolerance)
     def summarize_usage(self, api_key, endpoint=None, from_time=None, to_time=None):
         from ..schemas.usage_log import UsageLogQuery
         usage_query = UsageLogQuery(
@@ -105,45 +459,729 @@ class DBRateLimitBackend(RateLimitBackend):
             from_time=from_time,
             to_time=to_time
         )
-        logs = crud_usage_log.get_usage_logs(self.db, usage_query)
-        total = len(logs)
-        allowed = sum(1 for log in logs if log.status == "allowed")
-        rate_limited = sum(1 for log in logs if log.status == "rate_limited")
-        return {"total": total, "allowed": allowed, "rate_limited": rate_limited}
+        counts = crud_usage_log.count_usage_by_status(self.db, usage_query)
+        return {
+            "total": sum(counts.values()),
+            "allowed": counts.get("allowed", 0),
+            "rate_limited": counts.get("rate_limited", 0)
+        }
     def reset_usage(self, api_key, endpoint=None):
         from ..models.usage_log import UsageLog
         q = self.db.query(UsageLog).filter(UsageLog.api_key == api_key)
         if endpoint:
             q = q.filter(UsageLog.endpoint == endpoint)
-        count = q.count()
-        q.delete(synchronize_session=False)
-        self.db.commit()
+        count = chunked_delete(self.db, q).deleted
+        crud_rate_limit.delete_window_counters(self.db, api_key, endpoint)
+        crud_rate_limit.delete_gcra_states(self.db, api_key, endpoint)
         return count
     def get_config(self, api_key, endpoint=None):
+        if self.config_index is not None:
+            return self.config_index.get(self.db, api_key, endpoint)
         return crud_rate_limit.get_rate_limit(self.db, api_key, endpoint)
 
+# Quota leases: instead of one counter upsert per check, a node reserves a slice of a fixed
+# window's quota from the shared counter and answers checks from it locally
+class QuotaLease:
+    __slots__ = ("window_start", "permits", "remaining", "size", "granted_at", "last_used", "exhausted")
+
+    def __init__(self, window_start, permits, remaining, size, granted_at):
+        self.window_start = window_start
+        self.permits = permits      # Reserved permits not yet handed out by this node
+        self.remaining = remaining  # Unreserved quota left in the shared counter at grant time
+        self.size = size
+        self.granted_at = granted_at
+        self.last_used = granted_at
+        self.exhausted = permits == 0 and remaining <= 0
+
+class QuotaLeaseManager:
+    """
+    Process-wide store of quota leases, shared by every request session of a worker.
+    Leases are taken from the shared window counter, so the counter never exceeds the limit:
+    nodes cannot over-admit. Lease sizes start at `lease_fraction` of the limit and double or
+    halve so a lease lasts about `target_lease_seconds` at the observed rate, but never exceed
+    `max_lease_fraction` of the quota still unreserved in the window (limit - count at the last
+    grant), so one node cannot take what is left from the others. Permits of a lease unused for
+    `idle_timeout` seconds go back to the counter at the next settlement, within the window.
+    Usage events are buffered, stamped with their decision time, and written with the next lease
+    settlement; call settle(release_all=True) (release_quota_leases) on shutdown.
+    """
+    def __init__(self, lease_fraction: float = 0.05, max_lease_fraction: float = 0.25, target_lease_seconds: float = 1.0, settle_interval: float = 5.0, idle_timeout: float = 1.0):
+        self.lease_fraction = lease_fraction
+        self.max_lease_fraction = max_lease_fraction
+        self.target_lease_seconds = target_lease_seconds
+        self.settle_interval = settle_interval
+        self.idle_timeout = idle_timeout
+        self.leases = {}
+        self.pending_events = []
+        self.expired = []
+        self.last_settled = time.monotonic()
+        self.last_idle_sweep = self.last_settled
+        self.lock = threading.Lock()
+
+    def take(self, key, window_start) -> Optional[Tuple[bool, int]]:
+        """Hand out one permit from the local lease: (allowed, remaining), or None if a new lease is needed."""
+        with self.lock:
+            lease = self.leases.get(key)
+            if lease is None or lease.window_start != window_start:
+                return None
+            if lease.permits > 0:
+                lease.permits -= 1
+                lease.last_used = time.monotonic()
+                return True, lease.permits + lease.remaining
+            if lease.exhausted:
+                # Every permit of this window is taken; reject without asking the database again
+                return False, 0
+            return None
+
+    def next_lease_size(self, key, limit: int, window_start=None) -> int:
+        with self.lock:
+            lease = self.leases.get(key)
+            # Quota not yet reserved by any node, as of this node's last grant in the window
+            available = lease.remaining if lease is not None and lease.window_start == window_start else limit
+            max_size = max(1, math.ceil(max(0, available) * self.max_lease_fraction))
+            if lease is None:
+                return min(max_size, max(1, math.ceil(limit * self.lease_fraction)))
+            elapsed = time.monotonic() - lease.granted_at
+            size = lease.size
+            if elapsed < self.target_lease_seconds:
+                size *= 2
+            elif elapsed > 4 * self.target_lease_seconds or lease.permits > 0:
+                size //= 2
+            return min(max_size, max(1, size))
+
+    def install(self, key, window_start, granted, remaining, size) -> Tuple[bool, int]:
+        """Store a freshly reserved lease and take one permit from it."""
+        with self.lock:
+            lease = self.leases.get(key)
+            if lease is not None and lease.window_start == window_start:
+                # Another request reserved for the same window concurrently; pool the permits
+                granted += lease.permits
+                remaining = min(remaining, lease.remaining)
+            elif lease is not None and lease.permits:
+                # The old window ended with permits unused; hand them back at the next settlement
+                self.expired.append((key, lease.window_start, lease.permits))
+            lease = QuotaLease(window_start, granted, remaining, size, time.monotonic())
+            self.leases[key] = lease
+            if lease.permits == 0:
+                return False, 0
+            lease.permits -= 1
+            return True, lease.permits + lease.remaining
+
+    def record(self, event: dict):
+        with self.lock:
+            self.pending_events.append(event)
+
+    def settle_due(self) -> bool:
+        now = time.monotonic()
+        if now - self.last_settled >= self.settle_interval:
+            return True
+        if now - self.last_idle_sweep < self.idle_timeout:
+            return False
+        # Look for idle leases at most once per idle_timeout
+        with self.lock:
+            self.last_idle_sweep = now
+            return any(lease.permits and now - lease.last_used >= self.idle_timeout for lease in self.leases.values())
+
+    def drain(self, release_all: bool = False):
+        """Take the buffered usage events and the unused permits to return (all leases if release_all)."""
+        with self.lock:
+            now = time.monotonic()
+            events, expired = self.pending_events, self.expired
+            self.pending_events, self.expired = [], []
+            if release_all:
+                expired += [(key, lease.window_start, lease.permits) for key, lease in self.leases.items() if lease.permits]
+                self.leases = {}
+            for key, lease in self.leases.items():
+                if lease.permits and now - lease.last_used >= self.idle_timeout:
+                    # Idle lease: give its permits back now rather than at window end; the
+                    # lease stays (empty) so the next one for this key is sized from it
+                    expired.append((key, lease.window_start, lease.permits))
+                    lease.permits = 0
+            self.last_settled = self.last_idle_sweep = now
+        return events, expired
+
+    def forget(self, api_key, endpoint=None):
+        """Drop leases and buffered events for an API key (optionally one endpoint)."""
+        matches = lambda k_api_key, k_endpoint: k_api_key == api_key and (endpoint is None or k_endpoint == endpoint)
+        with self.lock:
+            self.leases = {k: v for k, v in self.leases.items() if not matches(k[0], k[2])}
+            self.expired = [e for e in self.expired if not matches(e[0][0], e[0][2])]
+            self.pending_events = [e for e in self.pending_events if not matches(e["api_key"], e["endpoint"])]
+
+class LeasedRateLimitBackend(DBRateLimitBackend):
+    """
+    DBRateLimitBackend that answers fixed-window checks from quota leases held in a
+    QuotaLeaseManager, touching the database only to renew a lease or to settle.
+    Sliding-window and GCRA limits go straight to the database as before.
+    """
+    def __init__(self, db, lease_manager: QuotaLeaseManager, config_index=None, usage_writer=None):
+        super().__init__(db, config_index, usage_writer)
+        self.lease_manager = lease_manager
+
+    def check_and_log(self, api_key, identifier, endpoint, config, align_to_minute):
+        if getattr(config, "algorithm", FIXED_WINDOW) != FIXED_WINDOW:
+            return super().check_and_log(api_key, identifier, endpoint, config, align_to_minute)
+        allowed, remaining, reset = self._check(api_key, identifier, endpoint, config, align_to_minute)
+        event = get_usage_event(api_key, identifier, endpoint, config, allowed)
+        if event is not None and self.usage_writer is not None:
+            self.usage_writer.submit(event)
+        elif event is not None:
+            self.lease_manager.record(event)
+        if self.lease_manager.settle_due():
+            self.settle()
+        return allowed, remaining, reset
+
+    def _check(self, api_key, identifier, endpoint, config, align_to_minute):
+        if getattr(config, "algorithm", FIXED_WINDOW) != FIXED_WINDOW:
+            return super()._check(api_key, identifier, endpoint, config, align_to_minute)
+        window_start_ts, window_end_ts = get_window_bounds(config.period_seconds, align_to_minute)
+        key = (api_key, identifier, endpoint)
+        outcome = self.lease_manager.take(key, window_start_ts)
+        if outcome is None:
+            outcome = self._renew(key, config, window_start_ts)
+        allowed, remaining = outcome
+        return allowed, remaining, window_end_ts
+
+    def _check_many(self, checks, align_to_minute):
+        # Fixed windows are answered from leases one by one; there is no counter work to group
+        return [self._check(api_key, identifier, endpoint, config, align_to_minute) for api_key, identifier, endpoint, config in checks]
+
+    def _renew(self, key, config, window_start_ts):
+        api_key, identifier, endpoint = key
+        size = self.lease_manager.next_lease_size(key, config.limit, window_start_ts)
+        self.settle(commit=False)
+        granted, count = crud_rate_limit.reserve_window_quota(
+            self.db, api_key, identifier, endpoint, window_start_ts, config.limit, size, commit=False
+        )
+        self.db.commit()
+        return self.lease_manager.install(key, window_start_ts, granted, config.limit - count, size)
+
+    def settle(self, release_all: bool = False, commit: bool = True):
+        """
+        Write buffered usage events and give unused permits of ended windows back to their counters.
+        Call with release_all=True on shutdown to return every outstanding lease.
+        """
+        events, expired = self.lease_manager.drain(release_all)
+        if events:
+            crud_usage_log.log_usage_batch(self.db, events, commit=False)
+        for (api_key, identifier, endpoint), window_start, unused in expired:
+            crud_rate_limit.release_window_quota(self.db, api_key, identifier, endpoint, window_start, unused, commit=False)
+        if commit:
+            self.db.commit()
+
+    def summarize_usage(self, api_key, endpoint=None, from_time=None, to_time=None):
+        self.settle()
+        return super().summarize_usage(api_key, endpoint, from_time, to_time)
+
+    def reset_usage(self, api_key, endpoint=None):
+        self.lease_manager.forget(api_key, endpoint)
+        return super().reset_usage(api_key, endpoint)
+
+# Redis backend: counters live in Redis (or any server speaking its protocol) so every API node
+# shares them. Each algorithm is one Lua script, so the read, the limit check and the increment
+# happen atomically on the server in a single round trip.
+REDIS_WINDOW_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local weight = tonumber(ARGV[2])
+local count = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = 0
+if weight > 0 then
+    previous = tonumber(redis.call('GET', KEYS[2]) or '0') * weight
+end
+local allowed = 0
+if count + previous < limit then
+    count = redis.call('INCR', KEYS[1])
+    if count == 1 then
+        redis.call('EXPIREAT', KEYS[1], ARGV[3])
+    end
+    allowed = 1
+end
+redis.call('HINCRBY', KEYS[3], ARGV[4] .. (allowed == 1 and 'allowed' or 'rate_limited'), 1)
+return {allowed, math.max(0, math.floor(limit - count - previous))}
+"""
+
+REDIS_GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local emission_interval = tonumber(ARGV[2])
+local burst_tolerance = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tat < now then
+    tat = now
+end
+local new_tat = tat + emission_interval
+local allowed = 0
+if new_tat - now <= burst_tolerance then
+    tat = new_tat
+    redis.call('SET', KEYS[1], string.format('%.6f', tat), 'PX', math.ceil((tat - now) * 1000))
+    allowed = 1
+end
+redis.call('HINCRBY', KEYS[2], ARGV[4] .. (allowed == 1 and 'allowed' or 'rate_limited'), 1)
+return {allowed, string.format('%.6f', tat)}
+"""
+
+def get_redis_client(url: Optional[str] = None, async_client: bool = False):
+    """
+    Return a redis-py client for `url` (default: the REDIS_URL environment variable), or None
+    when no URL is configured; a redis.asyncio client with async_client=True. redis is an
+    optional dependency, only imported here.
+    """
+    url = url or os.getenv("REDIS_URL")
+    if not url:
+        return None
+    try:
+        import redis
+        import redis.asyncio
+    except ImportError as e:
+        raise RuntimeError("REDIS_URL is set but the 'redis' package is not installed.") from e
+    return redis.asyncio.Redis.from_url(url) if async_client else redis.Redis.from_url(url)
+
+class RedisKeyspace:
+    """
+    Key layout and script arguments shared by the sync and async Redis backends. Window counters
+    expire when they stop being read (the end of the window, one period later for sliding
+    windows) and GCRA states when their TAT has passed. Usage totals are kept per API key in a
+    hash of "<endpoint>|<status>" counters.
+    """
+    def __init__(self, client, key_prefix: str = "rlaas"):
+        self.client = client
+        self.key_prefix = key_prefix
+        self.window_script = client.register_script(REDIS_WINDOW_SCRIPT)
+        self.gcra_script = client.register_script(REDIS_GCRA_SCRIPT)
+
+    def window_key(self, api_key, identifier, endpoint, window_start_ts):
+        return f"{self.key_prefix}:w:{api_key}:{endpoint or ''}:{identifier}:{window_start_ts}"
+
+    def gcra_key(self, api_key, identifier, endpoint):
+        return f"{self.key_prefix}:g:{api_key}:{endpoint or ''}:{identifier}"
+
+    def usage_key(self, api_key):
+        return f"{self.key_prefix}:u:{api_key}"
+
+    def state_patterns(self, api_key, endpoint=None):
+        """SCAN patterns matching the window and GCRA keys of an API key (optionally one endpoint)."""
+        pattern_endpoint = _redis_glob_escape(endpoint) if endpoint else "*"
+        return [f"{self.key_prefix}:{kind}:{_redis_glob_escape(api_key)}:{pattern_endpoint}:*" for kind in ("w", "g")]
+
+    def script_call(self, api_key, identifier, endpoint, config, align_to_minute):
+        """(script, keys, args, to_result) for one check; to_result maps the script reply to a result."""
+        stats_field = f"{endpoint or ''}|"
+        if getattr(config, "algorithm", FIXED_WINDOW) == GCRA:
+            emission_interval, burst_tolerance = get_gcra_params(config)
+            now = datetime.datetime.now(datetime.UTC).timestamp()
+            keys = [self.gcra_key(api_key, identifier, endpoint), self.usage_key(api_key)]
+            args = [repr(now), repr(emission_interval), repr(burst_tolerance), stats_field]
+            to_result = lambda r: get_gcra_result(bool(int(r[0])), float(r[1]), now, emission_interval, burst_tolerance)
+            return self.gcra_script, keys, args, to_result
+        window_start_ts, window_end_ts = get_window_bounds(config.period_seconds, align_to_minute)
+        weight = get_previous_window_weight(config, window_start_ts)
+        expires_at = window_end_ts + (config.period_seconds if getattr(config, "algorithm", FIXED_WINDOW) == SLIDING_WINDOW else 0)
+        keys = [
+            self.window_key(api_key, identifier, endpoint, window_start_ts),
+            self.window_key(api_key, identifier, endpoint, window_start_ts - config.period_seconds),
+            self.usage_key(api_key)
+        ]
+        args = [config.limit, repr(weight), expires_at, stats_field]
+        to_result = lambda r: (bool(int(r[0])), int(r[1]), window_end_ts)
+        return self.window_script, keys, args, to_result
+
+    @staticmethod
+    def summarize(stats, endpoint=None) -> dict:
+        # Totals are cumulative counters, so from_time/to_time are not applied (as in memory)
+        summary = {"total": 0, "allowed": 0, "rate_limited": 0}
+        for field, count in stats.items():
+            field_endpoint, status = _redis_str(field).rsplit("|", 1)
+            if endpoint is None or field_endpoint == endpoint:
+                summary["total"] += int(count)
+                summary[status] += int(count)
+        return summary
+
+    @staticmethod
+    def usage_fields(stats, endpoint=None) -> list:
+        return [f for f in stats if endpoint is None or _redis_str(f).rsplit("|", 1)[0] == endpoint]
+
+    @staticmethod
+    def usage_events(checks, results) -> List[dict]:
+        # usage_logs rows for a batch of checks, sampled as on the database path
+        events = []
+        for (api_key, identifier, endpoint, config), (allowed, _, _) in zip(checks, results):
+            event = get_usage_event(api_key, identifier, endpoint, config, allowed)
+            if event is not None:
+                events.append(event)
+        return events
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """
+    Shared rate limit state in Redis (see RedisKeyspace). Configs come from the database through
+    the config index when a session is given, else from set_config. Checks are also logged to
+    usage_logs like on the database path: through `usage_writer` if given, else inline on `db`.
+    """
+    def __init__(self, client, db=None, config_index=None, key_prefix: str = "rlaas", usage_writer=None):
+        self.client = client
+        self.db = db
+        self.config_index = config_index
+        self.usage_writer = usage_writer
+        self.keyspace = RedisKeyspace(client, key_prefix)
+        self.configs = {}
+
+    def check_and_log(self, api_key, identifier, endpoint, config, align_to_minute):
+        script, keys, args, to_result = self.keyspace.script_call(api_key, identifier, endpoint, config, align_to_minute)
+        result = to_result(script(keys=keys, args=args, client=self.client))
+        self._log_usage([(api_key, identifier, endpoint, config)], [result])
+        return result
+
+    def check_and_log_many(self, checks, align_to_minute=False):
+        # One round trip for the whole batch; each script still runs atomically on the server
+        pipe = self.client.pipeline(transaction=False)
+        converters = []
+        for api_key, identifier, endpoint, config in checks:
+            script, keys, args, to_result = self.keyspace.script_call(api_key, identifier, endpoint, config, align_to_minute)
+            script(keys=keys, args=args, client=pipe)
+            converters.append(to_result)
+        results = [to_result(reply) for to_result, reply in zip(converters, pipe.execute())]
+        self._log_usage(checks, results)
+        return results
+
+    def _log_usage(self, checks, results):
+        events = RedisKeyspace.usage_events(checks, results)
+        if not events:
+            return
+        if self.usage_writer is not None:
+            for event in events:
+                self.usage_writer.submit(event)
+        elif self.db is not None:
+            crud_usage_log.log_usage_batch(self.db, events)
+
+    def summarize_usage(self, api_key, endpoint=None, from_time=None, to_time=None):
+        return RedisKeyspace.summarize(self.client.hgetall(self.keyspace.usage_key(api_key)), endpoint)
+
+    def reset_usage(self, api_key, endpoint=None):
+        usage_key = self.keyspace.usage_key(api_key)
+        stats = self.client.hgetall(usage_key)
+        fields = RedisKeyspace.usage_fields(stats, endpoint)
+        deleted = sum(int(stats[f]) for f in fields)
+        with self.client.pipeline(transaction=False) as pipe:
+            if fields:
+                pipe.hdel(usage_key, *fields)
+            for pattern in self.keyspace.state_patterns(api_key, endpoint):
+                for key in self.client.scan_iter(match=pattern, count=500):
+                    pipe.delete(key)
+            pipe.execute()
+        return deleted
+
+    def get_config(self, api_key, endpoint=None):
+        if self.db is not None and self.config_index is not None:
+            return self.config_index.get(self.db, api_key, endpoint)
+        if self.db is not None:
+            return crud_rate_limit.get_rate_limit(self.db, api_key, endpoint)
+        return self.configs.get((api_key, endpoint))
+
+    def set_config(self, api_key, endpoint, config):
+        self.configs[(api_key, endpoint)] = config
+
+class AsyncRedisRateLimitBackend(AsyncRateLimitBackend):
+    """Async counterpart of RedisRateLimitBackend on a redis.asyncio client; same keys and scripts."""
+    def __init__(self, client, db: Optional[AsyncSession] = None, config_index=None, key_prefix: str = "rlaas", usage_writer=None):
+        self.client = client
+        self.db = db
+        self.config_index = config_index
+        self.usage_writer = usage_writer
+        self.keyspace = RedisKeyspace(client, key_prefix)
+        self.configs = {}
+
+    async def acheck_and_log(self, api_key, identifier, endpoint, config, align_to_minute):
+        script, keys, args, to_result = self.keyspace.script_call(api_key, identifier, endpoint, config, align_to_minute)
+        result = to_result(await script(keys=keys, args=args, client=self.client))
+        await self._alog_usage([(api_key, identifier, endpoint, config)], [result])
+        return result
+
+    async def acheck_and_log_many(self, checks, align_to_minute=False):
+        pipe = self.client.pipeline(transaction=False)
+        converters = []
+        for api_key, identifier, endpoint, config in checks:
+            script, keys, args, to_result = self.keyspace.script_call(api_key, identifier, endpoint, config, align_to_minute)
+            await script(keys=keys, args=args, client=pipe)
+            converters.append(to_result)
+        results = [to_result(reply) for to_result, reply in zip(converters, await pipe.execute())]
+        await self._alog_usage(checks, results)
+        return results
+
+    async def _alog_usage(self, checks, results):
+        events = RedisKeyspace.usage_events(checks, results)
+        if not events:
+            return
+        if self.usage_writer is not None:
+            for event in events:
+                # Never block the event loop on a full queue
+                self.usage_writer.submit(event, block=False)
+        elif self.db is not None:
+            await crud_usage_log.alog_usage_batch(self.db, events)
+
+    async def asummarize_usage(self, api_key, endpoint=None, from_time=None, to_time=None):
+        return RedisKeyspace.summarize(await self.client.hgetall(self.keyspace.usage_key(api_key)), endpoint)
+
+    async def areset_usage(self, api_key, endpoint=None):
+        usage_key = self.keyspace.usage_key(api_key)
+        stats = await self.client.hgetall(usage_key)
+        fields = RedisKeyspace.usage_fields(stats, endpoint)
+        deleted = sum(int(stats[f]) for f in fields)
+        async with self.client.pipeline(transaction=False) as pipe:
+            if fields:
+                pipe.hdel(usage_key, *fields)
+            for pattern in self.keyspace.state_patterns(api_key, endpoint):
+                async for key in self.client.scan_iter(match=pattern, count=500):
+                    pipe.delete(key)
+            await pipe.execute()
+        return deleted
+
+    async def aget_config(self, api_key, endpoint=None):
+        if self.db is not None and self.config_index is not None:
+            return await self.config_index.aget(self.db, api_key, endpoint)
+        if self.db is not None:
+            configs = await crud_rate_limit.alist_rate_limits(self.db)
+            return next((c for c in configs if c.api_key == api_key and c.endpoint == endpoint), None)
+        return self.configs.get((api_key, endpoint))
+
+    def set_config(self, api_key, endpoint, config):
+        self.configs[(api_key, endpoint)] = config
+
+def _redis_str(value) -> str:
+    # Clients may or may not be created with decode_responses=True
+    return value.decode() if isinstance(value, bytes) else value
+
+def _redis_glob_escape(value: str) -> str:
+    return "".join("\\" + c if c in "*?[]\\" else c for c in value)
+
+# Async DB backend (AsyncSession, e.g. asyncpg); same storage layout as DBRateLimitBackend
+class AsyncDBRateLimitBackend(AsyncRateLimitBackend):
+    def __init__(self, db: AsyncSession, config_index=None, usage_writer=None):
+        self.db = db
+        self.config_index = config_index
+        self.usage_writer = usage_writer
+    async def acheck_and_log(self, api_key, identifier, endpoint, config, align_to_minute):
+        allowed, remaining, reset = await self._acheck(api_key, identifier, endpoint, config, align_to_minute)
+        event = get_usage_event(api_key, identifier, endpoint, config, allowed)
+        if self.usage_writer is not None or event is None:
+            await self.db.commit()
+            if event is not None:
+                # Never block the event loop on a full queue
+                self.usage_writer.submit(event, block=False)
+        else:
+            # Commits the counter update and the usage row together
+            await crud_usage_log.alog_usage_batch(self.db, [event])
+        return allowed, remaining, reset
+    async def acheck_and_log_many(self, checks, align_to_minute=False):
+        results = await self._acheck_many(checks, align_to_minute)
+        events = []
+        for (api_key, identifier, endpoint, config), (allowed, _, _) in zip(checks, results):
+            event = get_usage_event(api_key, identifier, endpoint, config, allowed)
+            if event is not None:
+                events.append(event)
+        if self.usage_writer is None and events:
+            await crud_usage_log.alog_usage_batch(self.db, events, commit=False)
+        await self.db.commit()
+        if self.usage_writer is not None:
+            for event in events:
+                self.usage_writer.submit(event, block=False)
+        return results
+    async def _acheck_many(self, checks, align_to_minute):
+        # Same grouping as DBRateLimitBackend._check_many
+        results = [None] * len(checks)
+        windows = {}
+        for i, (api_key, identifier, endpoint, config) in enumerate(checks):
+            if getattr(config, "algorithm", FIXED_WINDOW) == GCRA:
+                results[i] = await self._acheck_gcra(api_key, identifier, endpoint, config)
+                continue
+            window_start_ts, _ = get_window_bounds(config.period_seconds, align_to_minute)
+            windows.setdefault((api_key, identifier, endpoint, window_start_ts), []).append(i)
+        for (api_key, identifier, endpoint, window_start_ts), indices in windows.items():
+            config = checks[indices[0]][3]
+            weight = get_previous_window_weight(config, window_start_ts)
+            previous = 0.0
+            if weight > 0:
+                previous = weight * await crud_rate_limit.aget_window_count(
+                    self.db, api_key, identifier, endpoint, window_start_ts - config.period_seconds
+                )
+            granted, count = await crud_rate_limit.areserve_window_quota(
+                self.db, api_key, identifier, endpoint, window_start_ts, math.ceil(config.limit - previous), len(indices), commit=False
+            )
+            outcomes = get_window_batch_results(config, granted, count, previous, window_start_ts + config.period_seconds, len(indices))
+            for i, outcome in zip(indices, outcomes):
+                results[i] = outcome
+        return results
+    async def _acheck(self, api_key, identifier, endpoint, config, align_to_minute):
+        if getattr(config, "algorithm", FIXED_WINDOW) == GCRA:
+            return await self._acheck_gcra(api_key, identifier, endpoint, config)
+        window_start_ts, window_end_ts = get_window_bounds(config.period_seconds, align_to_minute)
+        weight = get_previous_window_weight(config, window_start_ts)
+        previous = 0.0
+        if weight > 0:
+            previous = weight * await crud_rate_limit.aget_window_count(
+                self.db, api_key, identifier, endpoint, window_start_ts - config.period_seconds
+            )
+        count = await crud_rate_limit.aincrement_window_counter(
+            self.db, api_key, identifier, endpoint, window_start_ts, math.ceil(config.limit - previous), commit=False
+        )
+        allowed = count is not None
+        remaining = max(0, int(config.limit - count - previous)) if allowed else 0
+        return allowed, remaining, window_end_ts
+    async def _acheck_gcra(self, api_key, identifier, endpoint, config):
+        emission_interval, burst_tolerance = get_gcra_params(config)
+        now = datetime.datetime.now(datetime.UTC).timestamp()
+        tat = await crud_rate_limit.aadvance_gcra_state(
+            self.db, api_key, identifier, endpoint, now, emission_interval, burst_tolerance, commit=False
+        )
+        if tat is not None:
+            return get_gcra_result(True, tat, now, emission_interval, burst_tolerance)
+        stored_tat = await crud_rate_limit.aget_gcra_tat(self.db, api_key, identifier, endpoint) or now
+        return get_gcra_result(False, stored_tat, now, emission_interval, burst_tolerance)
+    async def asummarize_usage(self, api_key, endpoint=None, from_time=None, to_time=None):
+        stmt = select(UsageLog.status_id, crud_usage_log.usage_count()).where(UsageLog.api_key == api_key)
+        if endpoint:
+            stmt = stmt.where(UsageLog.endpoint == endpoint)
+        if from_time:
+            stmt = stmt.where(UsageLog.timestamp >= from_time)
+        if to_time:
+            stmt = stmt.where(UsageLog.timestamp <= to_time)
+        by_status_id = dict((await self.db.execute(stmt.group_by(UsageLog.status_id))).all())
+        names = await self.db.run_sync(dimension_values, 'status', by_status_id)
+        counts = {names.get(status_id): count for status_id, count in by_status_id.items()}
+        return {
+            "total": sum(counts.values()),
+            "allowed": counts.get("allowed", 0),
+            "rate_limited": counts.get("rate_limited", 0)
+        }
+    async def areset_usage(self, api_key, endpoint=None):
+        stmt = select(UsageLog).where(UsageLog.api_key == api_key)
+        if endpoint:
+            stmt = stmt.where(UsageLog.endpoint == endpoint)
+        # Batched like DBRateLimitBackend.reset_usage
+        count = (await achunked_delete(self.db, stmt)).deleted
+        await crud_rate_limit.adelete_window_counters(self.db, api_key, endpoint)
+        await crud_rate_limit.adelete_gcra_states(self.db, api_key, endpoint)
+        return count
+    async def aget_config(self, api_key, endpoint=None):
+        if self.config_index is not None:
+            return await self.config_index.aget(self.db, api_key, endpoint)
+        configs = await crud_rate_limit.alist_rate_limits(self.db)
+        return next((c for c in configs if c.api_key == api_key and c.endpoint == endpoint), None)
+
+class AsyncLeasedRateLimitBackend(AsyncDBRateLimitBackend):
+    """Async counterpart of LeasedRateLimitBackend, sharing the worker's QuotaLeaseManager."""
+    def __init__(self, db: AsyncSession, lease_manager: QuotaLeaseManager, config_index=None, usage_writer=None):
+        super().__init__(db, config_index, usage_writer)
+        self.lease_manager = lease_manager
+
+    async def acheck_and_log(self, api_key, identifier, endpoint, config, align_to_minute):
+        if getattr(config, "algorithm", FIXED_WINDOW) != FIXED_WINDOW:
+            return await super().acheck_and_log(api_key, identifier, endpoint, config, align_to_minute)
+        allowed, remaining, reset = await self._acheck(api_key, identifier, endpoint, config, align_to_minute)
+        event = get_usage_event(api_key, identifier, endpoint, config, allowed)
+        if event is not None and self.usage_writer is not None:
+            self.usage_writer.submit(event, block=False)
+        elif event is not None:
+            self.lease_manager.record(event)
+        if self.lease_manager.settle_due():
+            await self.asettle()
+        return allowed, remaining, reset
+
+    async def _acheck(self, api_key, identifier, endpoint, config, align_to_minute):
+        if getattr(config, "algorithm", FIXED_WINDOW) != FIXED_WINDOW:
+            return await super()._acheck(api_key, identifier, endpoint, config, align_to_minute)
+        window_start_ts, window_end_ts = get_window_bounds(config.period_seconds, align_to_minute)
+        key = (api_key, identifier, endpoint)
+        outcome = self.lease_manager.take(key, window_start_ts)
+        if outcome is None:
+            outcome = await self._arenew(key, config, window_start_ts)
+        allowed, remaining = outcome
+        return allowed, remaining, window_end_ts
+
+    async def _acheck_many(self, checks, align_to_minute):
+        return [await self._acheck(api_key, identifier, endpoint, config, align_to_minute) for api_key, identifier, endpoint, config in checks]
+
+    async def _arenew(self, key, config, window_start_ts):
+        api_key, identifier, endpoint = key
+        size = self.lease_manager.next_lease_size(key, config.limit, window_start_ts)
+        await self.asettle(commit=False)
+        granted, count = await crud_rate_limit.areserve_window_quota(
+            self.db, api_key, identifier, endpoint, window_start_ts, config.limit, size, commit=False
+        )
+        await self.db.commit()
+        return self.lease_manager.install(key, window_start_ts, granted, config.limit - count, size)
+
+    async def asettle(self, release_all: bool = False, commit: bool = True):
+        """Async version of LeasedRateLimitBackend.settle."""
+        events, expired = self.lease_manager.drain(release_all)
+        if events:
+            await crud_usage_log.alog_usage_batch(self.db, events, commit=False)
+        for (api_key, identifier, endpoint), window_start, unused in expired:
+            await crud_rate_limit.arelease_window_quota(self.db, api_key, identifier, endpoint, window_start, unused, commit=False)
+        if commit:
+            await self.db.commit()
+
+    async def asummarize_usage(self, api_key, endpoint=None, from_time=None, to_time=None):
+        await self.asettle()
+        return await super().asummarize_usage(api_key, endpoint, from_time, to_time)
+
+    async def areset_usage(self, api_key, endpoint=None):
+        self.lease_manager.forget(api_key, endpoint)
+        return await super().areset_usage(api_key, endpoint)
+
 # Backend selector/failover
 class RateLimiter:
-    def __init__(self, db=None, use_in_memory=False, test_mode=False):
+    def __init__(self, db=None, use_in_memory=False, test_mode=False, in_memory_backend=None, config_index=None, redis_client=None, lease_manager=None, usage_writer=None):
         self.db = db
         self.test_mode = test_mode
-        self.in_memory_backend = InMemoryRateLimitBackend()
-        self.db_backend = DBRateLimitBackend(db) if db else None
-        self.active_backend = self.in_memory_backend if (use_in_memory or test_mode or not db) else self.db_backend
+        self.in_memory_backend = in_memory_backend or InMemoryRateLimitBackend()
+        if db and lease_manager is not None:
+            self.db_backend = LeasedRateLimitBackend(db, lease_manager, config_index, usage_writer)
+        else:
+            self.db_backend = DBRateLimitBackend(db, config_index, usage_writer) if db else None
+        # With a Redis client, counters are shared through Redis instead of the database
+        self.shared_backend = RedisRateLimitBackend(redis_client, db, config_index, usage_writer=usage_writer) if redis_client is not None else self.db_backend
+        self.active_backend = self.in_memory_backend if (use_in_memory or test_mode or (not db and redis_client is None)) else self.shared_backend
 
     def set_test_mode(self, enabled=True):
         self.test_mode = enabled
-        self.active_backend = self.in_memory_backend if enabled else (self.db_backend if self.db else self.in_memory_backend)
+        self.active_backend = self.in_memory_backend if enabled else (self.shared_backend or self.in_memory_backend)
 
-    def check_and_log_rate_limit(self, api_key, identifier, endpoint=None, align_to_minute=False):
+    def resolve_config(self, api_key, endpoint=None):
+        # Endpoint-specific config first, then the key-wide one
         config = self.active_backend.get_config(api_key, endpoint)
         if not config and endpoint:
             config = self.active_backend.get_config(api_key, None)
+        return config
+
+    def check_and_log_rate_limit(self, api_key, identifier, endpoint=None, align_to_minute=False, config=None):
+        if config is None:
+            config = self.resolve_config(api_key, endpoint)
         if not config:
             # No config = unlimited
             return True, -1, -1
         return self.active_backend.check_and_log(api_key, identifier, endpoint, config, align_to_minute)
 
+    def check_and_log_rate_limits(self, checks, align_to_minute=False):
+        """
+        Check several (api_key, identifier, endpoint) tuples at once.
+        Configs are resolved once per distinct (api_key, endpoint) and all counter updates go to the
+        backend in one call. Returns one (allowed, remaining, reset) tuple per check, or None where
+        no rate limit config applies.
+        """
+        configs = {}
+        for api_key, _, endpoint in checks:
+            if (api_key, endpoint) not in configs:
+                configs[(api_key, endpoint)] = self.resolve_config(api_key, endpoint)
+        limited = [
+            (i, (api_key, identifier, endpoint, configs[(api_key, endpoint)]))
+            for i, (api_key, identifier, endpoint) in enumerate(checks)
+            if configs[(api_key, endpoint)]
+        ]
+        results = [None] * len(checks)
+        if limited:
+            outcomes = self.active_backend.check_and_log_many([check for _, check in limited], align_to_minute)
+            for (i, _), outcome in zip(limited, outcomes):
+                results[i] = outcome
+        return results
+
     def summarize_usage_for_api_key(self, api_key, endpoint=None, from_time=None, to_time=None):
         return self.active_backend.summarize_usage(api_key, endpoint, from_time, to_time)
 
@@ -157,18 +1195,117 @@ class RateLimiter:
         return self.active_backend.get_config(api_key, endpoint)
 
 
+# Async counterpart of RateLimiter for async routes
+class AsyncRateLimiter:
+    def __init__(self, db: Optional[AsyncSession] = None, use_in_memory=False, in_memory_backend=None, config_index=None, redis_client=None, lease_manager=None, usage_writer=None):
+        self.db = db
+        self.in_memory_backend = in_memory_backend or InMemoryRateLimitBackend()
+        if db is not None and lease_manager is not None:
+            self.db_backend = AsyncLeasedRateLimitBackend(db, lease_manager, config_index, usage_writer)
+        else:
+            self.db_backend = AsyncDBRateLimitBackend(db, config_index, usage_writer) if db is not None else None
+        # With a redis.asyncio client, counters are shared through Redis instead of the database
+        self.shared_backend = AsyncRedisRateLimitBackend(redis_client, db, config_index, usage_writer=usage_writer) if redis_client is not None else self.db_backend
+        self.active_backend = self.in_memory_backend if (use_in_memory or (db is None and redis_client is None)) else self.shared_backend
+
+    async def aresolve_config(self, api_key, endpoint=None):
+        config = await self.active_backend.aget_config(api_key, endpoint)
+        if not config and endpoint:
+            config = await self.active_backend.aget_config(api_key, None)
+        return config
+
+    async def acheck_and_log_rate_limit(self, api_key, identifier, endpoint=None, align_to_minute=False, config=None):
+        if config is None:
+            config = await self.aresolve_config(api_key, endpoint)
+        if not config:
+            # No config = unlimited
+            return True, -1, -1
+        return await self.active_backend.acheck_and_log(api_key, identifier, endpoint, config, align_to_minute)
+
+    async def acheck_and_log_rate_limits(self, checks, align_to_minute=False):
+        """Async version of RateLimiter.check_and_log_rate_limits."""
+        configs = {}
+        for api_key, _, endpoint in checks:
+            if (api_key, endpoint) not in configs:
+                configs[(api_key, endpoint)] = await self.aresolve_config(api_key, endpoint)
+        limited = [
+            (i, (api_key, identifier, endpoint, configs[(api_key, endpoint)]))
+            for i, (api_key, identifier, endpoint) in enumerate(checks)
+            if configs[(api_key, endpoint)]
+        ]
+        results = [None] * len(checks)
+        if limited:
+            outcomes = await self.active_backend.acheck_and_log_many([check for _, check in limited], align_to_minute)
+            for (i, _), outcome in zip(limited, outcomes):
+                results[i] = outcome
+        return results
+
+    async def asummarize_usage_for_api_key(self, api_key, endpoint=None, from_time=None, to_time=None):
+        return await self.active_backend.asummarize_usage(api_key, endpoint, from_time, to_time)
+
+    async def areset_usage_logs_for_api_key(self, api_key, endpoint=None):
+        return await self.active_backend.areset_usage(api_key, endpoint)
+
+
+# Process-wide limiter state, shared by every request handled by this worker
+config_index = RateLimitConfigIndex()
+shared_in_memory_backend = InMemoryRateLimitBackend()
+shared_redis_client = get_redis_client()
+shared_async_redis_client = get_redis_client(async_client=True)
+# Opt-in: set RATE_LIMIT_QUOTA_LEASES=1 to serve fixed-window checks from quota leases
+shared_lease_manager = QuotaLeaseManager() if os.getenv("RATE_LIMIT_QUOTA_LEASES") == "1" else None
+crud_rate_limit.config_change_listeners.append(config_index.rebuild)
+
+def get_shared_usage_writer() -> Optional[UsageLogWriter]:
+    # Usage rows are written behind only while the application has the writer running
+    return usage_log_writer if usage_log_writer.running else None
+
+def get_rate_limiter(db: Session) -> RateLimiter:
+    """Return a RateLimiter bound to `db` that uses the worker's shared config index and in-memory state."""
+    return RateLimiter(
+        db=db, in_memory_backend=shared_in_memory_backend, config_index=config_index,
+        redis_client=shared_redis_client, lease_manager=shared_lease_manager, usage_writer=get_shared_usage_writer()
+    )
+
+def get_async_rate_limiter(db: AsyncSession) -> AsyncRateLimiter:
+    """Async counterpart of get_rate_limiter, sharing the same worker-wide state."""
+    return AsyncRateLimiter(
+        db=db, in_memory_backend=shared_in_memory_backend, config_index=config_index, redis_client=shared_async_redis_client,
+        lease_manager=shared_lease_manager, usage_writer=get_shared_usage_writer()
+    )
+
+def release_quota_leases(session_factory=None) -> None:
+    """
+    Settle the worker's quota leases for shutdown: write the buffered usage rows and hand every
+    unused permit back to its counter. No-op unless quota leases are enabled.
+    """
+    if shared_lease_manager is None:
+        return
+    if session_factory is None:
+        from ..database import SessionLocal
+        session_factory = SessionLocal
+    db = session_factory()
+    try:
+        LeasedRateLimitBackend(db, shared_lease_manager).settle(release_all=True)
+    finally:
+        db.close()
+
 def check_and_log_rate_limit(db: Session, api_key: str, identifier: str, endpoint: Optional[str] = None, align_to_minute: bool = False) -> Tuple[bool, int, int]:
-    rl = RateLimiter(db=db)
+    rl = get_rate_limiter(db)
     return rl.check_and_log_rate_limit(api_key, identifier, endpoint, align_to_minute)
 
+def check_and_log_rate_limits(db: Session, checks: List[Tuple[str, str, Optional[str]]], align_to_minute: bool = False) -> List[Optional[Tuple[bool, int, int]]]:
+    rl = get_rate_limiter(db)
+    return rl.check_and_log_rate_limits(checks, align_to_minute)
+
 def summarize_usage_for_api_key(db: Session, api_key: str, endpoint: Optional[str] = None, from_time: Optional[datetime] = None, to_time: Optional[datetime] = None) -> dict:
-    rl = RateLimiter(db=db)
+    rl = get_rate_limiter(db)
     return rl.summarize_usage_for_api_key(api_key, endpoint, from_time, to_time)
 
 def reset_usage_logs_for_api_key(db: Session, api_key: str, endpoint: Optional[str] = None) -> int:
-    rl = RateLimiter(db=db)
+    rl = get_rate_limiter(db)
     return rl.reset_usage_logs_for_api_key(api_key, endpoint)
 
 def get_rate_limit_config(db: Session, api_key: str, endpoint: Optional[str] = None) -> Optional[RateLimitConfig]:
-    rl = RateLimiter(db=db)
+    rl = get_rate_limiter(db)
     return rl.get_rate_limit_config(api_key, endpoint)
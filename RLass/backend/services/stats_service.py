@@ -6,6 +6,7 @@ from datetime import datetime, timedelta, UTC
 from ..crud import stats as crud_stats
 from ..models.stats import UsageStats
 from ..schemas.stats import UsageStatsCreate, UsageStatsRead
+from ..utils.batch_delete import chunked_delete
 import logging
 
 logger = logging.getLogger("stats_service")
@@ -414,9 +415,9 @@ def archive_old_stats(
 	cutoff_date = datetime.now(UTC) - timedelta(days=days_old)
 	
 	query = db.query(UsageStats).filter(UsageStats.timestamp < cutoff_date)
-	count = query.count()
 	
 	if dry_run:
+		count = query.count()
 		logger.info(f"Dry run: Would archive {count} stats older than {days_old} days")
 		return {
 			'dry_run': True,
@@ -425,15 +426,16 @@ def archive_old_stats(
 			'days_old': days_old
 		}
 	
-	# Actually delete
-	deleted = query.delete()
-	db.commit()
+	# Actually delete, in primary-key batches
+	progress = chunked_delete(db, query)
+	deleted = progress.deleted
 	
 	logger.info(f"Archived {deleted} stats older than {days_old} days")
 	
 	return {
 		'dry_run': False,
 		'deleted': deleted,
+		'batches': progress.batches,
 		'cutoff_date': cutoff_date.isoformat(),
 		'days_old': days_old
 	}
@@ -495,9 +497,9 @@ def prune_low_value_stats(
 		Dict with pruning results
 	"""
 	query = db.query(UsageStats).filter(UsageStats.count <= min_count)
-	count = query.count()
 	
 	if dry_run:
+		count = query.count()
 		logger.info(f"Dry run: Would prune {count} stats with count <= {min_count}")
 		return {
 			'dry_run': True,
@@ -505,14 +507,15 @@ def prune_low_value_stats(
 			'min_count': min_count
 		}
 	
-	deleted = query.delete()
-	db.commit()
+	progress = chunked_delete(db, query)
+	deleted = progress.deleted
 	
 	logger.info(f"Pruned {deleted} low-value stats (count <= {min_count})")
 	
 	return {
 		'dry_run': False,
 		'deleted': deleted,
+		'batches': progress.batches,
 		'min_count': min_count
 	}
 
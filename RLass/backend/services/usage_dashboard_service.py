@@ -1,6 +1,6 @@
 import asyncio
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_, desc
+from sqlalchemy import func, and_, or_, desc, case
 from datetime import datetime, timedelta, UTC
 from typing import Optional, List, Dict, Any
 from functools import lru_cache
@@ -8,7 +8,11 @@ import logging
 
 from ..services.usage_logger import summarize_usage
 from ..services.stats_service import list_stats
+from ..services.usage_rollup import usage_counts
 from ..models.usage_log import UsageLog
+from ..models.usage_dimension import USAGE_STATUS_IDS
+from ..crud.usage_log import usage_count
+from ..crud.usage_dimension import dimension_values
 from ..models.stats import UsageStats
 from ..models.api_key import APIKey
 
@@ -53,36 +57,15 @@ def get_usage_by_time_range(
     if not start_date:
         start_date = end_date - timedelta(days=7)
     
-    query = db.query(UsageLog).filter(
-        UsageLog.identifier == user_id,
-        UsageLog.timestamp >= start_date,
-        UsageLog.timestamp <= end_date
-    )
-    
-    total_requests = query.count()
+    # Read from the usage rollups; the total is the sum of the periods
+    interval = granularity if granularity in ("hour", "day", "week", "month") else None
+    counts = usage_counts(db, start_date, end_date, interval=interval, identifier=user_id)
+    total_requests = sum(counts.values())
     
     # Group by time period
     time_grouped = []
-    if granularity == "hour":
-        results = db.query(
-            func.date_trunc('hour', UsageLog.timestamp).label('period'),
-            func.count(UsageLog.id).label('count')
-        ).filter(
-            UsageLog.identifier == user_id,
-            UsageLog.timestamp >= start_date,
-            UsageLog.timestamp <= end_date
-        ).group_by('period').order_by('period').all()
-        time_grouped = [{"period": str(r.period), "count": r.count} for r in results]
-    elif granularity == "day":
-        results = db.query(
-            func.date_trunc('day', UsageLog.timestamp).label('period'),
-            func.count(UsageLog.id).label('count')
-        ).filter(
-            UsageLog.identifier == user_id,
-            UsageLog.timestamp >= start_date,
-            UsageLog.timestamp <= end_date
-        ).group_by('period').order_by('period').all()
-        time_grouped = [{"period": str(r.period), "count": r.count} for r in results]
+    if interval:
+        time_grouped = [{"period": str(period), "count": count} for (period,), count in sorted(counts.items())]
     
     logger.info(f"Retrieved usage by time range for user {user_id}: {total_requests} requests")
     
@@ -113,35 +96,32 @@ def get_error_breakdown(
     """
     cutoff_time = datetime.now(UTC) - timedelta(hours=time_window)
     
-    # Get all requests in time window
-    total_query = db.query(func.count(UsageLog.id)).filter(
-        UsageLog.identifier == user_id,
-        UsageLog.timestamp >= cutoff_time
-    )
-    total_requests = total_query.scalar() or 0
-    
-    # Get status breakdown
+    # Get status breakdown; the total is its sum, so no separate count query
+    # Grouped by the dimension ids, which are mapped back to names afterwards
     status_breakdown = db.query(
-        UsageLog.status,
-        func.count(UsageLog.id).label('count')
+        UsageLog.status_id,
+        usage_count().label('count')
     ).filter(
         UsageLog.identifier == user_id,
         UsageLog.timestamp >= cutoff_time
-    ).group_by(UsageLog.status).all()
+    ).group_by(UsageLog.status_id).all()
+    total_requests = sum(r.count for r in status_breakdown)
     
     # Get error breakdown by endpoint
     error_by_endpoint = db.query(
-        UsageLog.endpoint,
-        UsageLog.status,
-        func.count(UsageLog.id).label('count')
+        UsageLog.endpoint_id,
+        UsageLog.status_id,
+        usage_count().label('count')
     ).filter(
         UsageLog.identifier == user_id,
         UsageLog.timestamp >= cutoff_time,
         UsageLog.status != "success"
-    ).group_by(UsageLog.endpoint, UsageLog.status).all()
+    ).group_by(UsageLog.endpoint_id, UsageLog.status_id).all()
+    statuses = dimension_values(db, 'status', [r.status_id for r in status_breakdown] + [r.status_id for r in error_by_endpoint])
+    endpoints = dimension_values(db, 'endpoint', (r.endpoint_id for r in error_by_endpoint))
     
     # Calculate rates
-    success_count = sum(r.count for r in status_breakdown if r.status == "success")
+    success_count = sum(r.count for r in status_breakdown if statuses.get(r.status_id) == "success")
     error_count = total_requests - success_count
     
     success_rate = (success_count / total_requests * 100) if total_requests > 0 else 0
@@ -156,9 +136,9 @@ def get_error_breakdown(
         "error_count": error_count,
         "success_rate": round(success_rate, 2),
         "error_rate": round(error_rate, 2),
-        "status_breakdown": [{"status": r.status, "count": r.count} for r in status_breakdown],
+        "status_breakdown": [{"status": statuses.get(r.status_id), "count": r.count} for r in status_breakdown],
         "errors_by_endpoint": [
-            {"endpoint": r.endpoint, "status": r.status, "count": r.count}
+            {"endpoint": endpoints.get(r.endpoint_id), "status": statuses.get(r.status_id), "count": r.count}
             for r in error_by_endpoint
         ]
     }
@@ -185,19 +165,20 @@ def get_top_endpoints(
         List of top endpoints with their usage metrics
     """
     query = db.query(
-        UsageLog.endpoint,
-        func.count(UsageLog.id).label('total_count'),
-        func.sum(func.case((UsageLog.status == 'success', 1), else_=0)).label('success_count'),
-        func.sum(func.case((UsageLog.status != 'success', 1), else_=0)).label('error_count')
+        UsageLog.endpoint_id,
+        usage_count().label('total_count'),
+        func.sum(case((UsageLog.status_id == USAGE_STATUS_IDS['success'], UsageLog.sample_weight), else_=0)).label('success_count'),
+        func.sum(case((UsageLog.status_id != USAGE_STATUS_IDS['success'], UsageLog.sample_weight), else_=0)).label('error_count')
     ).filter(UsageLog.identifier == user_id)
     
     if time_window:
         cutoff_time = datetime.now(UTC) - timedelta(hours=time_window)
         query = query.filter(UsageLog.timestamp >= cutoff_time)
     
-    query = query.group_by(UsageLog.endpoint)
+    query = query.group_by(UsageLog.endpoint_id)
     
     results = query.all()
+    names = dimension_values(db, 'endpoint', (r.endpoint_id for r in results))
     
     # Calculate error rates and format
     endpoints = []
@@ -208,7 +189,7 @@ def get_top_endpoints(
         error_rate = (errors / total * 100) if total > 0 else 0
         
         endpoints.append({
-            "endpoint": r.endpoint,
+            "endpoint": names.get(r.endpoint_id),
             "total_requests": total,
             "success_count": success,
             "error_count": errors,
@@ -329,7 +310,7 @@ def get_quota_status(
         start_time = now - timedelta(days=1)
     
     # Count usage in current period
-    current_usage = db.query(func.count(UsageLog.id)).filter(
+    current_usage = db.query(usage_count()).filter(
         UsageLog.identifier == user_id,
         UsageLog.timestamp >= start_time
     ).scalar() or 0
@@ -1,28 +1,70 @@
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_, desc
+from sqlalchemy import Integer, func, and_, or_, desc, select, text
+from sqlalchemy.exc import DBAPIError, OperationalError
 from ..crud import usage_log as crud_usage_log
+from ..crud.usage_dimension import dimension_values
 from ..schemas.usage_log import UsageLogQuery
-from ..models.usage_log import UsageLog
-from typing import List, Optional, Dict, Any
+from ..models.usage_log import UsageLog, SEARCH_COLUMNS, USAGE_LOG_FIELDS
+from ..models.usage_dimension import USAGE_DIMENSIONS, SEARCH_FTS_TABLES
+from typing import List, Optional, Dict, Any, Iterable, Iterator, Tuple
 import logging
 from datetime import datetime, timedelta, UTC
 from collections import defaultdict
+from ..utils.pagination import clamp_page_size, keyset_page, estimate_count
+from ..utils.batch_delete import chunked_delete
+from ..utils.event_log import EventLog, EventLogLocked, SEGMENT_HEADER, list_segments, read_checkpoint, read_records, write_checkpoint
+from ..utils.ids import new_id
+from ..crud.usage_rollup import naive_utc
+from .usage_rollup import usage_counts
+import csv
+import io
+import itertools
+import json
+import math
+import os
+import queue
+import struct
+import threading
+import time
+import uuid
+import zlib
 
 logger = logging.getLogger("usage_logger")
 
-def log_usage_event(db: Session, api_key: str, endpoint: Optional[str], identifier: str, status: str) -> UsageLog:
+def database_unavailable(error: BaseException) -> bool:
+	"""
+	True if `error` means the database could not be reached (worth retrying, or keeping the
+	events in the local event log); False for errors in the data itself, which no retry fixes.
+	"""
+	return isinstance(error, OperationalError) or (isinstance(error, DBAPIError) and error.connection_invalidated)
+
+def log_usage_event(
+	db: Session,
+	api_key: str,
+	endpoint: Optional[str],
+	identifier: str,
+	status: str,
+	fallback: Optional['UsageEventLog'] = None
+) -> Optional[UsageLog]:
 	"""
 	Log a usage event for an API key and identifier. Returns the created UsageLog.
-	Raises Exception if logging fails.
+	Raises Exception if logging fails, unless the database is unreachable and a `fallback`
+	event log is given: the event is then appended to it (and loaded by its replay later) and
+	None is returned. Errors in the event itself (e.g. an unknown api_key) are always raised.
 	"""
 	try:
 		log = crud_usage_log.log_usage(db, api_key, endpoint, identifier, status)
 		logger.info(f"Logged usage event: api_key={api_key}, endpoint={endpoint}, identifier={identifier}, status={status}")
 		return log
 	except Exception as e:
-		logger.error(f"Failed to log usage event: {e}")
-		raise
+		db.rollback()
+		if fallback is None or not database_unavailable(e):
+			logger.error(f"Failed to log usage event: {e}")
+			raise
+		fallback.submit({'api_key': api_key, 'endpoint': endpoint, 'identifier': identifier, 'status': status})
+		logger.warning(f"Failed to log usage event, appended it to the local event log: {e}")
+		return None
 
 def get_usage_events(db: Session, query: Optional[UsageLogQuery] = None) -> List[UsageLog]:
 	"""
@@ -33,7 +75,16 @@ def get_usage_events(db: Session, query: Optional[UsageLogQuery] = None) -> List
 def delete_usage_events(db: Session, api_key: Optional[str] = None, identifier: Optional[str] = None, before: Optional[datetime] = None) -> int:
 	"""
 	Delete usage logs by api_key, identifier, or before a certain timestamp. Returns number deleted.
+	On a partitioned usage_logs table, a retention delete (only `before` given) drops whole
+	daily partitions and only DELETEs the rows left in the partial day. Rows are deleted in
+	primary-key batches, one transaction each (see utils.batch_delete).
 	"""
+	if isinstance(before, str):
+		before = datetime.fromisoformat(before)
+	dropped_rows = 0
+	if before and not api_key and not identifier and crud_usage_log.usage_logs_partitioned(db):
+		dropped, dropped_rows = crud_usage_log.drop_usage_log_partitions(db, before, count_rows=True)
+		logger.info(f"Dropped {len(dropped)} usage log partitions before {crud_usage_log.utc_day(before)}")
 	q = db.query(UsageLog)
 	if api_key:
 		q = q.filter(UsageLog.api_key == api_key)
@@ -41,38 +92,48 @@ def delete_usage_events(db: Session, api_key: Optional[str] = None, identifier:
 		q = q.filter(UsageLog.identifier == identifier)
 	if before:
 		q = q.filter(UsageLog.timestamp < before)
-	count = q.delete()
-	db.commit()
+	count = chunked_delete(db, q).deleted + dropped_rows
 	logger.info(f"Deleted {count} usage logs (api_key={api_key}, identifier={identifier}, before={before})")
 	return count
 
 def count_usage_events(db: Session, api_key: Optional[str] = None, endpoint: Optional[str] = None, identifier: Optional[str] = None) -> int:
 	"""
-	Count usage logs by api_key, endpoint, or identifier.
+	Count the requests logged for an api_key, endpoint, or identifier (sampled rows count
+	their sample_weight).
 	"""
-	q = db.query(UsageLog)
+	q = db.query(crud_usage_log.usage_count())
 	if api_key:
 		q = q.filter(UsageLog.api_key == api_key)
 	if endpoint:
 		q = q.filter(UsageLog.endpoint == endpoint)
 	if identifier:
 		q = q.filter(UsageLog.identifier == identifier)
-	count = q.count()
+	count = int(q.scalar())
 	logger.info(f"Counted {count} usage logs (api_key={api_key}, endpoint={endpoint}, identifier={identifier})")
 	return count
 
 def summarize_usage(db: Session, group_by: str = "endpoint", api_key: Optional[str] = None, identifier: Optional[str] = None) -> List[dict]:
 	"""
-	Aggregate usage logs, grouped by a field (default: endpoint). Returns a list of dicts with group and count.
+	Aggregate usage logs, grouped by a field (default: endpoint). Returns a list of dicts with
+	group, request count and the standard error of that count. Sampled rows count their
+	sample_weight; the error is 0 for groups without sampled rows.
 	"""
-	from sqlalchemy import func
-	q = db.query(getattr(UsageLog, group_by), func.count(UsageLog.id)).group_by(getattr(UsageLog, group_by))
+	# Dictionary-encoded fields group by their id column; the ids are mapped back afterwards
+	column = getattr(UsageLog, USAGE_DIMENSIONS[group_by][1] if group_by in USAGE_DIMENSIONS else group_by)
+	q = db.query(
+		column,
+		crud_usage_log.usage_count(),
+		crud_usage_log.usage_count_variance()
+	).group_by(column)
 	if api_key:
 		q = q.filter(UsageLog.api_key == api_key)
 	if identifier:
 		q = q.filter(UsageLog.identifier == identifier)
 	results = q.all()
-	summary = [{group_by: r[0], "count": r[1]} for r in results]
+	if group_by in USAGE_DIMENSIONS:
+		names = dimension_values(db, group_by, (r[0] for r in results))
+		results = [(names.get(r[0]), r[1], r[2]) for r in results]
+	summary = [{group_by: r[0], "count": int(r[1]), "standard_error": round(math.sqrt(r[2]), 2)} for r in results]
 	logger.info(f"Usage summary by {group_by}: {summary}")
 	return summary
 
@@ -101,20 +162,9 @@ def batch_log_usage_events(
 			{'api_key': 'key1', 'endpoint': '/api/v1/posts', 'identifier': 'user1', 'status': 'error'},
 		]
 	"""
-	logs = []
-	
 	try:
-		for event in events:
-			log = crud_usage_log.log_usage(
-				db,
-				api_key=event['api_key'],
-				endpoint=event.get('endpoint'),
-				identifier=event['identifier'],
-				status=event['status'],
-				customer_id=event.get('customer_id')
-			)
-			logs.append(log)
-		
+		# One owner lookup and one commit for the whole batch
+		logs = crud_usage_log.log_usage_batch(db, events)
 		logger.info(f"Batch logged {len(logs)} usage events")
 		return logs
 		
@@ -124,6 +174,47 @@ def batch_log_usage_events(
 		raise
 
 
+def bulk_load_usage_events(
+	db: Session,
+	events: Iterable[Dict[str, Any]],
+	chunk_size: int = 10000,
+	fallback: Optional['UsageEventLog'] = None
+) -> int:
+	"""
+	Stream a large number of usage events into usage_logs, e.g. for backfills or replays.
+	
+	Uses PostgreSQL COPY FROM STDIN (multi-row INSERTs on other databases) and commits once
+	at the end. Unlike batch_log_usage_events, no UsageLog objects are returned, so `events`
+	can be a generator over millions of rows.
+	
+	Args:
+		db: Database session
+		events: Iterable of dicts in the batch_log_usage_events format, optionally with
+			'timestamp' (kept as given) and 'id'
+		chunk_size: Rows sent to the database per COPY / INSERT
+		fallback: Local event log to append the events to if loading fails (they are then
+			loaded by its replay); `events` is read into a list first
+	
+	Returns:
+		Number of events loaded (or appended to the fallback)
+	"""
+	if fallback is not None:
+		events = list(events)
+	try:
+		loaded = crud_usage_log.bulk_load_usage(db, events, chunk_size=chunk_size)
+		logger.info(f"Bulk loaded {loaded} usage events")
+		return loaded
+	
+	except Exception as e:
+		db.rollback()
+		if fallback is None or not database_unavailable(e):
+			logger.error(f"Bulk loading failed: {e}")
+			raise
+		fallback.submit_many(events)
+		logger.warning(f"Bulk loading failed, appended {len(events)} usage events to the local event log: {e}")
+		return len(events)
+
+
 def log_usage_with_retry(
 	db: Session,
 	api_key: str,
@@ -175,12 +266,12 @@ def get_usage_events_filtered(
 	start_time: Optional[datetime] = None,
 	end_time: Optional[datetime] = None,
 	limit: Optional[int] = None,
-	offset: int = 0,
-	order_by: str = "timestamp",
-	order_desc: bool = True
+	cursor: Optional[str] = None,
+	order_desc: bool = True,
+	estimate_total: bool = False
 ) -> Dict[str, Any]:
 	"""
-	Advanced filtering with pagination and sorting.
+	Advanced filtering with keyset (cursor) pagination on (timestamp, id).
 	
 	Args:
 		db: Database session
@@ -191,13 +282,17 @@ def get_usage_events_filtered(
 		customer_id: Filter by customer ID
 		start_time: Start of time range
 		end_time: End of time range
-		limit: Maximum number of results
-		offset: Number of results to skip
-		order_by: Field to order by
-		order_desc: Order descending if True
+		limit: Page size, capped at MAX_PAGE_SIZE
+		cursor: 'next_cursor' of the previous page; omit for the first page
+		order_desc: Newest first if True
+		estimate_total: Also return the planner's row estimate for the filtered set
+			(on PostgreSQL the filtered set is never counted)
 	
 	Returns:
-		Dict with 'logs', 'total', 'limit', 'offset'
+		Dict with 'logs', 'limit', 'next_cursor', 'has_more' and 'total' (estimate or None)
+	
+	Raises:
+		ValueError: If the cursor is malformed
 	"""
 	query = db.query(UsageLog)
 	
@@ -217,31 +312,18 @@ def get_usage_events_filtered(
 	if end_time:
 		query = query.filter(UsageLog.timestamp <= end_time)
 	
-	# Count total before pagination
-	total = query.count()
-	
-	# Apply ordering
-	order_field = getattr(UsageLog, order_by, UsageLog.timestamp)
-	if order_desc:
-		query = query.order_by(desc(order_field))
-	else:
-		query = query.order_by(order_field)
+	total = estimate_count(db, query) if estimate_total else None
+	limit = clamp_page_size(limit)
+	logs, next_cursor = keyset_page(query, UsageLog, limit, cursor, descending=order_desc)
 	
-	# Apply pagination
-	if limit:
-		query = query.limit(limit)
-	query = query.offset(offset)
-	
-	logs = query.all()
-	
-	logger.info(f"Filtered usage events: {len(logs)} of {total} total")
+	logger.info(f"Filtered usage events: page of {len(logs)} (estimated total {total})")
 	
 	return {
 		'logs': logs,
 		'total': total,
 		'limit': limit,
-		'offset': offset,
-		'has_more': total > (offset + len(logs))
+		'next_cursor': next_cursor,
+		'has_more': next_cursor is not None
 	}
 
 
@@ -249,34 +331,72 @@ def search_usage_logs(
 	db: Session,
 	search_term: str,
 	search_fields: List[str] = ['endpoint', 'identifier', 'api_key'],
-	limit: int = 100
-) -> List[UsageLog]:
+	limit: int = 100,
+	cursor: Optional[str] = None,
+	start_time: Optional[datetime] = None,
+	end_time: Optional[datetime] = None
+) -> Dict[str, Any]:
 	"""
-	Search usage logs across multiple fields.
+	Case-insensitive substring search across multiple fields, newest first, with keyset
+	(cursor) pagination on (timestamp, id).
+	
+	Each field is matched against its dictionary table (one row per distinct value): with an
+	ILIKE served by a pg_trgm GIN index on PostgreSQL, through the table's FTS5 trigram shadow
+	table on SQLite. The log rows are then found through the integer id indexes. Terms
+	shorter than three characters cannot use either index but still only scan the distinct
+	values.
 	
 	Args:
 		db: Database session
 		search_term: Term to search for
-		search_fields: Fields to search in
-		limit: Maximum results
+		search_fields: Fields to search in (endpoint, identifier, api_key)
+		limit: Page size, capped at MAX_PAGE_SIZE
+		cursor: 'next_cursor' of the previous page; omit for the first page
+		start_time: Start of time range
+		end_time: End of time range
 	
 	Returns:
-		List of matching UsageLog objects
-	"""
-	filters = []
-	for field in search_fields:
-		if hasattr(UsageLog, field):
-			filters.append(getattr(UsageLog, field).ilike(f"%{search_term}%"))
+		Dict with 'logs', 'limit', 'next_cursor' and 'has_more'
 	
-	if not filters:
-		return []
+	Raises:
+		ValueError: If the cursor is malformed
+	"""
+	fields = [field for field in search_fields if field in SEARCH_COLUMNS]
+	limit = clamp_page_size(limit)
+	if not fields or not search_term:
+		return {'logs': [], 'limit': limit, 'next_cursor': None, 'has_more': False}
 	
-	query = db.query(UsageLog).filter(or_(*filters)).limit(limit)
-	results = query.all()
+	query = db.query(UsageLog).filter(_usage_log_search_filter(db, search_term, fields))
+	if start_time:
+		query = query.filter(UsageLog.timestamp >= start_time)
+	if end_time:
+		query = query.filter(UsageLog.timestamp <= end_time)
+	logs, next_cursor = keyset_page(query, UsageLog, limit, cursor)
 	
-	logger.info(f"Search for '{search_term}' returned {len(results)} results")
+	logger.info(f"Search for '{search_term}' returned a page of {len(logs)} results")
 	
-	return results
+	return {
+		'logs': logs,
+		'limit': limit,
+		'next_cursor': next_cursor,
+		'has_more': next_cursor is not None
+	}
+
+
+def _usage_log_search_filter(db: Session, search_term: str, fields: List[str]):
+	if db.get_bind().dialect.name == 'sqlite' and len(search_term) >= 3:
+		# field_id IN (rowids of the dictionary's FTS5 trigram table matching the term as a phrase)
+		phrase = '"' + search_term.replace('"', '""') + '"'
+		return or_(*(
+			getattr(UsageLog, USAGE_DIMENSIONS[field][1]).in_(
+				text(f"SELECT rowid FROM {SEARCH_FTS_TABLES[field]} WHERE {SEARCH_FTS_TABLES[field]} MATCH :search_match")
+				.bindparams(search_match=phrase).columns(rowid=Integer)
+			)
+			for field in fields
+		))
+	# field IN (ids of dictionary values matching the pattern), see DimensionComparator
+	pattern = '%' + search_term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+	return or_(*(getattr(UsageLog, field).ilike(pattern, escape='\\') for field in fields))
 
 
 # ============================================================================
@@ -293,7 +413,7 @@ def get_usage_time_series(
 	interval: str = "hour"
 ) -> List[Dict[str, Any]]:
 	"""
-	Get usage data grouped by time intervals.
+	Get usage data grouped by time intervals, read from the usage rollups (see usage_rollup.usage_counts).
 	
 	Args:
 		db: Database session
@@ -323,31 +443,17 @@ def get_usage_time_series(
 	
 	trunc_interval = interval_map.get(interval, 'hour')
 	
-	query = db.query(
-		func.date_trunc(trunc_interval, UsageLog.timestamp).label('time_bucket'),
-		func.count(UsageLog.id).label('count')
-	).filter(
-		UsageLog.timestamp >= start_time,
-		UsageLog.timestamp <= end_time
+	counts = usage_counts(
+		db, start_time, end_time, interval=trunc_interval,
+		identifier=identifier, api_key=api_key, endpoint=endpoint
 	)
 	
-	if identifier:
-		query = query.filter(UsageLog.identifier == identifier)
-	if api_key:
-		query = query.filter(UsageLog.api_key == api_key)
-	if endpoint:
-		query = query.filter(UsageLog.endpoint == endpoint)
-	
-	query = query.group_by('time_bucket').order_by('time_bucket')
-	
-	results = query.all()
-	
 	time_series = [
 		{
-			'timestamp': r.time_bucket.isoformat() if r.time_bucket else None,
-			'count': r.count
+			'timestamp': bucket.isoformat(),
+			'count': count
 		}
-		for r in results
+		for (bucket,), count in sorted(counts.items())
 	]
 	
 	logger.info(f"Generated time series with {len(time_series)} data points ({interval} interval)")
@@ -372,27 +478,18 @@ def get_hourly_distribution(
 	Returns:
 		Dict mapping hour (0-23) to request count
 	"""
-	start_time = datetime.now(UTC) - timedelta(days=days_back)
+	end_time = datetime.now(UTC)
+	start_time = end_time - timedelta(days=days_back)
 	
-	query = db.query(
-		func.extract('hour', UsageLog.timestamp).label('hour'),
-		func.count(UsageLog.id).label('count')
-	).filter(UsageLog.timestamp >= start_time)
-	
-	if identifier:
-		query = query.filter(UsageLog.identifier == identifier)
-	
-	query = query.group_by('hour').order_by('hour')
-	
-	results = query.all()
+	# Hourly rollups, summed per hour of day
+	counts = usage_counts(db, start_time, end_time, interval='hour', identifier=identifier)
 	
 	# Initialize all hours with 0
 	distribution = {hour: 0 for hour in range(24)}
 	
 	# Fill in actual counts
-	for r in results:
-		if r.hour is not None:
-			distribution[int(r.hour)] = r.count
+	for (bucket,), count in counts.items():
+		distribution[bucket.hour] += count
 	
 	logger.info(f"Hourly distribution calculated for {days_back} days")
 	
@@ -423,11 +520,13 @@ def get_status_breakdown(
 		end_time: End of time range
 	
 	Returns:
-		Dict with status breakdown and rates
+		Dict with status breakdown and rates. Counts are weighted by sample_weight;
+		'standard_error' is the sampling error of total_requests (0 without sampled rows).
 	"""
 	query = db.query(
-		UsageLog.status,
-		func.count(UsageLog.id).label('count')
+		UsageLog.status_id,
+		crud_usage_log.usage_count().label('count'),
+		crud_usage_log.usage_count_variance().label('variance')
 	)
 	
 	if identifier:
@@ -441,14 +540,16 @@ def get_status_breakdown(
 	if end_time:
 		query = query.filter(UsageLog.timestamp <= end_time)
 	
-	query = query.group_by(UsageLog.status)
+	query = query.group_by(UsageLog.status_id)
 	results = query.all()
+	statuses = dimension_values(db, 'status', (r.status_id for r in results))
 	
-	total = sum(r.count for r in results)
-	success_count = sum(r.count for r in results if r.status == 'success')
+	total = sum(int(r.count) for r in results)
+	success_count = sum(int(r.count) for r in results if statuses.get(r.status_id) == 'success')
 	error_count = total - success_count
 	
-	breakdown = {r.status: r.count for r in results}
+	breakdown = {statuses.get(r.status_id): int(r.count) for r in results}
+	standard_error = math.sqrt(sum(r.variance for r in results))
 	
 	success_rate = (success_count / total * 100) if total > 0 else 0
 	error_rate = (error_count / total * 100) if total > 0 else 0
@@ -461,7 +562,8 @@ def get_status_breakdown(
 		'error_count': error_count,
 		'success_rate': round(success_rate, 2),
 		'error_rate': round(error_rate, 2),
-		'breakdown': breakdown
+		'breakdown': breakdown,
+		'standard_error': round(standard_error, 2)
 	}
 
 
@@ -510,6 +612,87 @@ def get_recent_errors(
 # Feature 5: Export & Reporting
 # ============================================================================
 
+EXPORT_COLUMNS = USAGE_LOG_FIELDS
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+
+def iter_usage_log_export(
+	db: Session,
+	query_params: Optional[UsageLogQuery] = None,
+	start_time: Optional[datetime] = None,
+	end_time: Optional[datetime] = None,
+	limit: Optional[int] = None,
+	batch_size: int = 1000
+) -> Iterator[Dict[str, Any]]:
+	"""
+	Yield usage logs as export dicts, oldest first, without loading the result set.
+	
+	All filters and the limit run in SQL, only the exported columns are selected (no ORM
+	objects or relationships), and rows are fetched `batch_size` at a time through a
+	server-side cursor on PostgreSQL, so memory stays flat for any number of rows.
+	
+	Args:
+		db: Database session
+		query_params: Optional query filters
+		start_time: Start of time range
+		end_time: End of time range
+		limit: Maximum number of records
+		batch_size: Rows fetched per round trip
+	"""
+	exported = 0
+	for row in _export_rows(db, query_params, start_time, end_time, limit, batch_size):
+		record = row._asdict()
+		record['timestamp'] = record['timestamp'].isoformat() if record['timestamp'] else None
+		exported += 1
+		yield record
+	
+	logger.info(f"Exported {exported} usage logs")
+
+
+def _export_rows(
+	db: Session,
+	query_params: Optional[UsageLogQuery],
+	start_time: Optional[datetime],
+	end_time: Optional[datetime],
+	limit: Optional[int],
+	batch_size: int
+):
+	# Export columns only, every filter in SQL, fetched batch_size rows at a time. The
+	# dictionary-encoded columns are joined once per row instead of looked up per column.
+	columns, joins = [], []
+	for c in EXPORT_COLUMNS:
+		if c in USAGE_DIMENSIONS:
+			dimension, id_attribute = USAGE_DIMENSIONS[c]
+			columns.append(dimension.value.label(c))
+			joins.append((dimension, dimension.id == getattr(UsageLog, id_attribute)))
+		else:
+			columns.append(getattr(UsageLog, c))
+	stmt = select(*columns).select_from(UsageLog)
+	for dimension, onclause in joins:
+		stmt = stmt.outerjoin(dimension, onclause)
+	if query_params:
+		if query_params.api_key:
+			stmt = stmt.where(UsageLog.api_key == query_params.api_key)
+		if query_params.customer_id:
+			stmt = stmt.where(UsageLog.customer_id == query_params.customer_id)
+		if query_params.endpoint:
+			stmt = stmt.where(UsageLog.endpoint == query_params.endpoint)
+		if query_params.identifier:
+			stmt = stmt.where(UsageLog.identifier == query_params.identifier)
+		if query_params.from_time:
+			stmt = stmt.where(UsageLog.timestamp >= query_params.from_time)
+		if query_params.to_time:
+			stmt = stmt.where(UsageLog.timestamp <= query_params.to_time)
+	if start_time:
+		stmt = stmt.where(UsageLog.timestamp >= start_time)
+	if end_time:
+		stmt = stmt.where(UsageLog.timestamp <= end_time)
+	stmt = stmt.order_by(UsageLog.timestamp, UsageLog.id)
+	if limit:
+		stmt = stmt.limit(limit)
+	return db.execute(stmt.execution_options(yield_per=batch_size))
+
+
 def export_usage_logs_to_dict(
 	db: Session,
 	query_params: Optional[UsageLogQuery] = None,
@@ -519,6 +702,7 @@ def export_usage_logs_to_dict(
 ) -> List[Dict[str, Any]]:
 	"""
 	Export usage logs as list of dicts for CSV/JSON export.
+	Holds the whole result in memory; use stream_usage_logs_export for large exports.
 	
 	Args:
 		db: Database session
@@ -530,34 +714,125 @@ def export_usage_logs_to_dict(
 	Returns:
 		List of usage log dicts
 	"""
-	logs = get_usage_events(db, query_params)
-	
-	# Apply additional filters
-	if start_time:
-		logs = [log for log in logs if log.timestamp >= start_time]
-	if end_time:
-		logs = [log for log in logs if log.timestamp <= end_time]
+	return list(iter_usage_log_export(db, query_params, start_time, end_time, limit))
+
+
+def stream_usage_logs_export(
+	db: Session,
+	export_format: str = 'csv',
+	query_params: Optional[UsageLogQuery] = None,
+	start_time: Optional[datetime] = None,
+	end_time: Optional[datetime] = None,
+	limit: Optional[int] = None,
+	batch_size: int = 1000
+) -> Iterator[str]:
+	"""
+	Stream usage logs as CSV (with a header row) or NDJSON text chunks of `batch_size` rows,
+	e.g. for a StreamingResponse.
 	
-	# Apply limit
-	if limit:
-		logs = logs[:limit]
+	Raises:
+		ValueError: If export_format is not 'csv' or 'ndjson'
+	"""
+	if export_format not in EXPORT_FORMATS:
+		raise ValueError(f"Unsupported export format '{export_format}'")
+	
+	def generate() -> Iterator[str]:
+		buf = io.StringIO()
+		writer = csv.DictWriter(buf, fieldnames=EXPORT_COLUMNS) if export_format == 'csv' else None
+		if writer:
+			writer.writeheader()
+		pending = 0
+		for record in iter_usage_log_export(db, query_params, start_time, end_time, limit, batch_size):
+			if writer:
+				writer.writerow(record)
+			else:
+				buf.write(json.dumps(record))
+				buf.write('\n')
+			pending += 1
+			if pending >= batch_size:
+				yield buf.getvalue()
+				buf.seek(0)
+				buf.truncate()
+				pending = 0
+		if buf.tell():
+			yield buf.getvalue()
+	
+	# A nested generator, so a bad format fails on call rather than on the first chunk
+	return generate()
+
+
+def write_usage_logs_parquet(
+	db: Session,
+	destination,
+	query_params: Optional[UsageLogQuery] = None,
+	start_time: Optional[datetime] = None,
+	end_time: Optional[datetime] = None,
+	limit: Optional[int] = None,
+	row_group_size: int = 100000,
+	compression: str = 'zstd'
+) -> int:
+	"""
+	Write usage logs to a Parquet file for analytics and archiving.
 	
-	export_data = [
-		{
-			'id': log.id,
-			'api_key': log.api_key,
-			'customer_id': log.customer_id,
-			'endpoint': log.endpoint,
-			'identifier': log.identifier,
-			'timestamp': log.timestamp.isoformat() if log.timestamp else None,
-			'status': log.status
-		}
-		for log in logs
-	]
+	Rows are read through the same server-side cursor as the streaming export and written one
+	row group at a time, so memory is bounded by `row_group_size`. api_key, endpoint and status
+	are dictionary-encoded and pages are compressed (zstd by default). The file can be read
+	back without the database, e.g. with pyarrow.parquet.read_table.
+	Requires the optional 'pyarrow' package.
 	
-	logger.info(f"Exported {len(export_data)} usage logs")
+	Args:
+		db: Database session
+		destination: File path or writable binary file object
+		query_params: Optional query filters
+		start_time: Start of time range
+		end_time: End of time range
+		limit: Maximum number of records
+		row_group_size: Rows per Parquet row group
+		compression: Parquet compression codec
 	
-	return export_data
+	Returns:
+		Number of rows written
+	"""
+	try:
+		import pyarrow as pa
+		import pyarrow.parquet as pq
+	except ImportError as e:
+		raise RuntimeError("Parquet export requires the 'pyarrow' package.") from e
+	
+	dictionary = pa.dictionary(pa.int32(), pa.string())
+	schema = pa.schema([
+		('id', pa.string()),
+		('api_key', dictionary),
+		('customer_id', pa.string()),
+		('endpoint', dictionary),
+		('identifier', pa.string()),
+		('timestamp', pa.timestamp('us')),
+		('status', dictionary),
+		('sample_weight', pa.int32())
+	])
+	
+	def to_table(rows) -> 'pa.Table':
+		columns = list(zip(*rows)) if rows else [[] for _ in EXPORT_COLUMNS]
+		return pa.Table.from_arrays(
+			[pa.array(list(values), type=field.type) for values, field in zip(columns, schema, strict=True)],
+			schema=schema
+		)
+	
+	written = 0
+	rows = []
+	with pq.ParquetWriter(destination, schema, compression=compression, use_dictionary=['api_key', 'endpoint', 'status']) as writer:
+		for row in _export_rows(db, query_params, start_time, end_time, limit, min(row_group_size, 10000)):
+			rows.append(tuple(row))
+			if len(rows) >= row_group_size:
+				writer.write_table(to_table(rows), row_group_size=row_group_size)
+				written += len(rows)
+				rows = []
+		if rows or not written:
+			writer.write_table(to_table(rows), row_group_size=row_group_size)
+			written += len(rows)
+	
+	logger.info(f"Wrote {written} usage logs to Parquet")
+	return written
 
 
 def generate_usage_report(
@@ -585,8 +860,8 @@ def generate_usage_report(
 	if not start_time:
 		start_time = end_time - timedelta(days=30)
 	
-	# Get basic counts
-	query = db.query(UsageLog).filter(
+	# Get basic counts (weighted, like the breakdowns below)
+	query = db.query(crud_usage_log.usage_count()).filter(
 		UsageLog.timestamp >= start_time,
 		UsageLog.timestamp <= end_time
 	)
@@ -596,7 +871,7 @@ def generate_usage_report(
 	if api_key:
 		query = query.filter(UsageLog.api_key == api_key)
 	
-	total_requests = query.count()
+	total_requests = int(query.scalar())
 	
 	# Get status breakdown
 	status_breakdown = get_status_breakdown(
@@ -635,3 +910,619 @@ def generate_usage_report(
 	logger.info(f"Generated usage report: {total_requests} requests over {days_in_period} days")
 	
 	return report
+
+
+# ============================================================================
+# Feature 6: Write-Behind Logging
+# ============================================================================
+
+class UsageLogWriter:
+	"""
+	Bounded in-process queue of usage events, written to the database by a background thread.
+	
+	Rate limit checks submit their usage event and return immediately; the writer inserts
+	events in batches of up to `batch_size` rows, or whatever arrived within `flush_interval`
+	seconds of the first event in the batch. When the queue is full, submit() blocks for up to
+	`block_timeout` seconds (backpressure) and then drops the event, counting it in the metrics.
+	A batch whose insert fails because the database is unreachable is retried up to
+	`max_retries` times with exponential backoff (the queue fills up meanwhile, which applies
+	the same backpressure); after that it is appended to the `fallback` event log if there is
+	one, else counted as failed. A batch the database rejects (bad data) is written row by row
+	instead, and only the rejected rows are counted as failed. Rows keep the timestamp their
+	event carries. stop() writes everything still queued before returning.
+	
+	Args:
+		session_factory: Callable returning a new Session (defaults to database.SessionLocal)
+		max_queue_size: Maximum number of events waiting to be written
+		batch_size: Maximum rows per insert transaction
+		flush_interval: Maximum seconds an event waits for its batch to fill
+		block_timeout: Seconds submit() waits for room in a full queue before dropping
+		max_retries: Further attempts at a batch whose insert failed
+		retry_backoff: Seconds before the first retry; doubled for each one after
+		fallback: Local event log (UsageEventLog) that takes a batch the database still
+			cannot be reached for after its retries, instead of dropping it
+	"""
+	
+	def __init__(
+		self,
+		session_factory=None,
+		max_queue_size: int = 10000,
+		batch_size: int = 500,
+		flush_interval: float = 0.05,
+		block_timeout: float = 0.1,
+		max_retries: int = 3,
+		retry_backoff: float = 0.5,
+		fallback: Optional['UsageEventLog'] = None
+	):
+		self.session_factory = session_factory
+		self.batch_size = batch_size
+		self.flush_interval = flush_interval
+		self.block_timeout = block_timeout
+		self.max_retries = max_retries
+		self.retry_backoff = retry_backoff
+		self.fallback = fallback
+		self.queue = queue.Queue(maxsize=max_queue_size)
+		self.thread = None
+		self.stopping = threading.Event()
+		self.metrics_lock = threading.Lock()
+		self.metrics = {
+			'enqueued': 0,
+			'written': 0,
+			'dropped': 0,
+			'failed': 0,
+			'retries': 0,
+			'spilled': 0,
+			'batches': 0,
+			'last_batch_size': 0,
+			'last_flush_seconds': 0.0
+		}
+	
+	@property
+	def running(self) -> bool:
+		return self.thread is not None and self.thread.is_alive()
+	
+	def start(self) -> None:
+		"""Start the background writer thread (no-op if already running)."""
+		if self.running:
+			return
+		if self.session_factory is None:
+			from ..database import SessionLocal
+			self.session_factory = SessionLocal
+		self.stopping.clear()
+		self.thread = threading.Thread(target=self._run, name="usage-log-writer", daemon=True)
+		self.thread.start()
+	
+	def submit(self, event: Dict[str, Any], block: bool = True) -> bool:
+		"""
+		Queue a usage event (same keys as batch_log_usage_events).
+		Returns False if the event was dropped because the queue stayed full.
+		Pass block=False from an event loop so a full queue never stalls it.
+		"""
+		try:
+			self.queue.put(event, block=block, timeout=self.block_timeout if block else None)
+		except queue.Full:
+			self._count('dropped', 1)
+			logger.warning("Usage log queue full, dropping event")
+			return False
+		self._count('enqueued', 1)
+		return True
+	
+	def flush(self) -> None:
+		"""Block until every event queued so far has been written (or failed)."""
+		self.queue.join()
+	
+	def stop(self, timeout: Optional[float] = None) -> None:
+		"""Stop accepting work, write everything still queued and join the writer thread."""
+		if not self.running:
+			return
+		self.stopping.set()
+		self.thread.join(timeout)
+		self.thread = None
+	
+	def get_metrics(self) -> Dict[str, Any]:
+		with self.metrics_lock:
+			metrics = dict(self.metrics)
+		metrics['queue_depth'] = self.queue.qsize()
+		metrics['running'] = self.running
+		return metrics
+	
+	def _count(self, name: str, amount) -> None:
+		with self.metrics_lock:
+			self.metrics[name] += amount
+	
+	def _next_batch(self) -> List[Dict[str, Any]]:
+		try:
+			batch = [self.queue.get(timeout=self.flush_interval)]
+		except queue.Empty:
+			return []
+		deadline = time.monotonic() + self.flush_interval
+		while len(batch) < self.batch_size:
+			wait = deadline - time.monotonic()
+			if wait <= 0 and not self.stopping.is_set():
+				break
+			try:
+				# While stopping, take whatever is left without waiting
+				batch.append(self.queue.get(block=not self.stopping.is_set(), timeout=max(wait, 0)))
+			except queue.Empty:
+				break
+		return batch
+	
+	def _run(self) -> None:
+		while not (self.stopping.is_set() and self.queue.empty()):
+			batch = self._next_batch()
+			if batch:
+				self._write(batch)
+	
+	def _write(self, batch: List[Dict[str, Any]]) -> None:
+		try:
+			for attempt in range(self.max_retries + 1):
+				if attempt:
+					self._count('retries', 1)
+					time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+				error = self._insert(batch)
+				if error is None:
+					return
+				if not database_unavailable(error):
+					# No retry fixes bad data: write the rows one by one so only the rejected ones are lost
+					self._insert_rows(batch)
+					return
+			self._give_up(batch)
+		finally:
+			for _ in batch:
+				self.queue.task_done()
+	
+	def _insert_rows(self, batch: List[Dict[str, Any]]) -> None:
+		for i, event in enumerate(batch):
+			error = self._insert([event])
+			if error is None:
+				continue
+			if database_unavailable(error):
+				self._give_up(batch[i:])
+				return
+			self._count('failed', 1)
+			logger.error(f"Dropping usage event rejected by the database: {error}")
+	
+	def _give_up(self, batch: List[Dict[str, Any]]) -> None:
+		# Only reached while the database is unreachable
+		if self.fallback is not None and self._spill(batch):
+			return
+		self._count('failed', len(batch))
+		logger.error(f"Giving up on {len(batch)} usage events after {self.max_retries + 1} attempts")
+	
+	def _spill(self, batch: List[Dict[str, Any]]) -> bool:
+		try:
+			self.fallback.submit_many(batch)
+		except Exception as e:
+			logger.error(f"Failed to append {len(batch)} usage events to the local event log: {e}")
+			return False
+		self._count('spilled', len(batch))
+		logger.warning(f"Appended {len(batch)} unwritten usage events to the local event log")
+		return True
+	
+	def _insert(self, batch: List[Dict[str, Any]]) -> Optional[Exception]:
+		# Returns None once the batch is written, else the error
+		started = time.monotonic()
+		db = None
+		try:
+			db = self.session_factory()
+			crud_usage_log.log_usage_batch(db, batch)
+			with self.metrics_lock:
+				self.metrics['written'] += len(batch)
+				self.metrics['batches'] += 1
+				self.metrics['last_batch_size'] = len(batch)
+				self.metrics['last_flush_seconds'] = time.monotonic() - started
+			return None
+		except Exception as e:
+			if db is not None:
+				db.rollback()
+			logger.warning(f"Failed to write {len(batch)} usage events: {e}")
+			return e
+		finally:
+			if db is not None:
+				db.close()
+
+
+
+# ============================================================================
+# Feature 7: Streaming NDJSON Ingestion
+# ============================================================================
+
+class NDJSONUsageDecoder:
+	"""
+	Incremental decoder for NDJSON usage events, optionally gzip-compressed.
+	
+	feed() takes body bytes as they arrive and returns one (line_number, event, error) tuple per
+	complete non-blank line, where exactly one of event / error is set; close() handles the
+	last line. Only the current partial line is buffered, so bodies can be of any size.
+	Concatenated gzip members are accepted. Raises ValueError for a corrupt or truncated
+	gzip stream or a line longer than `max_line_bytes`.
+	
+	Each line is a JSON object with 'api_key', 'identifier' and 'status', and optional
+	'endpoint', 'customer_id' and ISO 8601 'timestamp'.
+	"""
+	
+	REQUIRED_FIELDS = ('api_key', 'identifier', 'status')
+	OPTIONAL_FIELDS = ('endpoint', 'customer_id')
+	
+	def __init__(self, gzipped: bool = False, max_line_bytes: int = 1 << 20):
+		self.gzipped = gzipped
+		self.max_line_bytes = max_line_bytes
+		self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else None
+		self.buffer = b''
+		self.line_number = 0
+	
+	def feed(self, data: bytes) -> List[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+		if self.decompressor is not None:
+			data = self._decompress(data)
+		self.buffer += data
+		*lines, self.buffer = self.buffer.split(b'\n')
+		if len(self.buffer) > self.max_line_bytes:
+			raise ValueError(f"Line {self.line_number + len(lines) + 1} exceeds {self.max_line_bytes} bytes")
+		return self._parse_lines(lines)
+	
+	def close(self) -> List[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+		if self.decompressor is not None:
+			if not self.decompressor.eof:
+				raise ValueError("Truncated gzip stream")
+		lines, self.buffer = [self.buffer], b''
+		return self._parse_lines(lines)
+	
+	def _decompress(self, data: bytes) -> bytes:
+		out = []
+		try:
+			while data:
+				out.append(self.decompressor.decompress(data))
+				data = self.decompressor.unused_data
+				if data:
+					# Next gzip member
+					self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+		except zlib.error as e:
+			raise ValueError(f"Invalid gzip stream: {e}")
+		return b''.join(out)
+	
+	def _parse_lines(self, lines: List[bytes]) -> List[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+		parsed = []
+		for line in lines:
+			self.line_number += 1
+			if line.strip():
+				event, error = self._parse(line)
+				parsed.append((self.line_number, event, error))
+		return parsed
+	
+	def _parse(self, line: bytes) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+		try:
+			raw = json.loads(line)
+		except ValueError as e:
+			return None, f"Invalid JSON: {e}"
+		if not isinstance(raw, dict):
+			return None, "Event must be a JSON object"
+		missing = [f for f in self.REQUIRED_FIELDS if not isinstance(raw.get(f), str) or not raw.get(f)]
+		if missing:
+			return None, f"Missing or invalid fields: {', '.join(missing)}"
+		event = {f: raw[f] for f in self.REQUIRED_FIELDS}
+		for field in self.OPTIONAL_FIELDS:
+			event[field] = raw.get(field)
+		if raw.get('timestamp') is not None:
+			try:
+				event['timestamp'] = datetime.fromisoformat(raw['timestamp'])
+			except (TypeError, ValueError):
+				return None, "Invalid timestamp"
+		return event, None
+
+
+# ============================================================================
+# Feature 8: Local Event Log
+# ============================================================================
+
+# Record payload: 16-byte id, int64 microseconds since the Unix epoch (UTC), uint32 sample
+# weight, then each string field as a uint16 byte length (0xFFFF for None) and its UTF-8 bytes
+_EVENT_HEAD = struct.Struct('<16sqI')
+_EVENT_LENGTH = struct.Struct('<H')
+_EVENT_STRINGS = ('api_key', 'customer_id', 'endpoint', 'identifier', 'status')
+_NULL_LENGTH = 0xFFFF
+_EPOCH = datetime(1970, 1, 1)
+
+
+def encode_usage_event(event: Dict[str, Any]) -> bytes:
+	"""Binary event log record for a usage event with 'id' (a UUID string) and 'timestamp'."""
+	micros = (naive_utc(event['timestamp']) - _EPOCH) // timedelta(microseconds=1)
+	parts = [_EVENT_HEAD.pack(uuid.UUID(event['id']).bytes, micros, event.get('sample_weight') or 1)]
+	for field in _EVENT_STRINGS:
+		value = event.get(field)
+		if value is None:
+			parts.append(_EVENT_LENGTH.pack(_NULL_LENGTH))
+			continue
+		raw = value.encode('utf-8')
+		if len(raw) >= _NULL_LENGTH:
+			raise ValueError(f"Usage event field '{field}' is too long")
+		parts.append(_EVENT_LENGTH.pack(len(raw)))
+		parts.append(raw)
+	return b''.join(parts)
+
+
+def decode_usage_event(payload: bytes) -> Dict[str, Any]:
+	"""Inverse of encode_usage_event; the timestamp comes back as naive UTC."""
+	raw_id, micros, sample_weight = _EVENT_HEAD.unpack_from(payload, 0)
+	event = {'id': str(uuid.UUID(bytes=raw_id)), 'timestamp': _EPOCH + timedelta(microseconds=micros), 'sample_weight': sample_weight}
+	offset = _EVENT_HEAD.size
+	for field in _EVENT_STRINGS:
+		(length,) = _EVENT_LENGTH.unpack_from(payload, offset)
+		offset += _EVENT_LENGTH.size
+		if length == _NULL_LENGTH:
+			event[field] = None
+		else:
+			event[field] = bytes(payload[offset:offset + length]).decode('utf-8')
+			offset += length
+	return event
+
+
+# Events the database keeps rejecting on replay, kept next to the segments
+DEAD_LETTER_FILE = "dead-letter.ndjson"
+
+
+class UsageEventLog:
+	"""
+	Durable local ingestion of usage events: a segmented write-ahead log on disk
+	(utils.event_log) that is replayed into usage_logs in bulk.
+	
+	submit() encodes the event and appends it to the active segment, so it costs a buffered
+	file write rather than a database round trip and keeps working while the database is slow
+	or down; fsyncs are batched (see EventLog). It has the same interface as UsageLogWriter and
+	can be passed as a rate limiter backend's usage_writer. A background thread (start()), or
+	the "usage_event_log_replay" maintenance task, loads the records with bulk_load_usage_events
+	and checkpoints how far it got after every committed batch; consumed segments are deleted.
+	
+	A crash between a commit and its checkpoint replays that batch again; the events keep the
+	ids they got on submit, and ones already in usage_logs are skipped. One process per directory.
+	
+	A batch the database rejects (as opposed to being unreachable) is retried one event at a
+	time; events it still rejects are appended to the DEAD_LETTER_FILE (one JSON object with
+	the event and the error per line) so the checkpoint can move past them.
+	
+	Args:
+		directory: Directory for the segments and the checkpoint
+		session_factory: Callable returning a new Session (defaults to database.SessionLocal)
+		segment_size: Bytes preallocated per segment file
+		sync_bytes: fsync after this many appended bytes...
+		sync_interval: ...or this many seconds after the previous fsync
+		replay_interval: Seconds between replays of the background thread
+		batch_size: Events per replay transaction
+	"""
+	
+	def __init__(
+		self,
+		directory: str,
+		session_factory=None,
+		segment_size: int = 64 << 20,
+		sync_bytes: int = 1 << 20,
+		sync_interval: float = 0.05,
+		replay_interval: float = 1.0,
+		batch_size: int = 10000
+	):
+		self.directory = directory
+		self.session_factory = session_factory
+		self.replay_interval = replay_interval
+		self.batch_size = batch_size
+		self.log = EventLog(directory, segment_size, sync_bytes, sync_interval)
+		self.replay_lock = threading.Lock()
+		self.thread = None
+		self.stopping = threading.Event()
+		self.metrics_lock = threading.Lock()
+		self.metrics = {
+			'appended': 0,
+			'replayed': 0,
+			'duplicates_skipped': 0,
+			'failed_replays': 0,
+			'dead_lettered': 0,
+			'torn_segments': 0,
+			'last_replay_seconds': 0.0
+		}
+	
+	@property
+	def running(self) -> bool:
+		return self.thread is not None and self.thread.is_alive()
+	
+	def start(self) -> None:
+		"""Start the background replay thread (no-op if already running)."""
+		if self.running:
+			return
+		self.stopping.clear()
+		self.thread = threading.Thread(target=self._run, name="usage-event-log-replay", daemon=True)
+		self.thread.start()
+	
+	def submit(self, event: Dict[str, Any], block: bool = True) -> bool:
+		"""
+		Append a usage event (same keys as batch_log_usage_events, optionally 'id' and
+		'timestamp'). Always returns True; `block` is accepted for UsageLogWriter compatibility.
+		"""
+		self.submit_many([event])
+		return True
+	
+	def submit_many(self, events: List[Dict[str, Any]]) -> None:
+		"""Append several usage events with a single write."""
+		records = []
+		for event in events:
+			record = dict(event)
+			record['id'] = record.get('id') or new_id()
+			record['timestamp'] = record.get('timestamp') or datetime.now(UTC)
+			records.append(encode_usage_event(record))
+		self.log.append_many(records)
+		self._count('appended', len(records))
+	
+	def flush(self) -> None:
+		"""fsync every event appended so far."""
+		self.log.sync()
+	
+	def stop(self, timeout: Optional[float] = None) -> None:
+		"""Stop the replay thread, replay what is left (if the database is reachable) and close the log."""
+		if self.running:
+			self.stopping.set()
+			self.thread.join(timeout)
+			self.thread = None
+		try:
+			self.replay()
+		except Exception as e:
+			logger.warning(f"Usage events left in the local event log for the next start: {e}")
+		self.log.close()
+	
+	def get_metrics(self) -> Dict[str, Any]:
+		with self.metrics_lock:
+			metrics = dict(self.metrics)
+		metrics['segments'] = len(list_segments(self.directory))
+		metrics['running'] = self.running
+		return metrics
+	
+	def replay(self, db: Optional[Session] = None) -> int:
+		"""
+		Load every record after the checkpoint into usage_logs, `batch_size` per transaction.
+		Returns the number of events loaded. Raises if the database cannot be reached; the
+		checkpoint then still points at the first event not loaded.
+		"""
+		with self.replay_lock:
+			own_session = db is None
+			if own_session:
+				if self.session_factory is None:
+					from ..database import SessionLocal
+					self.session_factory = SessionLocal
+				db = self.session_factory()
+			started = time.monotonic()
+			try:
+				replayed = self._replay(db)
+			except Exception:
+				db.rollback()
+				self._count('failed_replays', 1)
+				raise
+			finally:
+				if own_session:
+					db.close()
+			with self.metrics_lock:
+				self.metrics['replayed'] += replayed
+				self.metrics['last_replay_seconds'] = time.monotonic() - started
+			if replayed:
+				logger.info(f"Replayed {replayed} usage events from the local event log")
+			return replayed
+	
+	def _replay(self, db: Session) -> int:
+		checkpoint_segment, checkpoint_offset = read_checkpoint(self.directory)
+		segments = list_segments(self.directory)
+		replayed, first_batch = 0, True
+		for number, path in segments:
+			if number < checkpoint_segment:
+				# Consumed; left over from an interrupted replay
+				os.remove(path)
+				continue
+			offset = checkpoint_offset if number == checkpoint_segment else SEGMENT_HEADER.size
+			while True:
+				payloads, offset, intact = read_records(path, offset, self.batch_size)
+				if payloads:
+					events = [decode_usage_event(p) for p in payloads]
+					if first_batch:
+						# The only batch that may have been committed before a crash lost its checkpoint
+						events = self._not_loaded(db, events)
+						first_batch = False
+					replayed += self._load(db, events)
+					write_checkpoint(self.directory, number, offset)
+				if len(payloads) < self.batch_size:
+					break
+			# The newest segment may still be written to; older ones are complete
+			if number == segments[-1][0]:
+				break
+			if not intact:
+				self._count('torn_segments', 1)
+				logger.error(f"Skipping the unreadable tail of usage event log segment {path}")
+			write_checkpoint(self.directory, number + 1, SEGMENT_HEADER.size)
+			os.remove(path)
+		return replayed
+	
+	def _load(self, db: Session, events: List[Dict[str, Any]]) -> int:
+		# Commits `events`, leaving out (dead-lettering) the ones the database rejects
+		try:
+			crud_usage_log.bulk_load_usage(db, events, commit=False)
+			db.commit()
+			return len(events)
+		except Exception as e:
+			db.rollback()
+			if database_unavailable(e):
+				raise
+			logger.warning(f"Usage event log batch rejected, loading its {len(events)} events one by one: {e}")
+		loaded = 0
+		for event in events:
+			try:
+				crud_usage_log.bulk_load_usage(db, [event], commit=False)
+				db.commit()
+				loaded += 1
+			except Exception as e:
+				db.rollback()
+				if database_unavailable(e):
+					raise
+				self._dead_letter(event, e)
+		return loaded
+	
+	def _dead_letter(self, event: Dict[str, Any], error: Exception) -> None:
+		# Durable before the checkpoint moves past the event
+		record = {'event': {k: v.isoformat() if isinstance(v, datetime) else v for k, v in event.items()}, 'error': str(error)}
+		with open(os.path.join(self.directory, DEAD_LETTER_FILE), 'a', encoding='utf-8') as f:
+			f.write(json.dumps(record) + '\n')
+			f.flush()
+			os.fsync(f.fileno())
+		self._count('dead_lettered', 1)
+		logger.error(f"Usage event {event.get('id')} rejected by the database, moved to {DEAD_LETTER_FILE}: {error}")
+	
+	def _not_loaded(self, db: Session, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+		loaded = set(db.execute(select(UsageLog.id).where(UsageLog.id.in_([e['id'] for e in events]))).scalars())
+		self._count('duplicates_skipped', len(loaded))
+		return [e for e in events if e['id'] not in loaded]
+	
+	def _count(self, name: str, amount) -> None:
+		with self.metrics_lock:
+			self.metrics[name] += amount
+	
+	def _run(self) -> None:
+		while not self.stopping.wait(self.replay_interval):
+			try:
+				self.replay()
+			except Exception as e:
+				logger.error(f"Usage event log replay failed, retrying: {e}")
+
+
+# Local event log of this process, enabled by pointing USAGE_EVENT_LOG_DIR at a directory;
+# opened by open_usage_event_log() when the application starts (None until then)
+usage_event_log: Optional[UsageEventLog] = None
+
+# Shared writer for the API process; started and stopped with the application. Batches it
+# cannot write go to the local event log when that is enabled.
+usage_log_writer = UsageLogWriter()
+
+
+def open_usage_event_log(directory: Optional[str] = None, **kwargs) -> Optional[UsageEventLog]:
+	"""
+	Open this process's local event log under `directory` (default: USAGE_EVENT_LOG_DIR;
+	nothing happens if neither is set) and make it the fallback of usage_log_writer.
+	
+	Each process claims the first worker-N subdirectory that no other process holds (see
+	EventLog's lock), so all workers of a server can share the directory. Segments left by
+	a worker that exited are replayed by the next process that claims its subdirectory.
+	"""
+	global usage_event_log
+	directory = directory or os.getenv('USAGE_EVENT_LOG_DIR')
+	if not directory or usage_event_log is not None:
+		return usage_event_log
+	for slot in itertools.count():
+		try:
+			usage_event_log = UsageEventLog(os.path.join(directory, f"worker-{slot}"), **kwargs)
+			break
+		except EventLogLocked:
+			continue
+	usage_log_writer.fallback = usage_event_log
+	logger.info(f"Local usage event log at {usage_event_log.directory}")
+	return usage_event_log
+
+
+def close_usage_event_log(timeout: Optional[float] = None) -> None:
+	"""Stop and close the event log opened by open_usage_event_log (a no-op if there is none)."""
+	global usage_event_log
+	if usage_event_log is None:
+		return
+	usage_log_writer.fallback = None
+	usage_event_log.stop(timeout)
+	usage_event_log = None
@@ -0,0 +1,172 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from typing import Optional, Dict, Any, Sequence, Tuple, List
+from datetime import datetime, timedelta, UTC
+from ..crud import usage_rollup as crud_usage_rollup
+from ..crud.usage_rollup import naive_utc
+from ..models.usage_log import UsageLog
+from ..models.usage_rollup import ROLLUP_DIMENSIONS
+import logging
+
+logger = logging.getLogger("usage_rollup")
+
+# Rollup resolutions, coarsest first
+RESOLUTIONS = ('day', 'hour', 'minute')
+# Coarsest rollup that can still be split into buckets of each reporting interval
+INTERVAL_RESOLUTIONS = {
+	'minute': ('minute',),
+	'hour': ('hour', 'minute'),
+	'day': RESOLUTIONS,
+	'week': RESOLUTIONS,
+	'month': RESOLUTIONS,
+	None: RESOLUTIONS
+}
+
+
+def floor_time(ts: datetime, resolution: str) -> datetime:
+	"""Start of the `resolution` ('minute', 'hour', 'day', 'week' or 'month') bucket containing `ts`."""
+	ts = ts.replace(second=0, microsecond=0)
+	if resolution == 'minute':
+		return ts
+	ts = ts.replace(minute=0)
+	if resolution == 'hour':
+		return ts
+	ts = ts.replace(hour=0)
+	if resolution == 'week':
+		return ts - timedelta(days=ts.weekday())
+	if resolution == 'month':
+		return ts.replace(day=1)
+	return ts
+
+
+def _ceil_time(ts: datetime, resolution: str) -> datetime:
+	floor = floor_time(ts, resolution)
+	if floor == ts:
+		return ts
+	return floor + {'minute': timedelta(minutes=1), 'hour': timedelta(hours=1), 'day': timedelta(days=1)}[resolution]
+
+
+def covering_segments(start: datetime, end: datetime, resolutions: Sequence[str] = RESOLUTIONS) -> List[Tuple[Optional[str], datetime, datetime]]:
+	"""
+	Split [start, end) into (resolution, from, to) pieces using the coarsest rollup whose whole
+	buckets fit, finer ones towards the edges, and None (raw usage_logs) for sub-minute edges.
+	"""
+	if start >= end:
+		return []
+	if not resolutions:
+		return [(None, start, end)]
+	resolution, finer = resolutions[0], resolutions[1:]
+	first, last = _ceil_time(start, resolution), floor_time(end, resolution)
+	if first >= last:
+		return covering_segments(start, end, finer)
+	return covering_segments(start, first, finer) + [(resolution, first, last)] + covering_segments(last, end, finer)
+
+
+def usage_counts(
+	db: Session,
+	start_time: datetime,
+	end_time: datetime,
+	interval: Optional[str] = None,
+	dimensions: Sequence[str] = (),
+	**filters: Optional[str]
+) -> Dict[Tuple, int]:
+	"""
+	Count usage in [start_time, end_time) from the rollup tables.
+
+	Whole days come from the day rollup, whole hours from the hour rollup and so on; only
+	sub-minute edges and the stretch after the rollup watermark (not rolled up yet) are read
+	from usage_logs. The cost therefore depends on the length of the range, not on how many
+	requests were logged in it.
+
+	Args:
+		db: Database session
+		start_time: Start of time range
+		end_time: End of time range (exclusive)
+		interval: Bucket the counts by 'minute', 'hour', 'day', 'week' or 'month' (None: no time bucket)
+		dimensions: Also group by these of api_key, endpoint, identifier, status
+		**filters: Equality filters on api_key, endpoint, identifier, status
+
+	Returns:
+		Dict mapping (bucket, *dimension values) - or just the dimension values without an
+		interval - to the request count. A missing endpoint is reported as None.
+	"""
+	if interval not in INTERVAL_RESOLUTIONS:
+		raise ValueError(f"Unsupported interval '{interval}'")
+	unknown = (set(dimensions) | set(filters)) - set(ROLLUP_DIMENSIONS)
+	if unknown:
+		raise ValueError(f"Unknown usage dimensions: {sorted(unknown)}")
+	start, end = naive_utc(start_time), naive_utc(end_time)
+	watermark = crud_usage_rollup.get_rollup_watermark(db)
+	rolled_up = min(max(watermark, start), end) if watermark else start
+
+	segments = covering_segments(start, rolled_up, INTERVAL_RESOLUTIONS[interval])
+	if rolled_up < end:
+		segments.append((None, rolled_up, end))
+
+	counts: Dict[Tuple, int] = {}
+	for resolution, segment_start, segment_end in segments:
+		if resolution is None:
+			rows = crud_usage_rollup.raw_usage_counts(db, segment_start, segment_end, dimensions, filters)
+		else:
+			rows = crud_usage_rollup.rollup_usage_counts(db, resolution, segment_start, segment_end, dimensions, filters)
+		for bucket, *values, count in rows:
+			values = tuple(None if d == 'endpoint' and v == '' else v for d, v in zip(dimensions, values))
+			key = (floor_time(bucket, interval), *values) if interval else values
+			counts[key] = counts.get(key, 0) + int(count)
+	return counts
+
+
+def refresh_usage_rollups(
+	db: Session,
+	now: Optional[datetime] = None,
+	lag: timedelta = timedelta(minutes=2),
+	max_span: timedelta = timedelta(hours=6)
+) -> Dict[str, Any]:
+	"""
+	Roll usage_logs up into the minute, hour and day tables, from the watermark to `lag` before
+	now (so write-behind rows have landed), `max_span` of logs per transaction.
+
+	Each span recomputes its minute buckets from usage_logs and the hour and day buckets it
+	touches from the finer rollup, then advances the watermark. Recomputing is idempotent, so
+	a span interrupted halfway is simply rolled up again by the next run, and backfills that
+	lower the watermark (see crud.usage_log.bulk_load_usage) are picked up the same way.
+
+	Returns:
+		Dict with the rolled-up range and the number of spans
+	"""
+	target = floor_time(naive_utc(now or datetime.now(UTC)) - lag, 'minute')
+	start = crud_usage_rollup.get_rollup_watermark(db)
+	if start is None:
+		first = db.query(func.min(UsageLog.timestamp)).scalar()
+		start = floor_time(first, 'minute') if first else target
+		if start >= target:
+			crud_usage_rollup.advance_rollup_watermark(db, None, target)
+			db.commit()
+			return {'from': target.isoformat(), 'to': target.isoformat(), 'spans': 0}
+		expected = None
+	else:
+		expected = start
+
+	origin, spans = start, 0
+	while start < target:
+		end = min(target, floor_time(start + max_span, 'minute'))
+		minutes = crud_usage_rollup.raw_usage_counts(db, start, end)
+		crud_usage_rollup.replace_rollups(db, 'minute', start, end, minutes)
+		for resolution, finer in (('hour', 'minute'), ('day', 'hour')):
+			resolution_start = floor_time(start, resolution)
+			rows: Dict[Tuple, int] = {}
+			for bucket, *values, count in crud_usage_rollup.rollup_usage_counts(db, finer, resolution_start, end):
+				key = (floor_time(bucket, resolution), *values)
+				rows[key] = rows.get(key, 0) + int(count)
+			crud_usage_rollup.replace_rollups(db, resolution, resolution_start, end, ((*key, count) for key, count in rows.items()))
+		if not crud_usage_rollup.advance_rollup_watermark(db, expected, end):
+			# A backfill moved the watermark back: keep this span's rows, the next run redoes it
+			db.commit()
+			logger.info(f"Usage rollup watermark moved during refresh; stopping at {start}")
+			break
+		db.commit()
+		start = expected = end
+		spans += 1
+
+	logger.info(f"Rolled usage up from {origin} to {start} in {spans} spans")
+	return {'from': origin.isoformat(), 'to': start.isoformat(), 'spans': spans}
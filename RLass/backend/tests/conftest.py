@@ -9,6 +9,8 @@ from backend.models.api_key import APIKey
 from backend.models.audit_log import AuditLog
 from backend.models.usage_log import UsageLog
 from backend.models.rate_limit import RateLimitConfig
+from backend.models.usage_rollup import UsageRollupMinute
+from backend.crud.usage_dimension import clear_dimension_caches
 # Add other models here if needed
 from datetime import datetime, timedelta, UTC
 
@@ -40,6 +42,8 @@ def db_session(engine):
     session.close()
     transaction.rollback()
     connection.close()
+    # Dimension ids committed by the session were rolled back with the outer transaction
+    clear_dimension_caches()
 
 @pytest.fixture(scope="function")
 def test_user(db_session):
@@ -3,3 +3,135 @@ import pytest
 # Add tests for backend/api/rate_limit.py here
 def test_api_rate_limit_placeholder():
     assert True
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from backend.api import rate_limit
+from backend.database import Base, get_db, get_async_db
+from backend.models.user import User
+from backend.crud import rate_limit as crud_rate_limit
+from backend.schemas.rate_limit import RateLimitConfigCreate
+
+# The check routes are async, so they run against a file-backed SQLite database that both
+# the sync setup session and the per-request aiosqlite sessions can open.
+@pytest.fixture
+def db_path(tmp_path):
+    pytest.importorskip("aiosqlite")
+    path = tmp_path / "rate_limit.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+    return path
+
+@pytest.fixture
+def sync_db(db_path):
+    engine = create_engine(f"sqlite:///{db_path}")
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+@pytest.fixture
+def client(db_path, sync_db):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+    async def override_get_async_db():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool)
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            yield db
+        await engine.dispose()
+
+    app = FastAPI()
+    app.include_router(rate_limit.router, prefix="/rate-limit")
+    app.dependency_overrides[get_db] = lambda: sync_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    return TestClient(app)
+
+@pytest.fixture
+def api_key(sync_db):
+    from backend.crud.api_key import create_api_key
+    from backend.schemas.api_key import APIKeyCreate
+    sync_db.add(User(id="1", email="test@example.com", hashed_password="hashed", is_active=True))
+    sync_db.commit()
+    return create_api_key(sync_db, APIKeyCreate(user_id="1")).key
+
+def test_batch_check(client, sync_db, api_key):
+    crud_rate_limit.create_rate_limit(sync_db, RateLimitConfigCreate(api_key=api_key, endpoint="/batch", limit=2, period_seconds=60))
+    checks = [
+        {"api_key": api_key, "identifier": "a", "endpoint": "/batch"},
+        {"api_key": api_key, "identifier": "a", "endpoint": "/batch"},
+        {"api_key": api_key, "identifier": "a", "endpoint": "/batch"},
+        {"api_key": api_key, "identifier": "b", "endpoint": "/batch"},
+        {"api_key": api_key, "identifier": "a", "endpoint": "/unconfigured"},
+    ]
+    response = client.post("/rate-limit/check/batch", json=checks)
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert [d["allowed"] for d in data] == [True, True, False, True, False]
+    assert [d["remaining"] for d in data[:4]] == [1, 0, 0, 1]
+    assert data[2]["message"] == "Rate limit exceeded."
+    assert data[4]["message"] == "No rate limit config found."
+    # Each item carries the status /check would answer with, so throttled and unconfigured differ
+    assert [d["status"] for d in data] == [200, 200, 429, 200, 404]
+    single = client.post("/rate-limit/check", json=checks[4])
+    assert single.status_code == data[4]["status"]
+
+def test_batch_check_size_is_capped(client, api_key):
+    from backend.schemas.check import MAX_BATCH_CHECKS
+    checks = [{"api_key": api_key, "identifier": "a", "endpoint": "/batch"}] * (MAX_BATCH_CHECKS + 1)
+    assert client.post("/rate-limit/check/batch", json=checks).status_code == 422
+
+def test_check_is_async_and_returns_429(client, sync_db, api_key):
+    import inspect
+    assert inspect.iscoroutinefunction(rate_limit.check_rate_limit_endpoint)
+    crud_rate_limit.create_rate_limit(sync_db, RateLimitConfigCreate(api_key=api_key, endpoint="/single", limit=1, period_seconds=60))
+    body = {"api_key": api_key, "identifier": "a", "endpoint": "/single"}
+    first = client.post("/rate-limit/check", json=body)
+    assert first.status_code == 200 and first.json()["data"]["remaining"] == 0
+    second = client.post("/rate-limit/check", json=body)
+    assert second.status_code == 429
+    missing = client.post("/rate-limit/check", json={"api_key": api_key, "identifier": "a", "endpoint": "/missing"})
+    assert missing.status_code == 404
+
+def test_update_config_rejects_unknown_algorithm(client, sync_db, api_key):
+    from pydantic import ValidationError
+    crud_rate_limit.create_rate_limit(sync_db, RateLimitConfigCreate(api_key=api_key, endpoint="/algo", limit=5, period_seconds=60))
+    params = {"endpoint": "/algo", "limit": 5, "period_seconds": 60}
+    response = client.put(f"/rate-limit/rate-limit/config/{api_key}", params={**params, "algorithm": "sliding"})
+    assert response.status_code == 422
+    response = client.put(f"/rate-limit/rate-limit/config/{api_key}", params={**params, "algorithm": "sliding_window"})
+    assert response.status_code == 200 and response.json()["algorithm"] == "sliding_window"
+    with pytest.raises(ValidationError):
+        RateLimitConfigCreate(api_key=api_key, limit=5, period_seconds=60, algorithm="sliding")
+
+def test_update_config_rejects_non_positive_burst(client, sync_db, api_key):
+    from pydantic import ValidationError
+    crud_rate_limit.create_rate_limit(sync_db, RateLimitConfigCreate(api_key=api_key, endpoint="/burst", limit=5, period_seconds=60, algorithm="gcra"))
+    params = {"endpoint": "/burst", "limit": 5, "period_seconds": 60}
+    for burst in (0, -1):
+        assert client.put(f"/rate-limit/rate-limit/config/{api_key}", params={**params, "burst": burst}).status_code == 422
+    response = client.put(f"/rate-limit/rate-limit/config/{api_key}", params={**params, "burst": 2})
+    assert response.status_code == 200 and response.json()["burst"] == 2
+    with pytest.raises(ValidationError):
+        RateLimitConfigCreate(api_key=api_key, limit=5, period_seconds=60, algorithm="gcra", burst=0)
+
+def test_check_runs_on_sqlite_through_the_default_async_session(db_path, sync_db, api_key, monkeypatch):
+    import asyncio
+    from backend import database
+    url = database.async_database_url(f"sqlite:///{db_path}")
+    assert url == f"sqlite+aiosqlite:///{db_path}"
+    assert database.async_database_url("postgresql://u@h/db") == "postgresql+asyncpg://u@h/db"
+    monkeypatch.setattr(database, "ASYNC_DATABASE_URL", url)
+    monkeypatch.setattr(database, "_async_sessionmaker", None)
+    crud_rate_limit.create_rate_limit(sync_db, RateLimitConfigCreate(api_key=api_key, endpoint="/sqlite", limit=1, period_seconds=60))
+    # No get_async_db override: the route opens its session from database.ASYNC_DATABASE_URL
+    app = FastAPI()
+    app.include_router(rate_limit.router, prefix="/rate-limit")
+    body = {"api_key": api_key, "identifier": "a", "endpoint": "/sqlite"}
+    with TestClient(app) as client:
+        assert client.post("/rate-limit/check", json=body).status_code == 200
+        assert client.post("/rate-limit/check", json=body).status_code == 429
+    asyncio.run(database._async_sessionmaker.kw["bind"].dispose())
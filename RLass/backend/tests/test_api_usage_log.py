@@ -1,5 +1,95 @@
 import pytest
+import gzip
+import json
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from backend.api.usage_log import router
+from backend.database import get_db
+from backend.models.usage_log import UsageLog
 
 # Add tests for backend/api/usage_log.py here
 def test_api_usage_log_placeholder():
     assert True
+
+@pytest.fixture
+def client(db_session):
+    app = FastAPI()
+    app.include_router(router, prefix="/usage-log")
+    app.dependency_overrides[get_db] = lambda: db_session
+    return TestClient(app)
+
+def ndjson(events):
+    return "".join(json.dumps(e) + "\n" for e in events).encode()
+
+def test_ingest_gzip_ndjson_in_chunks(client, db_session, test_user):
+    events = [
+        {"api_key": "ingestkey", "endpoint": "/in", "identifier": f"user{i}", "status": "allowed", "customer_id": test_user.id}
+        for i in range(5)
+    ]
+    body = ndjson(events[:3]) + b"not json\n" + ndjson(events[3:])
+    response = client.post(
+        "/usage-log/ingest?chunk_size=2",
+        content=gzip.compress(body),
+        headers={"Content-Encoding": "gzip", "Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert data["accepted"] == 5 and data["rejected"] == 1
+    assert [c["accepted"] for c in data["chunks"]] == [2, 2, 1]
+    assert data["chunks"][1]["rejected"][0]["line"] == 4
+    assert db_session.query(UsageLog).filter(UsageLog.api_key == "ingestkey").count() == 5
+
+def test_ingest_rejects_truncated_gzip(client, db_session):
+    body = gzip.compress(ndjson([{"api_key": "truncated", "identifier": "id", "status": "allowed"}] * 3))
+    response = client.post("/usage-log/ingest", content=body[:-8], headers={"Content-Encoding": "gzip"})
+    assert response.status_code == 400
+    assert response.json()["data"]["retry_from_line"] == 1
+    assert db_session.query(UsageLog).filter(UsageLog.api_key == "truncated").count() == 0
+
+def test_usage_events_are_paginated(client, db_session, test_user):
+    from backend.services.usage_logger import bulk_load_usage_events
+    bulk_load_usage_events(db_session, (
+        {"api_key": "listkey", "endpoint": "/l", "identifier": f"id{i}", "status": "allowed", "customer_id": test_user.id}
+        for i in range(5)
+    ))
+    first = client.get("/usage-log/events?api_key=listkey&limit=3").json()["data"]
+    assert len(first["logs"]) == 3 and first["has_more"]
+    second = client.get(f"/usage-log/events?api_key=listkey&limit=3&cursor={first['next_cursor']}").json()["data"]
+    assert len(second["logs"]) == 2 and second["next_cursor"] is None
+    assert client.get("/usage-log/events?limit=100000").status_code == 422
+
+def test_export_streams_ndjson(client, db_session, test_user):
+    from backend.services.usage_logger import bulk_load_usage_events
+    bulk_load_usage_events(db_session, (
+        {"api_key": "exportkey2", "endpoint": "/x", "identifier": f"id{i}", "status": "allowed", "customer_id": test_user.id}
+        for i in range(3)
+    ))
+    response = client.get("/usage-log/export?format=ndjson&api_key=exportkey2")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(r["identifier"] for r in rows) == ["id0", "id1", "id2"]
+    assert client.get("/usage-log/export?format=xml").status_code == 422
+
+def test_export_parquet(client, db_session, test_user):
+    pq = pytest.importorskip("pyarrow.parquet")
+    import io
+    from backend.services.usage_logger import bulk_load_usage_events
+    bulk_load_usage_events(db_session, (
+        {"api_key": "exportkey3", "endpoint": "/x", "identifier": f"id{i}", "status": "allowed", "customer_id": test_user.id}
+        for i in range(2)
+    ))
+    response = client.get("/usage-log/export?format=parquet&api_key=exportkey3")
+    assert response.status_code == 200
+    table = pq.read_table(io.BytesIO(response.content))
+    assert sorted(table.column("identifier").to_pylist()) == ["id0", "id1"]
+
+def test_search_events(client, db_session, test_user):
+    from backend.services.usage_logger import bulk_load_usage_events
+    bulk_load_usage_events(db_session, (
+        {"api_key": "searchkey2", "endpoint": "/x", "identifier": f"support-ticket-{i}", "status": "allowed", "customer_id": test_user.id}
+        for i in range(3)
+    ))
+    page = client.get("/usage-log/search?q=TICKET&field=identifier&limit=2").json()["data"]
+    assert len(page["logs"]) == 2 and page["has_more"]
+    assert client.get("/usage-log/search?q=ab").status_code == 422
@@ -18,3 +18,12 @@ def test_summarize_audit_events(db_session, test_user):
     assert str(test_user.id) in by_actor.keys()
     by_action = audit.summarize_audit_events_by_action(db_session)
     assert "update" in by_action and by_action["update"] >= 2
+
+def test_get_audit_events_page(db_session, test_user):
+    for i in range(5):
+        audit.log_audit_event(db_session, action="page", actor_id=test_user.id, target=f"t{i}")
+    query = AuditLogQuery(action="page")
+    first, cursor = audit.get_audit_events_page(db_session, query, limit=3)
+    second, last_cursor = audit.get_audit_events_page(db_session, query, limit=3, cursor=cursor)
+    assert len(first) == 3 and len(second) == 2 and last_cursor is None
+    assert {e.id for e in first}.isdisjoint(e.id for e in second)
@@ -0,0 +1,68 @@
+import pytest
+from datetime import datetime
+from backend.models.usage_log import UsageLog
+from backend.models.rate_limit import RateLimitCounter
+from backend.utils.batch_delete import chunked_delete
+
+def _add_logs(db_session, count):
+    db_session.add_all(
+        UsageLog(id=f"del{i:03d}", api_key="delkey", identifier="u", endpoint="/d", status="allowed", timestamp=datetime(2025, 6, 1))
+        for i in range(count)
+    )
+    db_session.commit()
+
+def test_chunked_delete_batches_and_reports_progress(db_session):
+    _add_logs(db_session, 7)
+    seen = []
+    progress = chunked_delete(
+        db_session, db_session.query(UsageLog).filter(UsageLog.api_key == "delkey"),
+        batch_size=3, pause=0, on_progress=lambda p: seen.append((p.deleted, p.last_key))
+    )
+    assert progress.done and progress.deleted == 7 and progress.batches == 3
+    assert seen == [(3, "del002"), (6, "del005"), (7, "del006")]
+    assert db_session.query(UsageLog).filter(UsageLog.api_key == "delkey").count() == 0
+
+def test_chunked_delete_resumes_after_interruption(db_session):
+    _add_logs(db_session, 5)
+    query = db_session.query(UsageLog).filter(UsageLog.api_key == "delkey")
+    first = chunked_delete(db_session, query, batch_size=2, pause=0, max_batches=1)
+    assert not first.done and first.deleted == 2
+    assert query.count() == 3
+    rest = chunked_delete(db_session, query, batch_size=2, pause=0, after=first.last_key)
+    assert rest.done and rest.deleted == 3 and rest.as_dict()["last_key"] == "del004"
+
+def test_chunked_delete_handles_composite_keys(db_session):
+    db_session.add_all(
+        RateLimitCounter(api_key="delkey", identifier=f"u{i % 2}", endpoint="", window_start=i, count=1)
+        for i in range(5)
+    )
+    db_session.commit()
+    query = db_session.query(RateLimitCounter).filter(RateLimitCounter.api_key == "delkey")
+    progress = chunked_delete(db_session, query, batch_size=2, pause=0)
+    assert progress.done and progress.deleted == 5 and progress.batches == 3
+    assert progress.last_key == ("delkey", "u1", "", 3)
+    assert query.count() == 0
+
+def test_achunked_delete_batches_on_an_async_session(tmp_path):
+    pytest.importorskip("aiosqlite")
+    import asyncio
+    from sqlalchemy import create_engine, select
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from backend.database import Base
+    from backend.utils.batch_delete import achunked_delete
+    path = tmp_path / "delete.db"
+    Base.metadata.create_all(bind=create_engine(f"sqlite:///{path}"))
+
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        async with AsyncSession(engine) as db:
+            db.add_all(RateLimitCounter(api_key="delkey", identifier="u", endpoint="", window_start=i, count=1) for i in range(5))
+            await db.commit()
+            stmt = select(RateLimitCounter).where(RateLimitCounter.api_key == "delkey")
+            progress = await achunked_delete(db, stmt, batch_size=2, pause=0)
+            left = (await db.execute(stmt)).all()
+        await engine.dispose()
+        return progress, left
+
+    progress, left = asyncio.run(scenario())
+    assert progress.done and progress.deleted == 5 and progress.batches == 3 and left == []
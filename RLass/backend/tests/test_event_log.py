@@ -0,0 +1,62 @@
+import os
+import struct
+import pytest
+from backend.utils import event_log
+from backend.utils.event_log import EventLog, SEGMENT_HEADER, RECORD_HEADER
+
+def test_append_and_read_records_in_order(tmp_path):
+    log = EventLog(str(tmp_path), segment_size=4096)
+    log.append(b"first")
+    position = log.append_many([b"second", b"third"], sync=True)
+    assert log.synced >= position
+    [(number, path)] = event_log.list_segments(str(tmp_path))
+    assert os.path.getsize(path) == 4096
+    payloads, offset, intact = event_log.read_records(path)
+    assert payloads == [b"first", b"second", b"third"] and intact
+    assert (number, offset) == position
+    # Reading on from the returned offset sees only later records
+    log.append(b"fourth")
+    assert event_log.read_records(path, offset)[0] == [b"fourth"]
+    log.close()
+
+def test_segments_roll_over_when_full(tmp_path):
+    log = EventLog(str(tmp_path), segment_size=SEGMENT_HEADER.size + 2 * (RECORD_HEADER.size + 10))
+    log.append_many([bytes([i]) * 10 for i in range(5)])
+    segments = event_log.list_segments(str(tmp_path))
+    assert [n for n, _ in segments] == [1, 2, 3]
+    assert [len(event_log.read_records(p)[0]) for _, p in segments] == [2, 2, 1]
+    with pytest.raises(ValueError):
+        log.append(b"x" * 100)
+    log.close()
+    # A new writer never appends to an existing segment
+    EventLog(str(tmp_path), segment_size=4096).close()
+    assert [n for n, _ in event_log.list_segments(str(tmp_path))] == [1, 2, 3, 4]
+
+def test_reading_stops_at_a_corrupt_record(tmp_path):
+    log = EventLog(str(tmp_path), segment_size=4096)
+    log.append_many([b"good", b"torn"])
+    log.close()
+    [(_, path)] = event_log.list_segments(str(tmp_path))
+    with open(path, "r+b") as f:
+        f.seek(SEGMENT_HEADER.size + RECORD_HEADER.size + 4 + RECORD_HEADER.size)
+        f.write(b"TORN")
+    payloads, offset, intact = event_log.read_records(path)
+    assert payloads == [b"good"] and not intact
+    assert offset == SEGMENT_HEADER.size + RECORD_HEADER.size + 4
+
+def test_checkpoint_round_trip(tmp_path):
+    assert event_log.read_checkpoint(str(tmp_path)) == (0, 0)
+    event_log.write_checkpoint(str(tmp_path), 3, 128)
+    assert event_log.read_checkpoint(str(tmp_path)) == (3, 128)
+    with open(tmp_path / "checkpoint", "rb") as f:
+        assert struct.unpack("<QQ", f.read()) == (3, 128)
+
+@pytest.mark.skipif(event_log.fcntl is None, reason="directory locking needs fcntl")
+def test_one_writer_per_directory(tmp_path):
+    log = EventLog(str(tmp_path), segment_size=4096)
+    with pytest.raises(event_log.EventLogLocked):
+        EventLog(str(tmp_path), segment_size=4096)
+    # The refused writer created no segment
+    assert len(event_log.list_segments(str(tmp_path))) == 1
+    log.close()
+    EventLog(str(tmp_path), segment_size=4096).close()
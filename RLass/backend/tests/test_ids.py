@@ -0,0 +1,15 @@
+import uuid
+from datetime import datetime, UTC
+from backend.utils.ids import uuid7, new_id
+
+def test_uuid7_layout():
+    value = uuid7()
+    assert value.version == 7
+    assert value.variant == uuid.RFC_4122
+    ms = value.int >> 80
+    assert abs(ms / 1000 - datetime.now(UTC).timestamp()) < 5
+
+def test_uuid7_is_monotonic_within_a_process():
+    ids = [new_id() for _ in range(10000)]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
@@ -125,3 +125,493 @@ def test_get_rate_limit_config(db_session, api_key, rate_limit_config):
     assert config is not None
     config2 = rl_service.get_rate_limit_config(db_session, api_key, "/notexist")
     assert config2 is None
+
+def test_db_backend_uses_window_counter(db_session, api_key, rate_limit_config):
+    from backend.models.rate_limit import RateLimitCounter
+    for _ in range(5):
+        rl_service.check_and_log_rate_limit(db_session, api_key, "user3", "/test")
+    counters = db_session.query(RateLimitCounter).filter(RateLimitCounter.api_key == api_key).all()
+    assert len(counters) == 1
+    # Rejected checks do not push the counter past the limit
+    assert counters[0].count == 3
+    assert counters[0].endpoint == "/test"
+    rl_service.reset_usage_logs_for_api_key(db_session, api_key, "/test")
+    assert db_session.query(RateLimitCounter).filter(RateLimitCounter.api_key == api_key).count() == 0
+
+def test_sliding_window_blends_previous_window(monkeypatch):
+    backend = rl_service.InMemoryRateLimitBackend()
+    class DummyConfig:
+        limit = 4
+        period_seconds = 60
+        algorithm = rl_service.SLIDING_WINDOW
+    config = DummyConfig()
+    window_start, _ = rl_service.get_window_bounds(60)
+    # Previous window was fully used; half of it still overlaps the sliding period
+    backend.get_stripe("slidekey", "id").usage[("slidekey", "id", "/slide", window_start - 60)] = 4
+    monkeypatch.setattr(rl_service, "get_previous_window_weight", lambda config, ts: 0.5)
+    results = [backend.check_and_log("slidekey", "id", "/slide", config, False) for _ in range(3)]
+    assert [r[0] for r in results] == [True, True, False]
+    assert results[0][1] == 1 and results[1][1] == 0
+
+def test_previous_window_weight_only_for_sliding_window():
+    class FixedConfig:
+        limit = 1
+        period_seconds = 60
+    class SlidingConfig(FixedConfig):
+        algorithm = rl_service.SLIDING_WINDOW
+    window_start, _ = rl_service.get_window_bounds(60)
+    assert rl_service.get_previous_window_weight(FixedConfig(), window_start) == 0.0
+    assert 0.0 <= rl_service.get_previous_window_weight(SlidingConfig(), window_start) <= 1.0
+
+def test_db_backend_sliding_window(db_session, api_key, monkeypatch):
+    from backend.models.rate_limit import RateLimitCounter
+    config = crud_rate_limit.create_rate_limit(db_session, RateLimitConfigCreate(
+        api_key=api_key, endpoint="/slide", limit=4, period_seconds=60, algorithm=rl_service.SLIDING_WINDOW
+    ))
+    assert config.algorithm == rl_service.SLIDING_WINDOW
+    window_start, _ = rl_service.get_window_bounds(60)
+    db_session.add(RateLimitCounter(api_key=api_key, identifier="id", endpoint="/slide", window_start=window_start - 60, count=4))
+    db_session.commit()
+    monkeypatch.setattr(rl_service, "get_previous_window_weight", lambda config, ts: 0.5)
+    results = [rl_service.check_and_log_rate_limit(db_session, api_key, "id", "/slide") for _ in range(3)]
+    assert [r[0] for r in results] == [True, True, False]
+    assert results[0][1] == 1 and results[2][1] == 0
+
+def test_in_memory_gcra_burst_and_retry_after():
+    backend = rl_service.InMemoryRateLimitBackend()
+    class DummyConfig:
+        limit = 6
+        period_seconds = 60
+        burst = 2
+        algorithm = rl_service.GCRA
+    config = DummyConfig()
+    allowed1, remaining1, _ = backend.check_and_log("gcrakey", "id", "/gcra", config, False)
+    allowed2, remaining2, _ = backend.check_and_log("gcrakey", "id", "/gcra", config, False)
+    allowed3, remaining3, retry_at = backend.check_and_log("gcrakey", "id", "/gcra", config, False)
+    assert (allowed1, remaining1) == (True, 1)
+    assert (allowed2, remaining2) == (True, 0)
+    assert allowed3 is False and remaining3 == 0
+    # One permit every 10s, so the next request succeeds about 10s from now
+    import time
+    assert 0 < retry_at - time.time() <= 11
+    # Constant-size state: a single TAT per key and no per-window counters
+    stripe = backend.get_stripe("gcrakey", "id")
+    assert list(stripe.tats) == [("gcrakey", "id", "/gcra")]
+    assert backend.get_stats()["live_window_keys"] == 0
+
+def test_db_backend_gcra(db_session, api_key):
+    from backend.models.rate_limit import RateLimitGCRAState
+    crud_rate_limit.create_rate_limit(db_session, RateLimitConfigCreate(
+        api_key=api_key, endpoint="/gcra", limit=3, period_seconds=60, algorithm=rl_service.GCRA
+    ))
+    results = [rl_service.check_and_log_rate_limit(db_session, api_key, "id", "/gcra") for _ in range(4)]
+    assert [r[0] for r in results] == [True, True, True, False]
+    assert [r[1] for r in results] == [2, 1, 0, 0]
+    assert db_session.query(RateLimitGCRAState).filter(RateLimitGCRAState.api_key == api_key).count() == 1
+    summary = rl_service.summarize_usage_for_api_key(db_session, api_key, "/gcra")
+    assert summary["rate_limited"] == 1
+    rl_service.reset_usage_logs_for_api_key(db_session, api_key, "/gcra")
+    assert db_session.query(RateLimitGCRAState).filter(RateLimitGCRAState.api_key == api_key).count() == 0
+
+def test_get_usage_event_samples_allowed_checks(monkeypatch):
+    class SampledConfig:
+        customer_id = None
+        usage_sample_rate = 10
+    monkeypatch.setattr(rl_service.random, "random", lambda: 0.05)
+    assert rl_service.get_usage_event("k", "id", "/e", SampledConfig, True)["sample_weight"] == 10
+    monkeypatch.setattr(rl_service.random, "random", lambda: 0.5)
+    assert rl_service.get_usage_event("k", "id", "/e", SampledConfig, True) is None
+    # Rate-limited checks are always kept, unweighted
+    assert rl_service.get_usage_event("k", "id", "/e", SampledConfig, False)["sample_weight"] == 1
+    SampledConfig.usage_sample_rate = None
+    assert rl_service.get_usage_event("k", "id", "/e", SampledConfig, True)["sample_weight"] == 1
+
+def test_sampled_logging_summarizes_weighted_counts(db_session, api_key, monkeypatch):
+    from backend.models.usage_log import UsageLog
+    crud_rate_limit.create_rate_limit(db_session, RateLimitConfigCreate(
+        api_key=api_key, endpoint="/sampled", limit=20, period_seconds=60, usage_sample_rate=4
+    ))
+    # Every 4th allowed check is kept
+    draws = iter([0.1, 0.9, 0.9, 0.9] * 5)
+    monkeypatch.setattr(rl_service.random, "random", lambda: next(draws))
+    results = [rl_service.check_and_log_rate_limit(db_session, api_key, "id", "/sampled") for _ in range(22)]
+    assert [r[0] for r in results].count(False) == 2
+    rows = db_session.query(UsageLog).filter(UsageLog.api_key == api_key, UsageLog.endpoint == "/sampled").all()
+    assert sorted((r.status, r.sample_weight) for r in rows) == [("allowed", 4)] * 5 + [("rate_limited", 1)] * 2
+    summary = rl_service.summarize_usage_for_api_key(db_session, api_key, "/sampled")
+    assert summary == {"total": 22, "allowed": 20, "rate_limited": 2}
+
+def test_config_index_follows_crud_changes(db_session, api_key):
+    index = rl_service.config_index
+    crud_rate_limit.create_rate_limit(db_session, RateLimitConfigCreate(api_key=api_key, endpoint="/idx", limit=5, period_seconds=60))
+    assert index.get(db_session, api_key, "/idx").limit == 5
+    crud_rate_limit.update_rate_limit(db_session, api_key, "/idx", 7, 60)
+    assert index.get(db_session, api_key, "/idx").limit == 7
+    crud_rate_limit.delete_rate_limit(db_session, api_key, "/idx")
+    assert index.get(db_session, api_key, "/idx") is None
+    # Unknown keys are answered from the index without a rebuild
+    rules = index._rules
+    assert index.get(db_session, "unknown-key", "/idx") is None
+    assert index._rules is rules
+
+def test_config_index_reloads_once_when_many_threads_miss():
+    import threading
+    import time
+    loads = []
+    class SlowDB:
+        def query(self, model):
+            return self
+        def all(self):
+            loads.append(1)
+            time.sleep(0.05)
+            return []
+    index = rl_service.RateLimitConfigIndex(ttl_seconds=60)
+    threads = [threading.Thread(target=index.get, args=(SlowDB(), "k")) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(loads) == 1
+
+def test_get_rate_limiter_shares_worker_state(db_session):
+    first = rl_service.get_rate_limiter(db_session)
+    second = rl_service.get_rate_limiter(db_session)
+    assert first.in_memory_backend is second.in_memory_backend
+    assert first.db_backend.config_index is second.db_backend.config_index is rl_service.config_index
+
+def test_in_memory_backend_evicts_expired_windows():
+    backend = rl_service.InMemoryRateLimitBackend()
+    class DummyConfig:
+        limit = 5
+        period_seconds = 60
+    class GCRAConfig(DummyConfig):
+        algorithm = rl_service.GCRA
+    for identifier in ("a", "b", "c"):
+        backend.check_and_log("sweepkey", identifier, "/sweep", DummyConfig(), False)
+    backend.check_and_log("sweepkey", "d", "/sweep", GCRAConfig(), False)
+    stats = backend.get_stats()
+    assert stats["live_window_keys"] == 3 and stats["live_gcra_keys"] == 1
+    import time
+    assert backend.sweep_expired(int(time.time()) - 1) == 0
+    # Windows end at the next minute boundary, the GCRA state 12s (one emission interval) from now
+    _, window_end = rl_service.get_window_bounds(60)
+    assert backend.sweep_expired(window_end + 60) == 4
+    stats = backend.get_stats()
+    assert stats["live_window_keys"] == 0 and stats["live_gcra_keys"] == 0
+    assert stats["evictions"] == 4 and stats["scheduled_expiry_buckets"] == 0
+
+def test_in_memory_backend_stripes_share_nothing():
+    backend = rl_service.InMemoryRateLimitBackend(num_stripes=4)
+    class DummyConfig:
+        limit = 100
+        period_seconds = 60
+    identifiers = [f"id{i}" for i in range(40)]
+    for identifier in identifiers:
+        backend.check_and_log("stripekey", identifier, "/stripe", DummyConfig(), False)
+    assert sum(len(stripe.usage) for stripe in backend.stripes) == 40
+    assert sum(1 for stripe in backend.stripes if stripe.usage) > 1
+    for identifier in identifiers:
+        stripe = backend.get_stripe("stripekey", identifier)
+        assert any(k[1] == identifier for k in stripe.usage)
+    assert backend.summarize_usage("stripekey")["total"] == 40
+    assert backend.reset_usage("stripekey", "/stripe") == 40
+    assert backend.get_stats()["live_window_keys"] == 0
+
+def test_async_db_backend_summary_and_reset(tmp_path):
+    pytest.importorskip("aiosqlite")
+    import asyncio
+    from sqlalchemy import create_engine
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from backend.database import Base
+    path = tmp_path / "async.db"
+    Base.metadata.create_all(bind=create_engine(f"sqlite:///{path}"))
+    class DummyConfig:
+        limit = 2
+        period_seconds = 60
+        customer_id = "1"
+
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            backend = rl_service.AsyncDBRateLimitBackend(db)
+            results = await backend.acheck_and_log_many([("asynckey", "id", "/async", DummyConfig())] * 3)
+            summary = await backend.asummarize_usage("asynckey", "/async")
+            deleted = await backend.areset_usage("asynckey", "/async")
+            after = await backend.asummarize_usage("asynckey", "/async")
+        await engine.dispose()
+        return results, summary, deleted, after
+
+    results, summary, deleted, after = asyncio.run(scenario())
+    assert [r[0] for r in results] == [True, True, False]
+    assert summary == {"total": 3, "allowed": 2, "rate_limited": 1}
+    assert deleted == 3 and after["total"] == 0
+
+@pytest.fixture
+def redis_client():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return fakeredis.FakeRedis()
+
+def test_redis_backend_fixed_window_and_ttl(redis_client):
+    backend = rl_service.RedisRateLimitBackend(redis_client)
+    class DummyConfig:
+        limit = 2
+        period_seconds = 60
+    results = [backend.check_and_log("rediskey", "id", "/redis", DummyConfig(), False) for _ in range(3)]
+    assert [r[:2] for r in results] == [(True, 1), (True, 0), (False, 0)]
+    keys = redis_client.keys("rlaas:w:*")
+    assert len(keys) == 1
+    assert 0 < redis_client.ttl(keys[0]) <= 60
+    assert backend.summarize_usage("rediskey", "/redis") == {"total": 3, "allowed": 2, "rate_limited": 1}
+    assert backend.reset_usage("rediskey", "/redis") == 3
+    assert redis_client.keys("rlaas:w:*") == []
+    assert backend.summarize_usage("rediskey")["total"] == 0
+
+def test_redis_backend_gcra_and_pipelined_batch(redis_client):
+    backend = rl_service.RedisRateLimitBackend(redis_client)
+    class GCRAConfig:
+        limit = 6
+        period_seconds = 60
+        burst = 2
+        algorithm = rl_service.GCRA
+    class WindowConfig:
+        limit = 1
+        period_seconds = 60
+    results = backend.check_and_log_many([
+        ("batchkey", "id", "/gcra", GCRAConfig()),
+        ("batchkey", "id", "/gcra", GCRAConfig()),
+        ("batchkey", "id", "/gcra", GCRAConfig()),
+        ("batchkey", "id", "/window", WindowConfig()),
+        ("batchkey", "id", "/window", WindowConfig())
+    ])
+    assert [r[:2] for r in results] == [(True, 1), (True, 0), (False, 0), (True, 0), (False, 0)]
+    # The GCRA state expires once its TAT (at most the burst tolerance ahead) has passed
+    assert 0 < redis_client.pttl("rlaas:g:batchkey:/gcra:id") <= 20000
+    import time
+    assert 0 < results[2][2] - time.time() <= 11
+
+def test_rate_limiter_uses_redis_for_shared_state(db_session, api_key, redis_client):
+    crud_rate_limit.create_rate_limit(db_session, RateLimitConfigCreate(
+        api_key=api_key, endpoint="/shared", limit=1, period_seconds=60
+    ))
+    # Two limiters (e.g. two API nodes) see the same counters
+    node_a = rl_service.RateLimiter(db=db_session, redis_client=redis_client)
+    node_b = rl_service.RateLimiter(db=db_session, redis_client=redis_client)
+    assert node_a.check_and_log_rate_limit(api_key, "id", "/shared")[0] is True
+    assert node_b.check_and_log_rate_limit(api_key, "id", "/shared")[0] is False
+
+def test_redis_backend_logs_usage_rows(db_session, api_key, redis_client):
+    from backend.models.usage_log import UsageLog
+    class DummyConfig:
+        limit = 1
+        period_seconds = 60
+        customer_id = None
+    backend = rl_service.RedisRateLimitBackend(redis_client, db_session)
+    backend.check_and_log_many([(api_key, "id", "/rows", DummyConfig())] * 2)
+    statuses = sorted(log.status for log in db_session.query(UsageLog).filter(UsageLog.api_key == api_key))
+    assert statuses == ["allowed", "rate_limited"]
+
+def test_async_redis_backend_shares_state_and_emits_usage_events():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    import asyncio
+    class DummyConfig:
+        limit = 2
+        period_seconds = 60
+        customer_id = None
+    class Writer:
+        def __init__(self):
+            self.events = []
+        def submit(self, event, block=True):
+            self.events.append(event)
+            return True
+    writer = Writer()
+    server = fakeredis.FakeServer()
+
+    async def scenario():
+        backend = rl_service.AsyncRedisRateLimitBackend(fakeredis.FakeAsyncRedis(server=server), usage_writer=writer)
+        limiter = rl_service.AsyncRateLimiter(redis_client=backend.client)
+        assert isinstance(limiter.active_backend, rl_service.AsyncRedisRateLimitBackend)
+        first = await backend.acheck_and_log("akey", "id", "/a", DummyConfig(), False)
+        rest = await backend.acheck_and_log_many([("akey", "id", "/a", DummyConfig())] * 2)
+        summary = await backend.asummarize_usage("akey", "/a")
+        deleted = await backend.areset_usage("akey", "/a")
+        return [first] + rest, summary, deleted
+
+    results, summary, deleted = asyncio.run(scenario())
+    assert [r[:2] for r in results] == [(True, 1), (True, 0), (False, 0)]
+    assert summary == {"total": 3, "allowed": 2, "rate_limited": 1} and deleted == 3
+    assert [e["status"] for e in writer.events] == ["allowed", "allowed", "rate_limited"]
+    # The sync backend (e.g. the usage summary route) reads the same counters
+    sync_backend = rl_service.RedisRateLimitBackend(fakeredis.FakeRedis(server=server))
+    assert sync_backend.check_and_log("akey", "id", "/a", DummyConfig(), False)[0] is True
+
+def test_leased_backend_reserves_quota_in_chunks(db_session, api_key):
+    from backend.models.rate_limit import RateLimitCounter
+    from backend.models.usage_log import UsageLog
+    class DummyConfig:
+        limit = 100
+        period_seconds = 60
+        customer_id = None
+    manager = rl_service.QuotaLeaseManager(lease_fraction=0.05)
+    backend = rl_service.LeasedRateLimitBackend(db_session, manager)
+    counter = lambda: db_session.query(RateLimitCounter).filter(RateLimitCounter.api_key == api_key).one().count
+    logged = lambda: db_session.query(UsageLog).filter(UsageLog.api_key == api_key).count()
+    results = [backend.check_and_log(api_key, "id", "/lease", DummyConfig(), False) for _ in range(5)]
+    assert all(r[0] for r in results)
+    # One reservation of 5% of the limit covers all five checks; usage rows are buffered
+    assert counter() == 5 and logged() == 0
+    backend.check_and_log(api_key, "id", "/lease", DummyConfig(), False)
+    # The first lease ran out quickly, so the next one is twice the size
+    assert counter() == 15 and logged() == 5
+    backend.settle(release_all=True)
+    assert counter() == 6 and logged() == 6
+
+def test_idle_lease_permits_return_within_the_window(db_session, api_key):
+    import time
+    class DummyConfig:
+        limit = 100
+        period_seconds = 60
+        customer_id = None
+    manager = rl_service.QuotaLeaseManager(idle_timeout=0.05)
+    backend = rl_service.LeasedRateLimitBackend(db_session, manager)
+    window_start = rl_service.get_window_bounds(60)[0]
+    backend.check_and_log(api_key, "idle", "/lease", DummyConfig(), False)
+    assert crud_rate_limit.get_window_count(db_session, api_key, "idle", "/lease", window_start) == 5
+    time.sleep(0.06)
+    # A check for another identifier settles; the idle lease's four unused permits go back
+    backend.check_and_log(api_key, "busy", "/lease", DummyConfig(), False)
+    assert crud_rate_limit.get_window_count(db_session, api_key, "idle", "/lease", window_start) == 1
+    assert manager.leases[(api_key, "idle", "/lease")].permits == 0
+    # The emptied lease is renewed on the next check
+    assert backend.check_and_log(api_key, "idle", "/lease", DummyConfig(), False)[0] is True
+    backend.settle(release_all=True)
+    assert crud_rate_limit.get_window_count(db_session, api_key, "idle", "/lease", window_start) == 2
+
+def test_lease_size_is_capped_by_unreserved_quota():
+    manager = rl_service.QuotaLeaseManager(lease_fraction=0.05, max_lease_fraction=0.25)
+    key = ("k", "id", "/lease")
+    assert manager.next_lease_size(key, 100, 0) == 5
+    # Only 8 permits are left unreserved in this window: a quarter of them, not of the limit
+    manager.install(key, 0, 5, 8, 5)
+    assert manager.next_lease_size(key, 100, 0) == 2
+    # A new window starts from the full limit again
+    assert manager.next_lease_size(key, 100, 60) == 10
+
+def test_leased_usage_rows_keep_decision_time(db_session, api_key):
+    import time
+    from datetime import datetime, UTC
+    from backend.models.usage_log import UsageLog
+    class DummyConfig:
+        limit = 100
+        period_seconds = 60
+        customer_id = None
+    manager = rl_service.QuotaLeaseManager()
+    backend = rl_service.LeasedRateLimitBackend(db_session, manager)
+    backend.check_and_log(api_key, "id", "/lease", DummyConfig(), False)
+    time.sleep(0.02)
+    settled_at = datetime.now(UTC).replace(tzinfo=None)
+    backend.settle(release_all=True)
+    [row] = db_session.query(UsageLog).filter(UsageLog.api_key == api_key).all()
+    assert row.timestamp < settled_at
+
+def test_release_quota_leases_settles_shared_manager(db_session, api_key, monkeypatch):
+    from backend.models.usage_log import UsageLog
+    class DummyConfig:
+        limit = 100
+        period_seconds = 60
+        customer_id = None
+    manager = rl_service.QuotaLeaseManager()
+    monkeypatch.setattr(rl_service, "shared_lease_manager", manager)
+    rl_service.LeasedRateLimitBackend(db_session, manager).check_and_log(api_key, "id", "/lease", DummyConfig(), False)
+    class KeepOpen:
+        # The test session is shared, so closing it is left to the fixture
+        def __getattr__(self, name):
+            return getattr(db_session, name)
+        def close(self):
+            pass
+    rl_service.release_quota_leases(KeepOpen)
+    assert db_session.query(UsageLog).filter(UsageLog.api_key == api_key).count() == 1
+    assert crud_rate_limit.get_window_count(db_session, api_key, "id", "/lease", rl_service.get_window_bounds(60)[0]) == 1
+    assert manager.leases == {}
+
+def test_async_rate_limiter_uses_quota_leases(tmp_path):
+    pytest.importorskip("aiosqlite")
+    import asyncio
+    from sqlalchemy import create_engine, select, func
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from backend.database import Base
+    from backend.models.rate_limit import RateLimitCounter
+    from backend.models.usage_log import UsageLog
+    path = tmp_path / "leases.db"
+    Base.metadata.create_all(bind=create_engine(f"sqlite:///{path}"))
+    class DummyConfig:
+        limit = 100
+        period_seconds = 60
+        customer_id = "1"
+
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        manager = rl_service.QuotaLeaseManager(lease_fraction=0.05)
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            limiter = rl_service.AsyncRateLimiter(db, lease_manager=manager)
+            assert isinstance(limiter.active_backend, rl_service.AsyncLeasedRateLimitBackend)
+            results = [await limiter.acheck_and_log_rate_limit("asynclease", "id", "/l", config=DummyConfig()) for _ in range(3)]
+            reserved = (await db.execute(select(RateLimitCounter.count))).scalar()
+            buffered = (await db.execute(select(func.count()).select_from(UsageLog))).scalar()
+            await limiter.active_backend.asettle(release_all=True)
+            settled = (await db.execute(select(RateLimitCounter.count))).scalar()
+            logged = (await db.execute(select(func.count()).select_from(UsageLog))).scalar()
+        await engine.dispose()
+        return results, reserved, buffered, settled, logged
+
+    results, reserved, buffered, settled, logged = asyncio.run(scenario())
+    assert all(r[0] for r in results)
+    # One lease of 5 covers the three checks; their usage rows wait for the settlement
+    assert (reserved, buffered) == (5, 0)
+    assert (settled, logged) == (3, 3)
+
+def test_leased_backends_never_exceed_limit(db_session, api_key):
+    class DummyConfig:
+        limit = 10
+        period_seconds = 60
+        customer_id = None
+    # Two nodes, each with its own lease manager, sharing the database counter
+    nodes = [
+        rl_service.LeasedRateLimitBackend(db_session, rl_service.QuotaLeaseManager(lease_fraction=0.3, max_lease_fraction=0.5))
+        for _ in range(2)
+    ]
+    allowed = sum(
+        nodes[i % 2].check_and_log(api_key, "id", "/lease", DummyConfig(), False)[0]
+        for i in range(30)
+    )
+    assert allowed == 10
+    assert crud_rate_limit.get_window_count(
+        db_session, api_key, "id", "/lease", rl_service.get_window_bounds(60)[0]
+    ) == 10
+
+def test_db_batch_takes_one_upsert_per_counter(db_session, api_key):
+    from sqlalchemy import event
+    class DummyConfig:
+        limit = 3
+        period_seconds = 60
+        customer_id = None
+    upserts = []
+    count_upserts = lambda conn, cursor, statement, *args: upserts.append(statement) if "INSERT INTO rate_limit_counters" in statement else None
+    event.listen(db_session.get_bind(), "before_cursor_execute", count_upserts)
+    try:
+        results = rl_service.DBRateLimitBackend(db_session).check_and_log_many(
+            [(api_key, "a", "/grouped", DummyConfig())] * 4 + [(api_key, "b", "/grouped", DummyConfig())]
+        )
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", count_upserts)
+    assert [r[:2] for r in results] == [(True, 2), (True, 1), (True, 0), (False, 0), (True, 2)]
+    # One reservation per counter; "a" asks for 4 hits, capped at the limit of 3
+    assert len(upserts) == 2
+
+def test_reserve_window_quota_caps_at_limit(db_session):
+    assert crud_rate_limit.reserve_window_quota(db_session, "quotakey", "id", None, 0, 10, 6) == (6, 6)
+    assert crud_rate_limit.reserve_window_quota(db_session, "quotakey", "id", None, 0, 10, 6) == (4, 10)
+    assert crud_rate_limit.reserve_window_quota(db_session, "quotakey", "id", None, 0, 10, 6) == (0, 10)
+    crud_rate_limit.release_window_quota(db_session, "quotakey", "id", None, 0, 3)
+    assert crud_rate_limit.get_window_count(db_session, "quotakey", "id", None, 0) == 7
@@ -11,3 +11,16 @@ def test_get_realtime_usage_stats(db_session, test_user, usage_stats, usage_log)
     assert any(s["user_id"] == int(test_user.id) for s in result["stats"])
     # Usage summary should have dicts with 'endpoint' and 'count'
     assert any(isinstance(row, dict) and "endpoint" in row and "count" in row for row in result["usage_summary"])
+
+def test_get_error_breakdown_totals_from_status_counts(db_session, test_user, usage_log):
+    result = usage_dashboard_service.get_error_breakdown(db_session, user_id=str(test_user.id))
+    assert result["total_requests"] == 1
+
+def test_get_top_endpoints_counts_by_status(db_session, test_user):
+    from backend.services import usage_logger
+    for endpoint, status in [('/top', 'success'), ('/top', 'error'), ('/top', 'success'), ('/other', 'error')]:
+        usage_logger.log_usage_event(db_session, 'topkey', endpoint, str(test_user.id), status)
+    result = usage_dashboard_service.get_top_endpoints(db_session, user_id=str(test_user.id))
+    assert [(r["endpoint"], r["total_requests"], r["success_count"], r["error_count"]) for r in result] == [
+        ('/top', 3, 2, 1), ('/other', 1, 0, 1)
+    ]
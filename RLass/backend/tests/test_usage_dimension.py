@@ -0,0 +1,113 @@
+from datetime import datetime
+from sqlalchemy import func
+from backend.crud import usage_dimension
+from backend.models.usage_dimension import UsageEndpoint, USAGE_STATUS_IDS
+from backend.models.usage_log import UsageLog
+from backend.services import usage_logger
+
+def test_intern_dimension_values_reuses_ids_and_caches_after_commit(db_session):
+    ids = usage_dimension.intern_dimension_values(db_session, "endpoint", ["/a", "/b", None, "/a"])
+    assert set(ids) == {"/a", "/b"}
+    assert usage_dimension.intern_dimension_values(db_session, "endpoint", ["/b"]) == {"/b": ids["/b"]}
+    assert db_session.query(UsageEndpoint).filter(UsageEndpoint.value.in_(["/a", "/b"])).count() == 2
+    # Only ids of committed rows are shared with other sessions
+    assert usage_dimension.dimension_caches["endpoint"].get_many(["/a"]) == {}
+    db_session.commit()
+    assert usage_dimension.dimension_caches["endpoint"].get_many(["/a"]) == {"/a": ids["/a"]}
+    assert usage_dimension.dimension_values(db_session, "endpoint", ids.values()) == {v: k for k, v in ids.items()}
+
+def test_rolled_back_dimension_ids_are_not_cached(db_session):
+    nested = db_session.begin_nested()
+    usage_dimension.intern_dimension_values(db_session, "identifier", ["gone"])
+    nested.rollback()
+    assert usage_dimension.dimension_caches["identifier"].get_many(["gone"]) == {}
+    assert "gone" in usage_dimension.intern_dimension_values(db_session, "identifier", ["gone"])
+
+def test_dimension_cache_evicts_least_recently_used():
+    cache = usage_dimension.DimensionCache(max_entries=2)
+    cache.put_many({"a": 1, "b": 2})
+    cache.get_many(["a"])
+    cache.put_many({"c": 3})
+    assert cache.get_many(["a", "b", "c"]) == {"a": 1, "c": 3}
+    assert cache.get_values([1, 2, 3]) == {1: "a", 3: "c"}
+
+def test_dimension_values_served_from_cache(db_session):
+    ids = usage_dimension.intern_dimension_values(db_session, "endpoint", ["/cached"])
+    # Not cached before commit, but still resolved from the table
+    assert usage_dimension.dimension_values(db_session, "endpoint", ids.values()) == {ids["/cached"]: "/cached"}
+    assert usage_dimension.dimension_caches["endpoint"].get_values(ids.values()) == {}
+    db_session.commit()
+    statements = []
+    from sqlalchemy import event
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db_session.get_bind(), "before_cursor_execute", listener)
+    try:
+        assert usage_dimension.dimension_values(db_session, "endpoint", ids.values()) == {ids["/cached"]: "/cached"}
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", listener)
+    assert statements == []
+
+def test_usage_log_attributes_read_and_filter_by_value(db_session, test_user):
+    log = usage_logger.log_usage_event(db_session, 'dimkey', '/dim', 'dimuser', 'rate_limited')
+    usage_logger.log_usage_event(db_session, 'dimkey', None, 'dimuser', 'allowed')
+    assert (log.api_key, log.endpoint, log.identifier, log.status) == ('dimkey', '/dim', 'dimuser', 'rate_limited')
+    assert log.status_id == USAGE_STATUS_IDS['rate_limited']
+    q = db_session.query(UsageLog).filter(UsageLog.api_key == 'dimkey')
+    assert [l.id for l in q.filter(UsageLog.endpoint == '/dim')] == [log.id]
+    assert q.filter(UsageLog.endpoint.is_(None)).count() == 1
+    assert q.filter(UsageLog.status.in_(['allowed', 'error'])).count() == 1
+    assert q.filter(UsageLog.status != 'allowed').count() == 1
+    assert q.filter(UsageLog.endpoint.ilike('%DIM%')).count() == 1
+    counts = dict(db_session.query(UsageLog.status, func.count()).filter(UsageLog.api_key == 'dimkey').group_by(UsageLog.status).all())
+    assert counts == {'allowed': 1, 'rate_limited': 1}
+
+def test_changing_a_usage_log_value_stores_its_id(db_session, test_user):
+    log = usage_logger.log_usage_event(db_session, 'dimkey', '/old', 'dimuser', 'allowed')
+    log.endpoint = '/new'
+    db_session.commit()
+    db_session.expire_all()
+    assert db_session.get(UsageLog, log.id).endpoint == '/new'
+
+def test_export_rows_carry_values(db_session, test_user):
+    usage_logger.bulk_load_usage_events(db_session, [
+        {'api_key': 'expkey', 'endpoint': None, 'identifier': 'e1', 'status': 'error', 'timestamp': datetime(2025, 9, 1)}
+    ])
+    rows = list(usage_logger.iter_usage_log_export(db_session, start_time=datetime(2025, 9, 1), end_time=datetime(2025, 9, 1)))
+    assert [(r['api_key'], r['endpoint'], r['identifier'], r['status']) for r in rows] == [('expkey', None, 'e1', 'error')]
+
+def test_usage_aggregates_group_by_dimension_ids(db_session, test_user):
+    from sqlalchemy import event
+    usage_logger.bulk_load_usage_events(db_session, [
+        {'api_key': 'grpkey', 'endpoint': f'/g{i % 2}', 'identifier': 'grpuser', 'status': 'allowed' if i % 3 else 'error', 'timestamp': datetime(2025, 9, 2)}
+        for i in range(6)
+    ])
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db_session.get_bind(), "before_cursor_execute", listener)
+    try:
+        summary = usage_logger.summarize_usage(db_session, group_by="endpoint", api_key='grpkey')
+        breakdown = usage_logger.get_status_breakdown(db_session, api_key='grpkey')
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", listener)
+    assert sorted((r['endpoint'], r['count']) for r in summary) == [('/g0', 3), ('/g1', 3)]
+    assert breakdown['total_requests'] == 6 and breakdown['breakdown'] == {'allowed': 4, 'error': 2}
+    # No per-row value subquery in the aggregates
+    aggregates = [s for s in statements if 'GROUP BY' in s]
+    assert aggregates and all('usage_logs.endpoint_id' in s or 'usage_logs.status_id' in s for s in aggregates)
+    assert not any('usage_endpoints.id = usage_logs.endpoint_id' in s or 'usage_statuses.id = usage_logs.status_id' in s for s in aggregates)
+
+def test_deleting_an_api_key_deletes_its_usage_without_database_cascade(db_session, test_user):
+    from backend.crud.api_key import create_api_key, delete_api_key
+    from backend.models.usage_dimension import UsageAPIKey
+    from backend.schemas.api_key import APIKeyCreate
+    key = create_api_key(db_session, APIKeyCreate(user_id=test_user.id)).key
+    usage_logger.log_usage_event(db_session, key, '/gone', 'u1', 'allowed')
+    usage_logger.log_usage_event(db_session, key, '/gone', 'u2', 'rate_limited')
+    usage_logger.log_usage_event(db_session, 'otherkey', '/kept', 'u1', 'allowed')
+    # SQLite does not enforce foreign keys here, so the ORM has to delete the rows itself
+    assert delete_api_key(db_session, key) is True
+    assert db_session.query(UsageAPIKey).filter(UsageAPIKey.value == key).count() == 0
+    # Counted by id: the api_key attribute joins the dictionary row, which would hide orphans
+    assert db_session.query(UsageLog.id).count() == 1
+    assert db_session.query(UsageLog).filter(UsageLog.api_key == 'otherkey').count() == 1
+    assert delete_api_key(db_session, key) is False
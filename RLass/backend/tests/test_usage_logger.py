@@ -1,5 +1,14 @@
 import pytest
+import uuid
+from sqlalchemy.exc import IntegrityError, OperationalError
 from backend.services import usage_logger
+from backend.utils import event_log as event_log_module
+
+def test_usage_log_ids_are_time_ordered(db_session, test_user):
+    first = usage_logger.log_usage_event(db_session, 'idkey', '/ids', 'userZ', 'allowed')
+    second = usage_logger.log_usage_event(db_session, 'idkey', '/ids', 'userZ', 'allowed')
+    assert uuid.UUID(first.id).version == 7
+    assert first.id < second.id
 
 def test_log_and_get_usage_event(db_session, test_user):
     api_key = "key1"
@@ -45,15 +54,90 @@ def test_log_usage_with_retry(db_session, test_user):
 
 def test_get_usage_events_filtered(db_session, test_user):
     usage_logger.log_usage_event(db_session, 'filterkey', '/filter', 'userC', 'success')
-    result = usage_logger.get_usage_events_filtered(db_session, api_key='filterkey', limit=1)
+    result = usage_logger.get_usage_events_filtered(db_session, api_key='filterkey', limit=1, estimate_total=True)
     assert result['total'] >= 1
     assert len(result['logs']) <= 1
 
+def test_get_usage_events_filtered_keyset_pages(db_session, test_user):
+    from datetime import datetime, timedelta
+    start = datetime(2025, 6, 1)
+    usage_logger.bulk_load_usage_events(db_session, (
+        {'api_key': 'pagekey', 'endpoint': '/page', 'identifier': f'id{i}', 'status': 'allowed', 'timestamp': start + timedelta(seconds=i // 2)}
+        for i in range(7)
+    ))
+    seen, cursor = [], None
+    while True:
+        result = usage_logger.get_usage_events_filtered(db_session, api_key='pagekey', limit=3, cursor=cursor)
+        assert result['total'] is None
+        seen += [log.identifier for log in result['logs']]
+        cursor = result['next_cursor']
+        if not result['has_more']:
+            break
+    # Every row exactly once, newest first, even with duplicate timestamps
+    assert sorted(seen) == sorted(f'id{i}' for i in range(7))
+    assert len(seen) == 7 and seen[0] == 'id6'
+    with pytest.raises(ValueError):
+        usage_logger.get_usage_events_filtered(db_session, cursor='not-a-cursor')
+
+def test_keyset_page_uses_timestamp_id_index(db_session):
+    from datetime import datetime
+    from sqlalchemy import event
+    from backend.models.usage_log import UsageLog
+    from backend.utils.pagination import encode_cursor, keyset_page
+    connection = db_session.connection()
+    statements = []
+    listener = lambda conn, cursor, statement, parameters, context, executemany: statements.append((statement, parameters))
+    event.listen(connection, "before_cursor_execute", listener)
+    try:
+        keyset_page(db_session.query(UsageLog.id), UsageLog, limit=3, cursor=encode_cursor(datetime(2025, 6, 1), "x"))
+    finally:
+        event.remove(connection, "before_cursor_execute", listener)
+    statement, parameters = statements[-1]
+    plan = " ".join(str(row) for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters))
+    # A seek on the btree in key order: no full scan, no sort
+    assert "ix_usage_logs_timestamp_id" in plan
+    assert "TEMP B-TREE" not in plan
+
 def test_search_usage_logs(db_session, test_user):
     usage_logger.log_usage_event(db_session, 'searchkey', '/search', 'userD', 'success')
-    results = usage_logger.search_usage_logs(db_session, 'search')
+    results = usage_logger.search_usage_logs(db_session, 'search')['logs']
     assert any(r.api_key == 'searchkey' for r in results)
 
+def test_search_usage_logs_paginated_and_time_bounded(db_session, test_user):
+    from datetime import datetime, timedelta
+    start = datetime(2025, 5, 1)
+    usage_logger.bulk_load_usage_events(db_session, (
+        {'api_key': 'ftskey', 'endpoint': '/orders', 'identifier': f'Customer-{i}-XyZ', 'status': 'allowed', 'timestamp': start + timedelta(hours=i)}
+        for i in range(5)
+    ))
+    first = usage_logger.search_usage_logs(db_session, 'xyz', ['identifier'], limit=2, start_time=start + timedelta(hours=1))
+    assert [l.identifier for l in first['logs']] == ['Customer-4-XyZ', 'Customer-3-XyZ']
+    second = usage_logger.search_usage_logs(db_session, 'xyz', ['identifier'], limit=2, cursor=first['next_cursor'], start_time=start + timedelta(hours=1))
+    assert [l.identifier for l in second['logs']] == ['Customer-2-XyZ', 'Customer-1-XyZ']
+    assert not second['has_more']
+    # Deleted rows drop out although their values stay in the dictionary; fields match only themselves
+    usage_logger.delete_usage_events(db_session, api_key='ftskey', identifier='Customer-4-XyZ')
+    assert len(usage_logger.search_usage_logs(db_session, 'xyz', ['identifier'])['logs']) == 4
+    assert usage_logger.search_usage_logs(db_session, 'xyz', ['endpoint'])['logs'] == []
+    # Short terms work too; LIKE wildcards are escaped
+    assert len(usage_logger.search_usage_logs(db_session, '4-', ['identifier'])['logs']) == 0
+    assert usage_logger.search_usage_logs(db_session, '%', ['identifier'])['logs'] == []
+
+def test_search_usage_logs_uses_dimension_fts_on_sqlite(db_session, test_user):
+    from sqlalchemy import event, text
+    usage_logger.log_usage_event(db_session, 'ftskey2', '/Invoices/Export', 'ftsuser', 'success')
+    # The trigger indexed the interned value
+    assert db_session.execute(text("SELECT value FROM usage_endpoints_fts WHERE usage_endpoints_fts MATCH '\"voices/ex\"'")).scalars().all() == ['/Invoices/Export']
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db_session.get_bind(), "before_cursor_execute", listener)
+    try:
+        result = usage_logger.search_usage_logs(db_session, 'VOICES', ['endpoint'])
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", listener)
+    assert [log.endpoint for log in result['logs']] == ['/Invoices/Export']
+    assert any('usage_endpoints_fts MATCH' in statement for statement in statements)
+
 def test_get_usage_time_series(db_session, test_user):
     usage_logger.log_usage_event(db_session, 'tskey', '/ts', 'userE', 'success')
     series = usage_logger.get_usage_time_series(db_session, identifier='userE', api_key='tskey', interval='day')
@@ -86,3 +170,382 @@ def test_generate_usage_report(db_session, test_user):
     usage_logger.log_usage_event(db_session, 'reportkey', '/report', 'userJ', 'success')
     report = usage_logger.generate_usage_report(db_session, identifier='userJ', api_key='reportkey')
     assert 'summary' in report and 'status_breakdown' in report
+
+def _unavailable_error():
+    return OperationalError("INSERT INTO usage_logs", {}, ConnectionRefusedError("database unavailable"))
+
+@pytest.fixture
+def writer_sessions(tmp_path):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from backend.database import Base
+    engine = create_engine(f"sqlite:///{tmp_path / 'writer.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+def test_usage_log_writer_batches_and_flushes_on_stop(writer_sessions):
+    from backend.models.usage_log import UsageLog
+    writer = usage_logger.UsageLogWriter(writer_sessions, batch_size=50, flush_interval=0.01)
+    writer.start()
+    for i in range(120):
+        assert writer.submit({"api_key": "wkey", "endpoint": "/w", "identifier": f"id{i}", "status": "allowed", "customer_id": "1"})
+    writer.stop()
+    metrics = writer.get_metrics()
+    assert metrics["written"] == 120 and metrics["enqueued"] == 120
+    assert metrics["queue_depth"] == 0 and not metrics["running"]
+    assert 3 <= metrics["batches"] <= 120
+    db = writer_sessions()
+    assert db.query(UsageLog).filter(UsageLog.api_key == "wkey").count() == 120
+    db.close()
+
+def test_usage_log_writer_drops_when_full(writer_sessions):
+    # Not started, so nothing drains the queue
+    writer = usage_logger.UsageLogWriter(writer_sessions, max_queue_size=2, block_timeout=0.01)
+    event = {"api_key": "wkey", "endpoint": "/w", "identifier": "id", "status": "allowed", "customer_id": "1"}
+    assert writer.submit(event) and writer.submit(event)
+    assert writer.submit(event) is False
+    assert writer.submit(event, block=False) is False
+    assert writer.get_metrics()["dropped"] == 2
+
+def test_usage_log_writer_retries_failed_batches_and_keeps_event_times(writer_sessions):
+    from datetime import datetime
+    from backend.models.usage_log import UsageLog
+    attempts = []
+    def flaky_sessions():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise _unavailable_error()
+        return writer_sessions()
+    writer = usage_logger.UsageLogWriter(flaky_sessions, flush_interval=0.01, retry_backoff=0.01)
+    writer.start()
+    decided_at = datetime(2025, 7, 1, 12, 0, 30)
+    writer.submit({"api_key": "rkey", "endpoint": "/r", "identifier": "id", "status": "allowed", "customer_id": "1", "timestamp": decided_at})
+    writer.stop()
+    metrics = writer.get_metrics()
+    assert metrics["written"] == 1 and metrics["retries"] == 1 and metrics["failed"] == 0
+    db = writer_sessions()
+    assert db.query(UsageLog).filter(UsageLog.api_key == "rkey").one().timestamp == decided_at
+    db.close()
+
+def test_db_backend_writes_usage_behind(db_session, writer_sessions):
+    from backend.services import rate_limiter as rl_service
+    from backend.models.usage_log import UsageLog
+    class DummyConfig:
+        limit = 1
+        period_seconds = 60
+        customer_id = "1"
+    writer = usage_logger.UsageLogWriter(writer_sessions, flush_interval=0.01)
+    writer.start()
+    backend = rl_service.DBRateLimitBackend(db_session, usage_writer=writer)
+    assert backend.check_and_log("behindkey", "id", "/b", DummyConfig(), False)[0] is True
+    assert backend.check_and_log("behindkey", "id", "/b", DummyConfig(), False)[0] is False
+    # The decision path wrote no usage row itself
+    assert db_session.query(UsageLog).filter(UsageLog.api_key == "behindkey").count() == 0
+    writer.flush()
+    writer.stop()
+    db = writer_sessions()
+    statuses = sorted(log.status for log in db.query(UsageLog).filter(UsageLog.api_key == "behindkey"))
+    db.close()
+    assert statuses == ["allowed", "rate_limited"]
+
+def test_bulk_load_usage_events(db_session, test_user):
+    from datetime import datetime
+    from backend.crud.api_key import create_api_key
+    from backend.schemas.api_key import APIKeyCreate
+    from backend.models.usage_log import UsageLog
+    key = create_api_key(db_session, APIKeyCreate(user_id=test_user.id)).key
+    replayed_at = datetime(2024, 1, 1, 12, 0)
+    events = (
+        {'api_key': key, 'endpoint': '/bulk', 'identifier': f'user{i}', 'status': 'allowed', 'timestamp': replayed_at}
+        for i in range(25)
+    )
+    assert usage_logger.bulk_load_usage_events(db_session, events, chunk_size=10) == 25
+    logs = db_session.query(UsageLog).filter(UsageLog.api_key == key).all()
+    assert len(logs) == 25
+    # customer_id resolved from the API key owner; replayed timestamps are kept
+    assert {l.customer_id for l in logs} == {test_user.id}
+    assert {l.timestamp for l in logs} == {replayed_at}
+
+def test_bulk_load_converts_aware_timestamps_to_utc(db_session, test_user):
+    from datetime import datetime, timedelta, timezone
+    from backend.models.usage_log import UsageLog
+    local = datetime(2024, 1, 1, 14, 0, tzinfo=timezone(timedelta(hours=2)))
+    usage_logger.bulk_load_usage_events(db_session, [{'api_key': 'tzkey', 'endpoint': '/tz', 'identifier': 'u', 'status': 'allowed', 'timestamp': local}])
+    assert db_session.query(UsageLog).filter(UsageLog.api_key == 'tzkey').one().timestamp == datetime(2024, 1, 1, 12, 0)
+
+def test_copy_value_escapes_text_format():
+    from backend.crud.usage_log import _copy_value
+    assert _copy_value(None) == "\\N"
+    assert _copy_value("a\tb\\c\nd") == "a\\tb\\\\c\\nd"
+
+def test_ndjson_decoder_handles_split_lines_and_gzip_members():
+    import gzip
+    body = gzip.compress(b'{"api_key": "k", "identifier": "a", "status": "allowed"}\n') + \
+        gzip.compress(b'{"api_key": "k", "identifier": "b", "status": "allowed", "timestamp": "2024-01-01T00:00:00"}')
+    decoder = usage_logger.NDJSONUsageDecoder(gzipped=True)
+    parsed = []
+    for i in range(0, len(body), 7):
+        parsed += decoder.feed(body[i:i + 7])
+    parsed += decoder.close()
+    assert [(n, e["identifier"]) for n, e, _ in parsed] == [(1, "a"), (2, "b")]
+    assert parsed[1][1]["timestamp"].year == 2024
+    assert usage_logger.NDJSONUsageDecoder().feed(b'{"api_key": "k"}\n')[0][2].startswith("Missing")
+
+@pytest.mark.skipif(not __import__("os").getenv("TEST_POSTGRES_URL"), reason="set TEST_POSTGRES_URL to run EXPLAIN checks on PostgreSQL")
+def test_usage_queries_use_composite_indexes_on_postgres():
+    from datetime import datetime, timedelta
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.orm import sessionmaker
+    from backend.database import Base
+    from backend.models.usage_log import UsageLog
+    engine = create_engine(__import__("os").getenv("TEST_POSTGRES_URL"))
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        db.execute(text("INSERT INTO users (id, email, hashed_password, is_active) VALUES ('explain', 'explain@example.com', 'x', true) ON CONFLICT DO NOTHING"))
+        db.execute(text("INSERT INTO api_keys (key, user_id, is_active, created_at) VALUES ('explainkey', 'explain', true, now()) ON CONFLICT DO NOTHING"))
+        start = datetime(2026, 1, 1)
+        usage_logger.bulk_load_usage_events(db, (
+            {'api_key': 'explainkey', 'endpoint': f'/e{i % 5}', 'identifier': f'id{i % 50}', 'status': 'allowed' if i % 7 else 'rate_limited',
+             'customer_id': 'explain', 'timestamp': start + timedelta(seconds=i)}
+            for i in range(20000)
+        ))
+        db.execute(text("ANALYZE usage_logs"))
+        db.commit()
+        plan = "\n".join(db.execute(text(
+            "EXPLAIN SELECT status_id, count(*) FROM usage_logs "
+            "WHERE api_key_id = (SELECT id FROM usage_api_keys WHERE value = 'explainkey') "
+            "AND timestamp >= '2026-01-01 05:30' GROUP BY status_id"
+        )).scalars())
+        assert "ix_usage_logs_api_key_timestamp_status" in plan
+        plan = "\n".join(db.execute(text(
+            "EXPLAIN SELECT count(*) FROM usage_logs "
+            "WHERE api_key_id = (SELECT id FROM usage_api_keys WHERE value = 'explainkey') "
+            "AND identifier_id = (SELECT id FROM usage_identifiers WHERE value = 'id7') "
+            "AND endpoint_id = (SELECT id FROM usage_endpoints WHERE value = '/e2') AND timestamp >= '2026-01-01 05:30'"
+        )).scalars())
+        assert "ix_usage_logs_api_key_identifier_endpoint_timestamp" in plan
+    finally:
+        db.execute(text("DELETE FROM usage_logs WHERE api_key_id IN (SELECT id FROM usage_api_keys WHERE value = 'explainkey')"))
+        db.commit()
+        db.close()
+        engine.dispose()
+
+def test_stream_usage_logs_export_filters_in_sql(db_session, test_user):
+    from datetime import datetime, timedelta
+    start = datetime(2025, 3, 1)
+    usage_logger.bulk_load_usage_events(db_session, (
+        {'api_key': 'streamkey', 'endpoint': '/s', 'identifier': f'id{i}', 'status': 'allowed', 'timestamp': start + timedelta(hours=i)}
+        for i in range(10)
+    ))
+    query = usage_logger.UsageLogQuery(api_key='streamkey')
+    chunks = list(usage_logger.stream_usage_logs_export(
+        db_session, 'csv', query, start_time=start + timedelta(hours=2), limit=5, batch_size=2
+    ))
+    lines = "".join(chunks).splitlines()
+    assert lines[0] == ",".join(usage_logger.EXPORT_COLUMNS)
+    assert [line.split(",")[4] for line in lines[1:]] == ['id2', 'id3', 'id4', 'id5', 'id6']
+    assert len(chunks) == 3
+    with pytest.raises(ValueError):
+        usage_logger.stream_usage_logs_export(db_session, 'xml')
+
+def test_write_usage_logs_parquet_row_groups(db_session, test_user, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    from datetime import datetime, timedelta
+    start = datetime(2025, 4, 1)
+    usage_logger.bulk_load_usage_events(db_session, (
+        {'api_key': 'parquetkey', 'endpoint': f'/p{i % 2}', 'identifier': f'id{i}', 'status': 'allowed', 'sample_weight': 1 + i % 2, 'timestamp': start + timedelta(minutes=i)}
+        for i in range(7)
+    ))
+    path = tmp_path / "usage.parquet"
+    written = usage_logger.write_usage_logs_parquet(
+        db_session, str(path), usage_logger.UsageLogQuery(api_key='parquetkey'), row_group_size=3
+    )
+    assert written == 7
+    parquet = pq.ParquetFile(str(path))
+    assert parquet.metadata.num_row_groups == 3
+    assert parquet.metadata.row_group(0).column(0).compression == 'ZSTD'
+    table = parquet.read()
+    assert str(table.schema.field('endpoint').type) == 'dictionary<values=string, indices=int32, ordered=0>'
+    assert sorted(table.column('identifier').to_pylist()) == [f'id{i}' for i in range(7)]
+    assert table.column('timestamp').to_pylist()[0] == start
+    assert sum(table.column('sample_weight').to_pylist()) == 10
+
+def test_usage_event_codec_round_trip():
+    from datetime import datetime
+    event = {'id': str(uuid.uuid4()), 'timestamp': datetime(2025, 6, 1, 12, 30, 0, 123456), 'api_key': 'k',
+             'customer_id': None, 'endpoint': '/ünïcode', 'identifier': '', 'status': 'allowed', 'sample_weight': 50}
+    assert usage_logger.decode_usage_event(usage_logger.encode_usage_event(event)) == event
+
+def test_usage_event_log_replays_into_usage_logs(db_session, test_user, tmp_path):
+    from datetime import datetime, timedelta
+    from backend.utils import event_log
+    wal = usage_logger.UsageEventLog(str(tmp_path), segment_size=256, batch_size=3)
+    start = datetime(2025, 6, 2)
+    for i in range(10):
+        assert wal.submit({'api_key': 'walkey', 'endpoint': '/wal', 'identifier': f'w{i}', 'status': 'allowed', 'timestamp': start + timedelta(minutes=i)})
+    assert len(event_log.list_segments(str(tmp_path))) > 1
+    assert wal.replay(db_session) == 10
+    assert usage_logger.count_usage_events(db_session, api_key='walkey') == 10
+    # Consumed segments are gone; the active one stays, checkpointed at its end
+    [(number, path)] = event_log.list_segments(str(tmp_path))
+    assert event_log.read_checkpoint(str(tmp_path)) == (number, wal.log.written[1])
+    assert wal.replay(db_session) == 0
+    wal.submit({'api_key': 'walkey', 'endpoint': None, 'identifier': 'w10', 'status': 'rate_limited'})
+    assert wal.replay(db_session) == 1
+    assert wal.get_metrics()['replayed'] == 11
+    wal.stop()
+
+def test_usage_event_log_skips_events_loaded_before_a_lost_checkpoint(db_session, test_user, tmp_path):
+    from backend.utils import event_log
+    wal = usage_logger.UsageEventLog(str(tmp_path), segment_size=4096)
+    for i in range(3):
+        wal.submit({'api_key': 'dupkey', 'endpoint': '/dup', 'identifier': f'd{i}', 'status': 'allowed'})
+    assert wal.replay(db_session) == 3
+    # As if the process died after committing the batch but before writing the checkpoint
+    event_log.write_checkpoint(str(tmp_path), 0, 0)
+    assert wal.replay(db_session) == 0
+    assert wal.get_metrics()['duplicates_skipped'] == 3
+    assert usage_logger.count_usage_events(db_session, api_key='dupkey') == 3
+    wal.stop()
+
+def test_log_usage_event_falls_back_to_event_log(db_session, test_user, tmp_path, monkeypatch):
+    wal = usage_logger.UsageEventLog(str(tmp_path), segment_size=4096)
+    def unavailable(*args, **kwargs):
+        raise _unavailable_error()
+    monkeypatch.setattr(usage_logger.crud_usage_log, 'log_usage', unavailable)
+    with pytest.raises(OperationalError):
+        usage_logger.log_usage_event(db_session, 'fbkey', '/fb', 'fbuser', 'allowed')
+    assert usage_logger.log_usage_event(db_session, 'fbkey', '/fb', 'fbuser', 'allowed', fallback=wal) is None
+    monkeypatch.undo()
+    assert wal.replay(db_session) == 1
+    assert usage_logger.count_usage_events(db_session, api_key='fbkey') == 1
+    wal.stop()
+
+def test_failed_writes_spill_to_event_log(db_session, test_user, tmp_path, monkeypatch):
+    wal = usage_logger.UsageEventLog(str(tmp_path), segment_size=4096)
+    def unavailable(*args, **kwargs):
+        raise _unavailable_error()
+    writer = usage_logger.UsageLogWriter(unavailable, flush_interval=0.01, max_retries=1, retry_backoff=0.01, fallback=wal)
+    writer.start()
+    writer.submit({'api_key': 'spillkey', 'endpoint': '/s', 'identifier': 's0', 'status': 'allowed'})
+    writer.stop()
+    assert writer.get_metrics()['spilled'] == 1 and writer.get_metrics()['failed'] == 0
+    monkeypatch.setattr(usage_logger.crud_usage_log, 'bulk_load_usage', unavailable)
+    events = [{'api_key': 'spillkey', 'endpoint': '/s', 'identifier': f's{i}', 'status': 'allowed'} for i in (1, 2)]
+    assert usage_logger.bulk_load_usage_events(db_session, iter(events), fallback=wal) == 2
+    monkeypatch.undo()
+    assert wal.replay(db_session) == 3
+    assert usage_logger.count_usage_events(db_session, api_key='spillkey') == 3
+    wal.stop()
+
+def test_data_errors_do_not_fall_back_to_event_log(db_session, test_user, tmp_path, monkeypatch):
+    wal = usage_logger.UsageEventLog(str(tmp_path), segment_size=4096)
+    def rejected(*args, **kwargs):
+        raise IntegrityError("INSERT INTO usage_logs", {}, Exception("FOREIGN KEY constraint failed"))
+    monkeypatch.setattr(usage_logger.crud_usage_log, 'log_usage', rejected)
+    monkeypatch.setattr(usage_logger.crud_usage_log, 'bulk_load_usage', rejected)
+    with pytest.raises(IntegrityError):
+        usage_logger.log_usage_event(db_session, 'nokey', '/x', 'u', 'allowed', fallback=wal)
+    with pytest.raises(IntegrityError):
+        usage_logger.bulk_load_usage_events(db_session, [{'api_key': 'nokey', 'endpoint': '/x', 'identifier': 'u', 'status': 'allowed'}], fallback=wal)
+    assert wal.get_metrics()['appended'] == 0
+    wal.stop()
+
+def test_usage_log_writer_writes_around_rejected_rows(writer_sessions, tmp_path):
+    from backend.models.usage_log import UsageLog
+    wal = usage_logger.UsageEventLog(str(tmp_path / "wal"), segment_size=4096)
+    writer = usage_logger.UsageLogWriter(writer_sessions, flush_interval=0.01, retry_backoff=0.01, fallback=wal)
+    writer.start()
+    for identifier in ('ok0', None, 'ok1'):
+        writer.submit({'api_key': 'badrow', 'endpoint': '/b', 'identifier': identifier, 'status': 'allowed', 'customer_id': '1'})
+    writer.stop()
+    metrics = writer.get_metrics()
+    # The NOT NULL violation is not retried nor spilled; the other rows of its batch are written
+    assert metrics['written'] == 2 and metrics['failed'] == 1 and metrics['retries'] == 0 and metrics['spilled'] == 0
+    db = writer_sessions()
+    assert db.query(UsageLog).filter(UsageLog.api_key == 'badrow').count() == 2
+    db.close()
+    wal.stop()
+
+def test_usage_event_log_dead_letters_rejected_records(writer_sessions, tmp_path):
+    import json
+    from backend.utils import event_log
+    directory = str(tmp_path / "wal")
+    wal = usage_logger.UsageEventLog(directory, session_factory=writer_sessions, segment_size=4096, batch_size=2)
+    ids = [str(uuid.uuid4()) for _ in range(5)]
+    # The fourth record reuses the first one's id: the database rejects it once the first is loaded
+    ids[3] = ids[0]
+    for i, event_id in enumerate(ids):
+        wal.submit({'id': event_id, 'api_key': 'dlkey', 'endpoint': '/dl', 'identifier': f'd{i}', 'status': 'allowed', 'customer_id': '1'})
+    assert wal.replay() == 4
+    assert wal.get_metrics()['dead_lettered'] == 1
+    [(number, _)] = event_log.list_segments(directory)
+    assert event_log.read_checkpoint(directory) == (number, wal.log.written[1])
+    with open(tmp_path / "wal" / usage_logger.DEAD_LETTER_FILE) as f:
+        [record] = [json.loads(line) for line in f]
+    assert record['event']['identifier'] == 'd3' and 'UNIQUE' in record['error']
+    # Later events are not held up by the bad one
+    wal.submit({'api_key': 'dlkey', 'endpoint': '/dl', 'identifier': 'd5', 'status': 'allowed', 'customer_id': '1'})
+    assert wal.replay() == 1
+    db = writer_sessions()
+    assert usage_logger.count_usage_events(db, api_key='dlkey') == 5
+    db.close()
+    wal.stop()
+
+@pytest.mark.skipif(event_log_module.fcntl is None, reason="directory locking needs fcntl")
+def test_open_usage_event_log_claims_a_worker_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(usage_logger, 'usage_event_log', None)
+    monkeypatch.setattr(usage_logger.usage_log_writer, 'fallback', None)
+    first = usage_logger.open_usage_event_log(str(tmp_path), segment_size=4096)
+    assert usage_logger.usage_log_writer.fallback is first
+    assert usage_logger.open_usage_event_log(str(tmp_path)) is first
+    # Another worker process sharing the directory gets the next free subdirectory
+    monkeypatch.setattr(usage_logger, 'usage_event_log', None)
+    second = usage_logger.open_usage_event_log(str(tmp_path), segment_size=4096)
+    assert (first.directory, second.directory) == (str(tmp_path / "worker-0"), str(tmp_path / "worker-1"))
+    usage_logger.close_usage_event_log()
+    assert usage_logger.usage_event_log is None and usage_logger.usage_log_writer.fallback is None
+    first.stop()
+
+def test_aggregates_weight_sampled_rows(db_session, test_user):
+    import math
+    from datetime import datetime, timedelta
+    start = datetime(2025, 8, 1)
+    usage_logger.bulk_load_usage_events(db_session, [
+        {'api_key': 'wkey', 'endpoint': '/w', 'identifier': 'wid', 'status': 'success', 'sample_weight': 10, 'timestamp': start + timedelta(minutes=i)}
+        for i in range(3)
+    ] + [{'api_key': 'wkey', 'endpoint': '/w', 'identifier': 'wid', 'status': 'error', 'timestamp': start}])
+    assert usage_logger.summarize_usage(db_session, api_key='wkey') == [
+        {'endpoint': '/w', 'count': 31, 'standard_error': round(math.sqrt(3 * 10 * 9), 2)}
+    ]
+    breakdown = usage_logger.get_status_breakdown(db_session, api_key='wkey')
+    assert breakdown['breakdown'] == {'success': 30, 'error': 1}
+    assert breakdown['total_requests'] == 31
+    assert breakdown['standard_error'] == round(math.sqrt(270), 2)
+    series = usage_logger.get_usage_time_series(db_session, api_key='wkey', start_time=start, end_time=start + timedelta(hours=1), interval='hour')
+    assert sum(point['count'] for point in series) == 31
+    assert usage_logger.count_usage_events(db_session, api_key='wkey') == 31
+    report = usage_logger.generate_usage_report(db_session, api_key='wkey', start_time=start, end_time=start + timedelta(hours=1))
+    assert report['summary']['total_requests'] == 31
+
+def test_alog_usage_records_sample_weight(tmp_path):
+    pytest.importorskip("aiosqlite")
+    import asyncio
+    from sqlalchemy import create_engine, select
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from backend.crud import usage_log as crud_usage_log
+    from backend.database import Base
+    path = tmp_path / "alog.db"
+    Base.metadata.create_all(bind=create_engine(f"sqlite:///{path}"))
+
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        async with AsyncSession(engine) as db:
+            await crud_usage_log.alog_usage(db, 'akey', '/a', 'aid', 'allowed', customer_id='c', sample_weight=25)
+            total = (await db.execute(select(crud_usage_log.usage_count()))).scalar()
+        await engine.dispose()
+        return total
+
+    assert asyncio.run(scenario()) == 25
@@ -0,0 +1,101 @@
+import pytest
+from datetime import datetime, timedelta
+from backend.services import usage_rollup
+from backend.services.usage_logger import bulk_load_usage_events
+from backend.crud import usage_rollup as crud_usage_rollup
+from backend.models.usage_rollup import UsageRollupMinute, UsageRollupHour, UsageRollupDay
+
+START = datetime(2025, 7, 1, 22, 0)
+
+def _load(db_session, offsets, api_key="rollkey", endpoint="/r", status="allowed"):
+    bulk_load_usage_events(db_session, (
+        {"api_key": api_key, "endpoint": endpoint, "identifier": "u1", "status": status, "timestamp": START + offset}
+        for offset in offsets
+    ))
+
+def test_covering_segments_uses_coarsest_whole_buckets():
+    segments = usage_rollup.covering_segments(datetime(2025, 1, 1, 22, 30, 15), datetime(2025, 1, 3, 1, 5))
+    assert segments == [
+        (None, datetime(2025, 1, 1, 22, 30, 15), datetime(2025, 1, 1, 22, 31)),
+        ("minute", datetime(2025, 1, 1, 22, 31), datetime(2025, 1, 1, 23, 0)),
+        ("hour", datetime(2025, 1, 1, 23, 0), datetime(2025, 1, 2)),
+        ("day", datetime(2025, 1, 2), datetime(2025, 1, 3)),
+        ("hour", datetime(2025, 1, 3), datetime(2025, 1, 3, 1, 0)),
+        ("minute", datetime(2025, 1, 3, 1, 0), datetime(2025, 1, 3, 1, 5)),
+    ]
+    assert usage_rollup.covering_segments(datetime(2025, 1, 1, 10), datetime(2025, 1, 1, 12), ("minute",)) == [
+        ("minute", datetime(2025, 1, 1, 10), datetime(2025, 1, 1, 12))
+    ]
+
+def test_refresh_and_read_rollups(db_session):
+    _load(db_session, [timedelta(minutes=m) for m in (0, 0, 1, 75, 130, 1500)])
+    _load(db_session, [timedelta(minutes=2)], status="rate_limited", endpoint=None)
+    result = usage_rollup.refresh_usage_rollups(db_session, now=START + timedelta(hours=30), max_span=timedelta(hours=5))
+    assert result["spans"] == 6
+    assert db_session.query(UsageRollupMinute).filter(UsageRollupMinute.api_key == "rollkey").count() == 6
+    day = db_session.query(UsageRollupDay).filter(UsageRollupDay.api_key == "rollkey", UsageRollupDay.status == "allowed").all()
+    assert sorted((r.bucket, r.count) for r in day) == [(datetime(2025, 7, 1), 4), (datetime(2025, 7, 2), 2)]
+
+    hourly = usage_rollup.usage_counts(db_session, START, START + timedelta(days=2), interval="hour", api_key="rollkey")
+    assert hourly == {
+        (datetime(2025, 7, 1, 22),): 4, (datetime(2025, 7, 1, 23),): 1,
+        (datetime(2025, 7, 2, 0),): 1, (datetime(2025, 7, 2, 23),): 1,
+    }
+    by_status = usage_rollup.usage_counts(db_session, START - timedelta(days=1), START + timedelta(days=2), dimensions=("endpoint", "status"), api_key="rollkey")
+    assert by_status == {("/r", "allowed"): 6, (None, "rate_limited"): 1}
+    # Rows past the watermark are read from usage_logs
+    _load(db_session, [timedelta(hours=29, minutes=30)])
+    total = usage_rollup.usage_counts(db_session, START, START + timedelta(days=2), api_key="rollkey")
+    assert total == {(): 8}
+    with pytest.raises(ValueError):
+        usage_rollup.usage_counts(db_session, START, START + timedelta(days=1), interval="year")
+
+def test_backfill_lowers_watermark(db_session):
+    _load(db_session, [timedelta(minutes=5)])
+    usage_rollup.refresh_usage_rollups(db_session, now=START + timedelta(hours=2))
+    watermark = crud_usage_rollup.get_rollup_watermark(db_session)
+    assert watermark == START + timedelta(hours=1, minutes=58)
+    _load(db_session, [timedelta(minutes=7)])
+    assert crud_usage_rollup.get_rollup_watermark(db_session) == START + timedelta(minutes=7)
+    usage_rollup.refresh_usage_rollups(db_session, now=START + timedelta(hours=2))
+    hour = db_session.query(UsageRollupHour).filter(UsageRollupHour.api_key == "rollkey").one()
+    assert (hour.bucket, hour.count) == (START, 2)
+
+def test_late_batch_writes_lower_watermark(db_session):
+    from backend.crud.usage_log import log_usage_batch
+    _load(db_session, [timedelta(minutes=5)])
+    usage_rollup.refresh_usage_rollups(db_session, now=START + timedelta(hours=2))
+    # Written by the write-behind queue or a lease settlement after the rollup passed them
+    log_usage_batch(db_session, [
+        {"api_key": "rollkey", "endpoint": "/r", "identifier": "u2", "status": "allowed", "timestamp": START + timedelta(minutes=9, seconds=30)},
+        {"api_key": "rollkey", "endpoint": "/r", "identifier": "u2", "status": "allowed", "timestamp": START + timedelta(minutes=40)},
+    ])
+    assert crud_usage_rollup.get_rollup_watermark(db_session) == START + timedelta(minutes=9)
+    usage_rollup.refresh_usage_rollups(db_session, now=START + timedelta(hours=2))
+    assert usage_rollup.usage_counts(db_session, START, START + timedelta(hours=1), api_key="rollkey") == {(): 3}
+
+def test_late_async_batch_writes_lower_watermark(tmp_path):
+    pytest.importorskip("aiosqlite")
+    import asyncio
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from backend.database import Base
+    from backend.crud.usage_log import alog_usage_batch
+    path = tmp_path / "rollup.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        crud_usage_rollup.advance_rollup_watermark(db, None, START + timedelta(hours=1))
+        db.commit()
+
+    async def write():
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        async with AsyncSession(async_engine) as db:
+            await alog_usage_batch(db, [{"api_key": "rollkey", "endpoint": "/r", "identifier": "u1", "status": "allowed", "timestamp": START + timedelta(minutes=3)}])
+        await async_engine.dispose()
+
+    asyncio.run(write())
+    with sessionmaker(bind=engine)() as db:
+        assert crud_usage_rollup.get_rollup_watermark(db) == START + timedelta(minutes=3)
+    engine.dispose()
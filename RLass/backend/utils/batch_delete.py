@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Optional
+from sqlalchemy import Select, delete, inspect, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query, Session
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DELETE_BATCH_SIZE = 5000
+# Seconds to sleep between full batches, so replication and autovacuum keep up
+DEFAULT_DELETE_PAUSE = 0.05
+
+class DeleteProgress:
+    """Running state of a chunked delete. Pass `last_key` back as `after` to resume."""
+    __slots__ = ("deleted", "batches", "last_key", "done")
+
+    def __init__(self, after: Any = None):
+        self.deleted = 0
+        self.batches = 0
+        self.last_key = after
+        self.done = False
+
+    def as_dict(self) -> dict:
+        return {"deleted": self.deleted, "batches": self.batches, "last_key": self.last_key, "done": self.done}
+
+def _primary_key(model):
+    # (columns, composite, expression to compare and match keys with); composite keys are row values
+    primary_key = inspect(model).primary_key
+    composite = len(primary_key) > 1
+    return primary_key, composite, tuple_(*primary_key) if composite else primary_key[0]
+
+def chunked_delete(
+    db: Session,
+    query: Query,
+    batch_size: int = DEFAULT_DELETE_BATCH_SIZE,
+    pause: float = DEFAULT_DELETE_PAUSE,
+    after: Any = None,
+    max_batches: Optional[int] = None,
+    on_progress: Optional[Callable[[DeleteProgress], None]] = None,
+) -> DeleteProgress:
+    """
+    Delete the rows matched by `query` (a filtered query on one mapped model) in primary-key
+    order, `batch_size` rows per transaction. For a composite primary key, keys (and
+    `last_key` / `after`) are tuples of its column values.
+
+    Each batch selects the next keys after the last deleted one, deletes them by key and
+    commits, so no statement holds locks for long and every committed batch survives an
+    interruption. Re-running the same delete finishes the job; passing the last reported
+    `last_key` as `after` also skips the key range already covered. `on_progress` is called
+    after every batch; `max_batches` stops early (progress.done is then False).
+    """
+    model = query.column_descriptions[0]["entity"]
+    primary_key, composite, pk = _primary_key(model)
+    keys_query = query.with_entities(*primary_key).order_by(None).order_by(*primary_key)
+    progress = DeleteProgress(after)
+    while max_batches is None or progress.batches < max_batches:
+        batch = keys_query
+        if progress.last_key is not None:
+            batch = batch.filter(pk > (tuple_(*progress.last_key) if composite else progress.last_key))
+        keys = [tuple(row) if composite else row[0] for row in batch.limit(batch_size).all()]
+        if not keys:
+            progress.done = True
+            break
+        progress.deleted += db.query(model).filter(pk.in_(keys)).delete(synchronize_session=False)
+        db.commit()
+        progress.batches += 1
+        progress.last_key = keys[-1]
+        if on_progress is not None:
+            on_progress(progress)
+        if len(keys) < batch_size:
+            progress.done = True
+            break
+        if pause:
+            time.sleep(pause)
+    logger.info(f"Chunked delete from {model.__tablename__}: {progress.deleted} rows in {progress.batches} batches (done={progress.done})")
+    return progress
+
+async def achunked_delete(
+    db: AsyncSession,
+    stmt: Select,
+    batch_size: int = DEFAULT_DELETE_BATCH_SIZE,
+    pause: float = DEFAULT_DELETE_PAUSE,
+    after: Any = None,
+    max_batches: Optional[int] = None,
+    on_progress: Optional[Callable[[DeleteProgress], None]] = None,
+) -> DeleteProgress:
+    """
+    Async version of chunked_delete for an AsyncSession. `stmt` is a filtered select() of one
+    mapped model; the pause between batches does not block the event loop.
+    """
+    model = stmt.column_descriptions[0]["entity"]
+    primary_key, composite, pk = _primary_key(model)
+    keys_stmt = stmt.with_only_columns(*primary_key).order_by(None).order_by(*primary_key)
+    progress = DeleteProgress(after)
+    while max_batches is None or progress.batches < max_batches:
+        batch = keys_stmt
+        if progress.last_key is not None:
+            batch = batch.where(pk > (tuple_(*progress.last_key) if composite else progress.last_key))
+        keys = [tuple(row) if composite else row[0] for row in (await db.execute(batch.limit(batch_size))).all()]
+        if not keys:
+            progress.done = True
+            break
+        progress.deleted += (await db.execute(delete(model).where(pk.in_(keys)))).rowcount
+        await db.commit()
+        progress.batches += 1
+        progress.last_key = keys[-1]
+        if on_progress is not None:
+            on_progress(progress)
+        if len(keys) < batch_size:
+            progress.done = True
+            break
+        if pause:
+            await asyncio.sleep(pause)
+    logger.info(f"Chunked delete from {model.__tablename__}: {progress.deleted} rows in {progress.batches} batches (done={progress.done})")
+    return progress
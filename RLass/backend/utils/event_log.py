@@ -0,0 +1,240 @@
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: the single-writer rule is not enforced
+    fcntl = None
+
+# Segmented append-only log of opaque records, used as a local write-ahead log.
+#
+# A directory holds numbered segment files (000000000001.seg, ...) of a fixed, preallocated
+# size. Each starts with a 16-byte header (magic, segment number) followed by records:
+# a 4-byte payload length, the payload's 4-byte CRC32, then the payload. The zeros of the
+# unused preallocated space read as a zero length, i.e. the end of the segment. A writer never
+# appends to a segment it did not create, so a torn tail left by a crash is only ever followed
+# by the next segment. Readers map segments with mmap and stop at the first record whose
+# length or checksum is wrong.
+
+SEGMENT_MAGIC = b"RLEVLOG1"
+SEGMENT_HEADER = struct.Struct("<8sQ")
+RECORD_HEADER = struct.Struct("<II")
+SEGMENT_SUFFIX = ".seg"
+CHECKPOINT_FILE = "checkpoint"
+CHECKPOINT = struct.Struct("<QQ")
+LOCK_FILE = "lock"
+
+class EventLogLocked(RuntimeError):
+    """Another EventLog (usually in another process) is writing to the directory."""
+
+def segment_path(directory: str, number: int) -> str:
+    return os.path.join(directory, f"{number:012d}{SEGMENT_SUFFIX}")
+
+def list_segments(directory: str) -> List[Tuple[int, str]]:
+    """(number, path) of every segment in `directory`, oldest first."""
+    segments = []
+    for name in os.listdir(directory):
+        if name.endswith(SEGMENT_SUFFIX) and name[:-len(SEGMENT_SUFFIX)].isdigit():
+            segments.append((int(name[:-len(SEGMENT_SUFFIX)]), os.path.join(directory, name)))
+    return sorted(segments)
+
+def read_records(path: str, offset: int = SEGMENT_HEADER.size, limit: Optional[int] = None) -> Tuple[List[bytes], int, bool]:
+    """
+    Read up to `limit` records of the segment at `path`, starting at byte `offset`.
+
+    Returns (payloads, next_offset, intact). next_offset is where the next read should start.
+    intact is False if reading stopped at a record with a bad length or checksum: in the
+    segment still being written that is a record in flight, in an older one a torn tail.
+    """
+    payloads = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        magic, _ = SEGMENT_HEADER.unpack_from(data, 0)
+        if magic != SEGMENT_MAGIC:
+            raise ValueError(f"{path} is not an event log segment")
+        size = len(data)
+        while limit is None or len(payloads) < limit:
+            if offset + RECORD_HEADER.size > size:
+                return payloads, offset, True
+            length, crc = RECORD_HEADER.unpack_from(data, offset)
+            if length == 0:
+                return payloads, offset, True
+            end = offset + RECORD_HEADER.size + length
+            if end > size:
+                return payloads, offset, False
+            payload = data[offset + RECORD_HEADER.size:end]
+            if zlib.crc32(payload) != crc:
+                return payloads, offset, False
+            payloads.append(payload)
+            offset = end
+    return payloads, offset, True
+
+def read_checkpoint(directory: str) -> Tuple[int, int]:
+    """(segment number, offset) up to which the log has been consumed; (0, 0) if never."""
+    try:
+        with open(os.path.join(directory, CHECKPOINT_FILE), "rb") as f:
+            return CHECKPOINT.unpack(f.read(CHECKPOINT.size))
+    except (FileNotFoundError, struct.error):
+        return 0, 0
+
+def write_checkpoint(directory: str, segment: int, offset: int) -> None:
+    """Durably replace the checkpoint (write a temporary file, fsync, rename)."""
+    path = os.path.join(directory, CHECKPOINT_FILE)
+    with open(path + ".tmp", "wb") as f:
+        f.write(CHECKPOINT.pack(segment, offset))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".tmp", path)
+    _fsync_directory(directory)
+
+def _fsync_directory(directory: str) -> None:
+    # Makes created, renamed and removed files durable (not supported on Windows)
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+def _lock_directory(directory: str) -> int:
+    fd = os.open(os.path.join(directory, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+    if fcntl is not None:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            raise EventLogLocked(f"{directory} is already being written by another event log") from None
+    return fd
+
+class EventLog:
+    """
+    Writer side of a segment directory; safe to share between threads.
+
+    append() writes a record with a single pwrite and returns without waiting for the disk;
+    fsync is batched: it runs once `sync_bytes` have been written since the last one, or on
+    the first append `sync_interval` seconds after it, and covers every record appended
+    before it. append(..., sync=True) waits for an fsync covering its record, which
+    concurrent callers share (group commit). Records that were not yet synced can be lost
+    if the machine (not just the process) goes down.
+
+    Only one EventLog may write to a directory at a time; give each process its own. The
+    writer holds an exclusive flock on the directory's lock file until close(), and opening a
+    second one raises EventLogLocked.
+    """
+
+    def __init__(self, directory: str, segment_size: int = 64 << 20, sync_bytes: int = 1 << 20, sync_interval: float = 0.05):
+        if segment_size <= SEGMENT_HEADER.size + RECORD_HEADER.size:
+            raise ValueError("segment_size is too small")
+        os.makedirs(directory, exist_ok=True)
+        self.lock_fd = _lock_directory(directory)
+        self.directory = directory
+        self.segment_size = segment_size
+        self.sync_bytes = sync_bytes
+        self.sync_interval = sync_interval
+        self.lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+        self.fd: Optional[int] = None
+        self.segment = 0
+        self.offset = 0
+        # (segment, offset) written so far and known to be on disk
+        self.written = (0, 0)
+        self.synced = (0, 0)
+        self.unsynced_bytes = 0
+        self.last_sync = time.monotonic()
+        segments = list_segments(directory)
+        try:
+            self._open_segment((segments[-1][0] if segments else read_checkpoint(directory)[0]) + 1)
+        except BaseException:
+            os.close(self.lock_fd)
+            raise
+
+    def _open_segment(self, number: int) -> None:
+        path = segment_path(self.directory, number)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o644)
+        if hasattr(os, "posix_fallocate"):
+            os.posix_fallocate(fd, 0, self.segment_size)
+        else:
+            os.ftruncate(fd, self.segment_size)
+        os.pwrite(fd, SEGMENT_HEADER.pack(SEGMENT_MAGIC, number), 0)
+        os.fsync(fd)
+        _fsync_directory(self.directory)
+        self.fd, self.segment, self.offset = fd, number, SEGMENT_HEADER.size
+        self.written = (number, self.offset)
+        self.unsynced_bytes = 0
+
+    def _roll(self) -> None:
+        # The full segment is made durable before its successor exists, so a reader seeing a
+        # newer segment can treat a bad record in an older one as a torn tail
+        os.fsync(self.fd)
+        os.close(self.fd)
+        self._open_segment(self.segment + 1)
+
+    def append(self, payload: bytes, sync: bool = False) -> Tuple[int, int]:
+        """Append one record; returns its end position (segment, offset)."""
+        return self.append_many([payload], sync)
+
+    def append_many(self, payloads: List[bytes], sync: bool = False) -> Tuple[int, int]:
+        """Append records in order (one pwrite per segment they span); returns the end position."""
+        records = [RECORD_HEADER.pack(len(p), zlib.crc32(p)) + p for p in payloads]
+        capacity = self.segment_size - SEGMENT_HEADER.size
+        if any(len(r) > capacity for r in records):
+            raise ValueError("Record does not fit in a segment")
+        with self.lock:
+            if self.fd is None:
+                raise RuntimeError("Event log is closed")
+            pending: List[bytes] = []
+            size = 0
+            for record in records:
+                if self.offset + size + len(record) > self.segment_size:
+                    self._write(b"".join(pending))
+                    self._roll()
+                    pending, size = [], 0
+                pending.append(record)
+                size += len(record)
+            self._write(b"".join(pending))
+            position = self.written
+            due = self.unsynced_bytes >= self.sync_bytes or time.monotonic() - self.last_sync >= self.sync_interval
+        if sync or due:
+            self.sync(position)
+        return position
+
+    def _write(self, data: bytes) -> None:
+        if data:
+            os.pwrite(self.fd, data, self.offset)
+            self.offset += len(data)
+            self.written = (self.segment, self.offset)
+            self.unsynced_bytes += len(data)
+
+    def sync(self, position: Optional[Tuple[int, int]] = None) -> None:
+        """fsync the active segment, unless an fsync since already covered `position`."""
+        with self.sync_lock:
+            if position is not None and self.synced >= position:
+                return
+            with self.lock:
+                if self.fd is None:
+                    return
+                # A duplicate stays valid if the segment is rolled (and its fd closed) meanwhile
+                fd, target = os.dup(self.fd), self.written
+                self.unsynced_bytes = 0
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self.synced = max(self.synced, target)
+            self.last_sync = time.monotonic()
+
+    def close(self) -> None:
+        """Sync and close the active segment. Its unused space stays allocated until consumed."""
+        with self.sync_lock, self.lock:
+            if self.fd is None:
+                return
+            os.fsync(self.fd)
+            os.close(self.fd)
+            self.synced = self.written
+            self.fd = None
+            # Closing the descriptor releases the flock
+            os.close(self.lock_fd)
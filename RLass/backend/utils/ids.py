@@ -0,0 +1,37 @@
+import os
+import threading
+import time
+import uuid
+
+_lock = threading.Lock()
+_last_ms = 0
+_sequence = 0
+
+def uuid7() -> uuid.UUID:
+    """
+    Time-ordered UUID (RFC 9562 version 7): 48-bit Unix milliseconds, then a 12-bit sequence
+    that keeps IDs from one process increasing within a millisecond, then 62 random bits.
+    Consecutive IDs sort after each other, so inserts append to the end of an index on them.
+    """
+    global _last_ms, _sequence
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms > _last_ms:
+            _last_ms = ms
+            # Random start in the lower half leaves room for IDs later in the same millisecond
+            _sequence = int.from_bytes(os.urandom(2), "big") & 0x7FF
+        else:
+            _sequence += 1
+            if _sequence > 0xFFF:
+                # Sequence exhausted (or the clock went back): borrow the next millisecond
+                _last_ms += 1
+                _sequence = 0
+        ms, sequence = _last_ms, _sequence
+    value = (ms & 0xFFFFFFFFFFFF) << 80
+    value |= 0x7 << 76 | sequence << 64
+    value |= 0b10 << 62 | int.from_bytes(os.urandom(8), "big") & 0x3FFFFFFFFFFFFFFF
+    return uuid.UUID(int=value)
+
+def new_id() -> str:
+    """Primary key for log rows: a UUIDv7 in its canonical string form."""
+    return str(uuid7())
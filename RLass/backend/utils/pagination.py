@@ -0,0 +1,66 @@
+import base64
+import datetime
+import json
+from typing import Any, List, Optional, Tuple
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query, Session
+
+DEFAULT_PAGE_SIZE = 100
+# Hard cap on rows per page for every listing over log tables
+MAX_PAGE_SIZE = 1000
+
+def clamp_page_size(limit: Optional[int]) -> int:
+    """Return `limit` bounded to 1..MAX_PAGE_SIZE (DEFAULT_PAGE_SIZE if not given)."""
+    if not limit:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def encode_cursor(timestamp: datetime.datetime, row_id: str) -> str:
+    """Opaque cursor for the row at (timestamp, id)."""
+    raw = json.dumps([timestamp.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime.datetime, str]:
+    """Inverse of encode_cursor. Raises ValueError for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        return datetime.datetime.fromisoformat(timestamp), str(row_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def keyset_page(query: Query, model, limit: Optional[int] = None, cursor: Optional[str] = None, descending: bool = True) -> Tuple[List[Any], Optional[str]]:
+    """
+    Fetch one page of `query` ordered by (model.timestamp, model.id), starting after `cursor`.
+    Each page is a range scan on the ordering columns, however deep it is. Returns the rows
+    and the cursor of the next page (None on the last page).
+    """
+    limit = clamp_page_size(limit)
+    key = tuple_(model.timestamp, model.id)
+    if cursor:
+        after = tuple_(*decode_cursor(cursor))
+        query = query.filter(key < after if descending else key > after)
+    if descending:
+        query = query.order_by(model.timestamp.desc(), model.id.desc())
+    else:
+        query = query.order_by(model.timestamp.asc(), model.id.asc())
+    # One extra row tells whether another page follows
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].timestamp, rows[-1].id)
+
+def estimate_count(db: Session, query: Query) -> Optional[int]:
+    """
+    Row count estimated by the PostgreSQL planner for `query`, without running it.
+    Other databases (SQLite in development) have no usable estimate and get an exact count.
+    """
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return query.order_by(None).count()
+    compiled = query.statement.compile(dialect=bind.dialect)
+    plan = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])